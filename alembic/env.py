@@ -48,6 +48,11 @@ def run_migrations_offline() -> None:
 
 
 def run_sync_migrations(connection: Connection) -> None:
+    if connection.dialect.name == "sqlite":
+        # Batch migrations rebuild tables on SQLite; with foreign keys on, dropping the old table
+        # would fire ON DELETE actions against the rows that reference it.
+        connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        connection.commit()
     context.configure(connection=connection, target_metadata=target_metadata)
 
     with context.begin_transaction():
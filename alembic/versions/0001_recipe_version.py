@@ -0,0 +1,30 @@
+"""Add recipes.version for optimistic concurrency control.
+
+Existing rows start at version 1. Databases whose tables were created by `create_all` after the
+column was added to the model already have it, and are left alone.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("recipes") or "version" in {column["name"] for column in inspector.get_columns("recipes")}:
+        return
+    op.add_column("recipes", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("recipes") as batch:
+        batch.drop_column("version")
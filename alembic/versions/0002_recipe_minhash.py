@@ -0,0 +1,38 @@
+"""Add recipes.minhash and recipes.duplicate_of_id for near-duplicate detection.
+
+Existing recipes get no signature here; run `python -m app.dedupe` afterwards to fingerprint them
+and fill `duplicate_of_id`. The `recipe_minhash_bands` table itself comes from `create_all`.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("recipes") or "duplicate_of_id" in {column["name"] for column in inspector.get_columns("recipes")}:
+        return
+    # Batch mode: SQLite cannot add a foreign key to an existing table without rebuilding it.
+    with op.batch_alter_table("recipes") as batch:
+        batch.add_column(sa.Column("minhash", sa.LargeBinary(), nullable=True))
+        batch.add_column(sa.Column("duplicate_of_id", sa.Integer(), nullable=True))
+        batch.create_foreign_key("recipes_duplicate_of_id_fkey", "recipes", ["duplicate_of_id"], ["id"], ondelete="SET NULL")
+        batch.create_index("ix_recipes_duplicate_of_id", ["duplicate_of_id"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("recipes") as batch:
+        batch.drop_index("ix_recipes_duplicate_of_id")
+        batch.drop_constraint("recipes_duplicate_of_id_fkey", type_="foreignkey")
+        batch.drop_column("duplicate_of_id")
+        batch.drop_column("minhash")
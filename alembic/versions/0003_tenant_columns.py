@@ -0,0 +1,45 @@
+"""Add the tenant columns used by ShardedStorage and make category names unique per tenant.
+
+Existing rows belong to the unsharded tenant "". The unique index on `categories.name` becomes a
+plain index, and `uq_categories_tenant_name` on `(tenant, name)` takes over as the conflict
+target of `create_category`'s `ON CONFLICT`.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("categories") or "tenant" in {column["name"] for column in inspector.get_columns("categories")}:
+        return
+    with op.batch_alter_table("categories") as batch:
+        batch.add_column(sa.Column("tenant", sa.String(64), nullable=False, server_default=""))
+        batch.drop_index("ix_categories_name")
+        batch.create_index("ix_categories_name", ["name"])
+        batch.create_unique_constraint("uq_categories_tenant_name", ["tenant", "name"])
+    with op.batch_alter_table("recipes") as batch:
+        batch.add_column(sa.Column("tenant", sa.String(64), nullable=False, server_default=""))
+        batch.create_index("ix_recipes_tenant", ["tenant"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("recipes") as batch:
+        batch.drop_index("ix_recipes_tenant")
+        batch.drop_column("tenant")
+    # Fails if two tenants share a category name; merge or rename those first.
+    with op.batch_alter_table("categories") as batch:
+        batch.drop_constraint("uq_categories_tenant_name", type_="unique")
+        batch.drop_index("ix_categories_name")
+        batch.create_index("ix_categories_name", ["name"], unique=True)
+        batch.drop_column("tenant")
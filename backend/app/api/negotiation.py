@@ -0,0 +1,74 @@
+import json
+from typing import Any, Callable, Coroutine, Dict
+
+import msgpack
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def parse_accept(header: str) -> Dict[str, float]:
+    """Parse an `Accept`-style header into a mapping of lowercase token to q-value."""
+    preferences: Dict[str, float] = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        preferences[token] = quality
+    return preferences
+
+
+def wants_msgpack(request: Request) -> bool:
+    """Return True when the client prefers MessagePack over JSON."""
+    preferences = parse_accept(request.headers.get("accept", ""))
+    msgpack_quality = max(preferences.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    if msgpack_quality <= 0:
+        return False
+    json_quality = max(preferences.get("application/json", 0.0), preferences.get("*/*", 0.0))
+    return msgpack_quality >= json_quality
+
+
+class MsgPackResponse(Response):
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, use_bin_type=True)
+
+
+class NegotiatedRoute(APIRoute):
+    """
+    Route that serves `application/msgpack` when the client asks for it and JSON otherwise.
+
+    FastAPI validates and renders the `response_model` as JSON on its fast path as usual; for
+    MessagePack clients that JSON is transcoded, so both encodings carry an identical payload.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        json_handler = super().get_route_handler()
+
+        async def negotiated_handler(request: Request) -> Response:
+            response = await json_handler(request)
+            if wants_msgpack(request) and response.headers.get("content-type") == "application/json":
+                response = _to_msgpack(response)
+            response.headers.add_vary_header("Accept")
+            return response
+
+        return negotiated_handler
+
+
+def _to_msgpack(response: Response) -> MsgPackResponse:
+    transcoded = MsgPackResponse(json.loads(response.body), status_code=response.status_code, background=response.background)
+    transcoded.raw_headers.extend(
+        (name, value) for name, value in response.raw_headers if name not in (b"content-length", b"content-type")
+    )
+    return transcoded
@@ -5,24 +5,25 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from app import crud, schemas
+from app.api.negotiation import NegotiatedRoute
 from app.database import get_db
 
-router = APIRouter(prefix="/categories", tags=["categories"])
+router = APIRouter(prefix="/categories", tags=["categories"], route_class=NegotiatedRoute)
 
 
-@router.get("", response_model=List[schemas.Category])
+@router.get("", response_model=List[schemas.CategoryWithStats])
 def list_categories(db: Session = Depends(get_db)):
     return crud.get_categories(db)
 
 
 @router.post("", response_model=schemas.Category, status_code=status.HTTP_201_CREATED)
 def create_category(category_in: schemas.CategoryCreate, db: Session = Depends(get_db)):
-    existing_category = crud.get_category_by_name(db, category_in.name)
-    if existing_category:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Category with this name already exists")
-
     try:
-        return crud.create_category(db, category_in)
+        category = crud.create_category(db, category_in)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create category")
+
+    if category is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Category with this name already exists")
+    return category
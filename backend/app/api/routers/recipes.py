@@ -1,24 +1,57 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy.exc import SQLAlchemyError
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm.exc import StaleDataError
 from sqlalchemy.orm import Session
 
 from app import crud, schemas
+from app.api.negotiation import NegotiatedRoute
+from app.config.settings import settings
+from app.counters import view_counter
 from app.database import get_db
+from app.events import recipe_events
+from app.facets import facet_index
 
-router = APIRouter(prefix="/recipes", tags=["recipes"])
+router = APIRouter(prefix="/recipes", tags=["recipes"], route_class=NegotiatedRoute)
+
+MAX_BATCH_SIZE = 100
+MAX_BULK_DELETE_SIZE = 10_000
+MAX_SIMILAR = 100
+MAX_POPULAR = 100
+
+
+def _etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def _if_match_satisfied(if_match: str, version: int) -> bool:
+    candidates = [tag.strip() for tag in if_match.split(",")]
+    if "*" in candidates:
+        return True
+    # Weak validators are accepted too; the version column is the only thing being compared.
+    return any(tag.removeprefix("W/") == _etag(version) for tag in candidates)
+
+
+def _raise_if_category_gone(db: Session, category_id: Optional[int]) -> None:
+    # The existence check was answered by this process's category cache; another worker may have
+    # deleted the category since, which the foreign key only reports now.
+    if category_id is not None and not crud.category_exists(db, category_id, fresh=True):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
 
 
 @router.post("", response_model=schemas.Recipe, status_code=status.HTTP_201_CREATED)
 def create_recipe(recipe_in: schemas.RecipeCreate, db: Session = Depends(get_db)):
-    if recipe_in.category_id is not None:
-        category = crud.get_category(db, recipe_in.category_id)
-        if category is None:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+    if recipe_in.category_id is not None and not crud.category_exists(db, recipe_in.category_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
 
     try:
         return crud.create_recipe(db, recipe_in)
+    except IntegrityError:
+        db.rollback()
+        _raise_if_category_gone(db, recipe_in.category_id)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create recipe")
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create recipe")
@@ -26,34 +59,163 @@ def create_recipe(recipe_in: schemas.RecipeCreate, db: Session = Depends(get_db)
 
 @router.get("", response_model=List[schemas.Recipe])
 def list_recipes(category_id: Optional[int] = None, db: Session = Depends(get_db)):
-    return crud.get_recipes(db, category_id=category_id)
+    return crud.get_recipe_rows(db, category_id=category_id)
+
+
+@router.delete("", response_model=schemas.RecipeBulkDeleteResult)
+def delete_recipes(recipe_ids: schemas.RecipeIds, db: Session = Depends(get_db)):
+    requested_ids = list(dict.fromkeys(recipe_ids.ids))
+    if len(requested_ids) > MAX_BULK_DELETE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BULK_DELETE_SIZE} ids may be deleted at once",
+        )
+
+    try:
+        deleted_ids = set(crud.delete_recipes(db, requested_ids))
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to delete recipes")
+
+    return schemas.RecipeBulkDeleteResult(
+        deleted=[recipe_id for recipe_id in requested_ids if recipe_id in deleted_ids],
+        missing=[recipe_id for recipe_id in requested_ids if recipe_id not in deleted_ids],
+    )
+
+
+@router.get("/batch", response_model=schemas.RecipeBatch)
+def get_recipes_batch(ids: List[int] = Query(..., description="Recipe ids, e.g. ?ids=3&ids=1"), db: Session = Depends(get_db)):
+    # Preserve the caller's order while dropping repeated ids.
+    requested_ids = list(dict.fromkeys(ids))
+    if len(requested_ids) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_BATCH_SIZE} ids may be requested at once"
+        )
+
+    recipes_by_id = {recipe.id: recipe for recipe in crud.get_recipes_by_ids(db, requested_ids)}
+    return schemas.RecipeBatch(
+        recipes=[recipes_by_id[recipe_id] for recipe_id in requested_ids if recipe_id in recipes_by_id],
+        missing=[recipe_id for recipe_id in requested_ids if recipe_id not in recipes_by_id],
+    )
+
+
+@router.get("/popular", response_model=List[schemas.PopularRecipe])
+def get_popular_recipes(limit: int = Query(10, ge=1, le=MAX_POPULAR), db: Session = Depends(get_db)):
+    return [schemas.PopularRecipe(views=views, recipe=recipe) for recipe, views in crud.get_popular_recipes(db, limit)]
+
+
+@router.get("/facets", response_model=schemas.RecipeFacets)
+def get_recipe_facets(
+    category_id: List[int] = Query([]),
+    total_time: List[str] = Query([], description="Buckets of prep plus cook minutes, e.g. 16-30"),
+    servings: List[str] = Query([], description="Buckets, e.g. 3-4"),
+    ingredients: List[str] = Query([], description="Buckets of ingredient count, e.g. 6-10"),
+):
+    """
+    Count recipes matching the selected facet values, and every facet's values among the recipes
+    matching the other facets' selections. Repeat a parameter to select several values of one facet.
+
+    Served from the in-memory facet snapshot, not the database.
+    """
+    try:
+        total, facets = facet_index.counts(category_id, total_time=total_time, servings=servings, ingredients=ingredients)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    return schemas.RecipeFacets(
+        total=total,
+        category=[schemas.CategoryFacet(category_id=value, count=count) for value, count in facets["category"]],
+        **{
+            name: [schemas.BucketFacet(bucket=value, count=count) for value, count in facets[name]]
+            for name in ("total_time", "servings", "ingredients")
+        },
+    )
+
+
+@router.get("/events", response_class=StreamingResponse)
+async def recipe_events_stream(last_event_id: Optional[str] = Header(None)):
+    """
+    Server-Sent Events stream of `created`, `updated` and `deleted` recipe events.
+
+    `created`/`updated` carry `{"id", "version", "category_id"}` and `deleted` carries `{"ids"}`.
+    Reconnecting with `Last-Event-ID` replays what was missed, or sends `reset` if that is no
+    longer possible and the client should reload the list.
+    """
+    return StreamingResponse(
+        recipe_events.stream(last_event_id, keepalive=settings.EVENT_KEEPALIVE),
+        media_type="text/event-stream",
+        # Proxies such as nginx would otherwise buffer the stream.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/{recipe_id}", response_model=schemas.Recipe)
-def get_recipe(recipe_id: int, db: Session = Depends(get_db)):
+def get_recipe(recipe_id: int, response: Response, db: Session = Depends(get_db)):
     recipe = crud.get_recipe(db, recipe_id)
     if recipe is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found")
+    # Buffered in memory and written behind in batches, so counting adds no write to the read.
+    view_counter.increment(recipe_id)
+    response.headers["ETag"] = _etag(recipe.version)
     return recipe
 
 
+@router.get("/{recipe_id}/similar", response_model=List[schemas.SimilarRecipe])
+def get_similar_recipes(recipe_id: int, k: int = Query(10, ge=1, le=MAX_SIMILAR), db: Session = Depends(get_db)):
+    similar = crud.get_similar_recipes(db, recipe_id, k)
+    if similar is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found")
+    return [schemas.SimilarRecipe(score=score, recipe=recipe) for recipe, score in similar]
+
+
+@router.get("/{recipe_id}/duplicates", response_model=List[schemas.SimilarRecipe])
+def get_duplicate_recipes(recipe_id: int, db: Session = Depends(get_db)):
+    duplicates = crud.find_duplicate_recipes(db, recipe_id)
+    if duplicates is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found")
+    return [schemas.SimilarRecipe(score=score, recipe=recipe) for recipe, score in duplicates]
+
+
 @router.put("/{recipe_id}", response_model=schemas.Recipe)
-def update_recipe(recipe_id: int, recipe_in: schemas.RecipeUpdate, db: Session = Depends(get_db)):
+def update_recipe(
+    recipe_id: int,
+    recipe_in: schemas.RecipeUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     db_recipe = crud.get_recipe(db, recipe_id)
     if db_recipe is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found")
 
-    if recipe_in.category_id is not None:
-        category = crud.get_category(db, recipe_in.category_id)
-        if category is None:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+    if if_match is not None and not _if_match_satisfied(if_match, db_recipe.version):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Recipe has been modified since it was fetched",
+        )
+
+    if recipe_in.category_id is not None and not crud.category_exists(db, recipe_in.category_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
 
     try:
-        return crud.update_recipe(db, db_recipe, recipe_in)
+        updated = crud.update_recipe(db, db_recipe, recipe_in)
+    except StaleDataError:
+        # Another request committed between our read and our versioned UPDATE.
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Recipe has been modified since it was fetched",
+        )
+    except IntegrityError:
+        db.rollback()
+        _raise_if_category_gone(db, recipe_in.category_id)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to update recipe")
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to update recipe")
 
+    response.headers["ETag"] = _etag(updated.version)
+    return updated
+
 
 @router.delete("/{recipe_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_recipe(recipe_id: int, db: Session = Depends(get_db)):
@@ -0,0 +1,53 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Run a callable on a fixed interval in a daemon thread.
+
+    Exceptions raised by the callable are logged and do not stop the schedule.
+
+    Args:
+        name: Thread name, also used in log messages.
+        interval: Seconds to wait between runs.
+        func: Zero-argument callable to run.
+    """
+
+    def __init__(self, name: str, interval: float, func: Callable[[], None]) -> None:
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, run_immediately: bool = False) -> None:
+        """Start the background thread if it is not already running, optionally running once right away."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(run_immediately,), name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Signal the thread to exit and wait for the current run to finish."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self) -> None:
+        """Run the callable immediately in the caller's thread, logging any failure."""
+        try:
+            self.func()
+        except Exception:
+            logger.exception("Periodic task %s failed", self.name)
+
+    def _run(self, run_immediately: bool) -> None:
+        if run_immediately:
+            self.run_once()
+        while not self._stop_event.wait(self.interval):
+            self.run_once()
@@ -0,0 +1,63 @@
+"""
+Online database backup and restore.
+
+On SQLite, `create` copies the live database file with the online backup API in page steps,
+so the API keeps serving writes during the copy; `restore` overwrites the database with such a
+file. On PostgreSQL, `create` writes a directory of gzip-compressed COPY dumps plus a manifest,
+and `restore` loads it back in one transaction (stop the API first). Both log progress.
+
+    python -m app.backup create ./backups/recipes-2024-05-01.db
+    python -m app.backup restore ./backups/recipes-2024-05-01.db
+"""
+import argparse
+import logging
+
+from app.bulkload import storage_for
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def log_progress(label: str):
+    """A progress callback that logs every additional 10% of the work."""
+    reported = {"step": -1}
+
+    def progress(done: int, total: int) -> None:
+        step = done * 10 // total if total else 10
+        if step > reported["step"]:
+            reported["step"] = step
+            logger.info("%s: %d%% (%d/%d)", label, step * 10, done, total)
+
+    return progress
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=settings.DATABASE_URL, help="Defaults to DATABASE_URL.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="Back up the database to a file (SQLite) or directory.")
+    create.add_argument("dest")
+    restore = commands.add_parser("restore", help="Replace the database contents with a backup.")
+    restore.add_argument("src")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    storage = storage_for(args.database_url)
+    try:
+        if args.command == "create":
+            stats = storage.backup(args.dest, progress=log_progress("Backup"))
+        else:
+            stats = storage.restore(args.src, progress=log_progress("Restore"))
+    finally:
+        storage.close()
+    logger.info(
+        "%s %d bytes in %.2fs (%.1f MB/s)",
+        "Backed up" if args.command == "create" else "Restored",
+        stats.bytes,
+        stats.seconds,
+        stats.bytes_per_second / 1e6,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from app import models
+from app.config.settings import settings
+from app.rows import CategoryRow
+
+
+class CategoryCache:
+    """
+    Process-local snapshot of every category's `(id, name, description)`.
+
+    Categories are a small, hot, rarely-changing set, so the whole table is loaded at once and
+    served from memory for existence checks and for the `category` embedded in recipe responses.
+    Writes through `app.crud.category` call `invalidate()`; other processes pick changes up once
+    `ttl` seconds have passed, and a lookup for an unknown id always reloads before answering.
+
+    One snapshot is kept per database and tenant (`db.info["tenant"]`, as set on `TenantSession`s),
+    since ids are per shard and a tenant's session only sees its own categories.
+
+    Args:
+        ttl: Seconds a snapshot stays valid before the next lookup reloads it.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # (engine, tenant) -> (monotonic expiry, rows)
+        self._snapshots: Dict[Tuple[Engine, str], Tuple[float, Dict[int, CategoryRow]]] = {}
+        self._generation = 0
+
+    def invalidate(self) -> None:
+        """Drop every snapshot so the next lookups reload them."""
+        with self._lock:
+            self._generation += 1
+            self._snapshots = {}
+
+    def exists(self, db: Session, category_id: int) -> bool:
+        """Return True if the category exists, consulting the database only on a cache miss."""
+        return self._row(db, category_id) is not None
+
+    def get(self, db: Session, category_id: Optional[int]) -> Optional[CategoryRow]:
+        """Return the category's cached row, for read paths that do not need an ORM instance."""
+        if category_id is None:
+            return None
+        return self._row(db, category_id)
+
+    def attach(self, db: Session, category_id: Optional[int]) -> Optional[models.Category]:
+        """
+        Return a `Category` bound to `db` without querying for it.
+
+        The instance is merged into the session's identity map without a SELECT.
+        """
+        if category_id is None:
+            return None
+
+        key = identity_key(models.Category, category_id)
+        existing = db.identity_map.get(key)
+        if existing is not None:
+            return existing
+
+        row = self._row(db, category_id)
+        if row is None:
+            return None
+
+        category = models.Category(id=row.id, name=row.name, description=row.description)
+        make_transient_to_detached(category)
+        return db.merge(category, load=False)
+
+    def attach_to_recipes(self, db: Session, recipes: Iterable[models.Recipe]) -> None:
+        """Populate `recipe.category` from the cache so serializing the recipes needs no category queries."""
+        for recipe in recipes:
+            # The identity map only holds weak references, so the category has to be set on the recipe.
+            if "category" in inspect(recipe).unloaded:
+                set_committed_value(recipe, "category", self.attach(db, recipe.category_id))
+
+    def _row(self, db: Session, category_id: int) -> Optional[CategoryRow]:
+        # Write-queue sessions are bound to a connection; key by its engine either way.
+        key = (db.get_bind().engine, db.info.get("tenant", ""))
+        expires_at, rows = self._snapshots.get(key, (0.0, {}))
+        if time.monotonic() >= expires_at or category_id not in rows:
+            rows = self._reload(db, key)
+        return rows.get(category_id)
+
+    def _reload(self, db: Session, key: Tuple[Engine, str]) -> Dict[int, CategoryRow]:
+        generation = self._generation
+        # A `TenantSession` restricts this to the tenant's categories.
+        result = db.execute(select(models.Category.id, models.Category.name, models.Category.description))
+        rows = {row.id: CategoryRow(row.id, row.name, row.description) for row in result}
+        with self._lock:
+            # A write that invalidated the cache while we were reading wins; keep our rows for this
+            # lookup only and let the next one reload.
+            if generation == self._generation:
+                self._snapshots = {**self._snapshots, key: (time.monotonic() + self.ttl, rows)}
+        return rows
+
+
+category_cache = CategoryCache(ttl=settings.CATEGORY_CACHE_TTL)
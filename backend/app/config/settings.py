@@ -8,6 +8,90 @@ load_dotenv()
 class Settings:
     DATABASE_URL = os.getenv("DATABASE_URL")
 
+    # Serving: number of worker processes for `python -m app.server` (0 = one per CPU core).
+    HOST = os.getenv("HOST", "0.0.0.0")
+    PORT = int(os.getenv("PORT", "8000"))
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0"))
+    GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+
+    # Connection pool: DB_MAX_CONNECTIONS is the total budget shared by every worker (0 = unbounded).
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+    # Compiled SQL statements kept per engine; the app issues a few hundred distinct shapes (ORM
+    # UPDATEs vary with the set of changed columns), comfortably under this.
+    DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "1200"))
+
+    # Admission control: concurrent requests per route class (0 = share of the pool's capacity),
+    # queued requests per class, seconds one may wait, and the Retry-After sent when shedding load.
+    ADMISSION_READ_LIMIT = int(os.getenv("ADMISSION_READ_LIMIT", "0"))
+    ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", "0"))
+    ADMISSION_BULK_LIMIT = int(os.getenv("ADMISSION_BULK_LIMIT", "0"))
+    ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "100"))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+    ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+    # Database health monitor: seconds between background probes (0 probes only at startup), seconds
+    # a probe may take, consecutive failures that open the circuit breaker, and replica lag in seconds
+    # beyond which /health/ready reports not ready (0 ignores lag), and the Retry-After sent while open
+    # (also the seconds between the trial requests an open circuit lets through).
+    HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "5"))
+    HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+    HEALTH_FAILURE_THRESHOLD = int(os.getenv("HEALTH_FAILURE_THRESHOLD", "3"))
+    HEALTH_MAX_REPLICATION_LAG = float(os.getenv("HEALTH_MAX_REPLICATION_LAG", "0"))
+    HEALTH_RETRY_AFTER = int(os.getenv("HEALTH_RETRY_AFTER", "5"))
+
+    # Responses smaller than this many bytes are sent uncompressed.
+    COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+
+    # Seconds identical concurrent GETs wait on the in-flight one before running themselves (0 disables coalescing).
+    REQUEST_COALESCING_TIMEOUT = float(os.getenv("REQUEST_COALESCING_TIMEOUT", "5"))
+
+    # Seconds a process may serve its in-memory category snapshot before reloading it.
+    CATEGORY_CACHE_TTL = int(os.getenv("CATEGORY_CACHE_TTL", "60"))
+
+    # Seconds between full recomputes of the per-category counters (0 disables the job).
+    CATEGORY_STATS_RECONCILE_INTERVAL = int(os.getenv("CATEGORY_STATS_RECONCILE_INTERVAL", "300"))
+
+    # Seconds between write-behind flushes of buffered recipe view counts; a crash loses at most this
+    # much counting per worker (0 flushes only at shutdown).
+    VIEW_COUNT_FLUSH_INTERVAL = float(os.getenv("VIEW_COUNT_FLUSH_INTERVAL", "10"))
+
+    # On-demand request profiling: HMAC key for signed `X-Profile-Signature` headers and token for
+    # `X-Profile-Token` (the middleware is only installed if one is set), share of triggered requests
+    # profiled, seconds between stack samples, and where flamegraph files go and how many are kept.
+    PROFILING_SECRET = os.getenv("PROFILING_SECRET", "")
+    PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN", "")
+    PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "1"))
+    PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", "0.001"))
+    PROFILING_DIR = os.getenv("PROFILING_DIR", ".profiles")
+    PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "50"))
+
+    # Recipe change stream: events kept for Last-Event-ID resumption, events buffered per client
+    # before a slow client is disconnected, and idle seconds between keepalive comments.
+    EVENT_HISTORY_SIZE = int(os.getenv("EVENT_HISTORY_SIZE", "1000"))
+    EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "256"))
+    EVENT_KEEPALIVE = float(os.getenv("EVENT_KEEPALIVE", "15"))
+    # Log file carrying change events between the workers of one host, and seconds between reads of
+    # it (empty: in-process delivery; `python -m app.server` picks a file when it runs several workers).
+    EVENT_LOG_PATH = os.getenv("EVENT_LOG_PATH", "")
+    EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", "0.05"))
+
+    # Similar-recipes index: snapshot directory shared by all workers, seconds between rebuilds (0 disables).
+    SIMILARITY_INDEX_DIR = os.getenv("SIMILARITY_INDEX_DIR", ".similarity-index")
+    SIMILARITY_REBUILD_INTERVAL = int(os.getenv("SIMILARITY_REBUILD_INTERVAL", "600"))
+
+    # Seconds between full rebuilds of the in-memory facet snapshot behind /api/recipes/facets (0 disables).
+    FACET_REBUILD_INTERVAL = int(os.getenv("FACET_REBUILD_INTERVAL", "300"))
+
+    # Comma-separated database URLs of the tenant shards, in routing order, for `python -m app.rebalance`
+    # (empty when the catalog is not sharded). Only ever append: shards are identified by position.
+    SHARD_URLS = os.getenv("SHARD_URLS", "")
+
+    # Estimated Jaccard similarity (ingredients + instruction shingles) at which recipes count as duplicates.
+    DUPLICATE_SIMILARITY_THRESHOLD = float(os.getenv("DUPLICATE_SIMILARITY_THRESHOLD", "0.8"))
+
 
 settings = Settings()
 DATABASE_URL = settings.DATABASE_URL
@@ -0,0 +1,52 @@
+import threading
+from collections import Counter
+from typing import Dict
+
+from sqlalchemy.orm import Session
+
+from app import crud
+
+
+class ViewCounter:
+    """
+    Process-local buffer of recipe view increments, written behind in batches.
+
+    `increment` only touches a dict under a lock, so counting a view costs the request no
+    database work. `flush` swaps the buffer out and adds it to `recipe_stats` with one batched
+    upsert; if that fails, the counts are put back and retried on the next flush. Views counted
+    since the last successful flush are lost if the process dies without a clean shutdown, so
+    the loss is bounded by the flush interval.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+
+    def increment(self, recipe_id: int, views: int = 1) -> None:
+        with self._lock:
+            self._counts[recipe_id] += views
+
+    def pending(self) -> Dict[int, int]:
+        """Counts not yet flushed, by recipe id."""
+        with self._lock:
+            return dict(self._counts)
+
+    def flush(self, db: Session) -> int:
+        """Write the buffered counts and return how many views were stored."""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        try:
+            return crud.add_recipe_views(db, counts)
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._counts.update(counts)
+            raise
+
+    def reset(self) -> None:
+        """Discard buffered counts (tests)."""
+        with self._lock:
+            self._counts = Counter()
+
+
+view_counter = ViewCounter()
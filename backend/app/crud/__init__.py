@@ -1,22 +1,56 @@
-from app.crud.category import create_category, delete_category, get_categories, get_category, get_category_by_name, update_category
+from app.crud.category import (
+    category_exists,
+    create_category,
+    delete_category,
+    get_categories,
+    get_category,
+    get_category_by_name,
+    reconcile_category_stats,
+    update_category,
+    upsert_category,
+)
+from app.crud.duplicate import dedupe_recipes
 from app.crud.ingredient import create_ingredient, delete_ingredient, get_ingredient, get_ingredients_for_recipe, update_ingredient
-from app.crud.recipe import create_recipe, delete_recipe, get_recipe, get_recipes, update_recipe
+from app.crud.popularity import add_recipe_views, get_popular_recipes
+from app.crud.recipe import (
+    create_recipe,
+    delete_recipe,
+    delete_recipes,
+    find_duplicate_recipes,
+    get_recipe,
+    get_recipe_rows,
+    get_recipes,
+    get_recipes_by_ids,
+    get_similar_recipes,
+    update_recipe,
+)
 
 __all__ = [
+    "category_exists",
     "create_category",
     "delete_category",
     "get_categories",
     "get_category",
     "get_category_by_name",
+    "reconcile_category_stats",
     "update_category",
+    "upsert_category",
+    "dedupe_recipes",
     "create_ingredient",
     "delete_ingredient",
     "get_ingredient",
     "get_ingredients_for_recipe",
     "update_ingredient",
+    "add_recipe_views",
+    "get_popular_recipes",
     "create_recipe",
     "delete_recipe",
+    "delete_recipes",
+    "find_duplicate_recipes",
     "get_recipe",
+    "get_recipe_rows",
     "get_recipes",
+    "get_recipes_by_ids",
+    "get_similar_recipes",
     "update_recipe",
 ]
@@ -1,25 +1,114 @@
-from sqlalchemy.orm import Session
+from typing import Optional
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
 
 from app import models, schemas
+from app.cache import category_cache
+from app.models.category_stats import insert_stats_row
+
+# Dialects whose INSERT supports `ON CONFLICT ... RETURNING`; others fall back to a savepoint.
+_ON_CONFLICT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# Hot-path lookups built once: a reused statement keeps its memoized cache key, so executing it
+# skips both query construction and cache-key generation and goes straight to the compiled form.
+_CATEGORY_BY_ID = select(models.Category).where(models.Category.id == bindparam("category_id")).limit(1)
+_CATEGORY_BY_NAME = select(models.Category).where(models.Category.name == bindparam("name")).limit(1)
 
 
 def get_category(db: Session, category_id: int):
-    return db.query(models.Category).filter(models.Category.id == category_id).first()
+    return db.scalars(_CATEGORY_BY_ID, {"category_id": category_id}).first()
 
 
 def get_category_by_name(db: Session, name: str):
-    return db.query(models.Category).filter(models.Category.name == name).first()
+    return db.scalars(_CATEGORY_BY_NAME, {"name": name}).first()
 
 
 def get_categories(db: Session):
-    return db.query(models.Category).order_by(models.Category.name).all()
+    return db.query(models.Category).options(joinedload(models.Category.stats)).order_by(models.Category.name).all()
+
+
+def category_exists(db: Session, category_id: int, fresh: bool = False) -> bool:
+    """
+    Answer from the process-local category cache; only an unknown id reaches the database.
+
+    `fresh=True` reloads the cache first, for when a write has just shown it to be stale (another
+    process deleted the category within the cache's TTL).
+    """
+    if fresh:
+        category_cache.invalidate()
+    return category_cache.exists(db, category_id)
+
+
+def _category_values(db: Session, category_in: schemas.CategoryCreate) -> dict:
+    # Core INSERTs skip the flush-time tenant stamping of ShardedStorage sessions, so set it here.
+    return {**category_in.model_dump(), "tenant": db.info.get("tenant", "")}
+
+
+def create_category(db: Session, category_in: schemas.CategoryCreate) -> Optional[models.Category]:
+    """
+    Insert a category in a single statement, returning None if the name is already taken.
+
+    Uses `INSERT ... ON CONFLICT (tenant, name) DO NOTHING RETURNING` where supported, so concurrent
+    creates of the same name cannot both succeed and no pre-check query is needed.
+    """
+    values = _category_values(db, category_in)
+    dialect_insert = _ON_CONFLICT_INSERTS.get(db.get_bind().dialect.name)
+
+    if dialect_insert is None:
+        category = models.Category(**values)
+        try:
+            with db.begin_nested():
+                db.add(category)
+        except IntegrityError:
+            db.rollback()
+            return None
+    else:
+        statement = (
+            dialect_insert(models.Category)
+            .values(**values)
+            .on_conflict_do_nothing(index_elements=[models.Category.tenant, models.Category.name])
+            .returning(models.Category)
+        )
+        category = db.scalars(statement).first()
+        if category is None:
+            db.rollback()
+            return None
+        insert_stats_row(db.connection(), category.id)
+
+    db.commit()
+    category_cache.invalidate()
+    return category
 
 
-def create_category(db: Session, category_in: schemas.CategoryCreate):
-    category = models.Category(**category_in.model_dump())
-    db.add(category)
+def upsert_category(db: Session, category_in: schemas.CategoryCreate) -> models.Category:
+    """Create the category, or update the description of the existing one with the same name."""
+    values = _category_values(db, category_in)
+    dialect_insert = _ON_CONFLICT_INSERTS.get(db.get_bind().dialect.name)
+
+    if dialect_insert is None:
+        category = get_category_by_name(db, category_in.name)
+        if category is None:
+            return create_category(db, category_in) or get_category_by_name(db, category_in.name)
+        category.description = category_in.description
+    else:
+        statement = dialect_insert(models.Category).values(**values)
+        statement = (
+            statement.on_conflict_do_update(
+                index_elements=[models.Category.tenant, models.Category.name],
+                set_={"description": statement.excluded.description},
+            )
+            .returning(models.Category)
+            .execution_options(populate_existing=True)
+        )
+        category = db.scalars(statement).one()
+        stats_statement = dialect_insert(models.CategoryStats).values(category_id=category.id).on_conflict_do_nothing()
+        db.execute(stats_statement)
+
     db.commit()
-    db.refresh(category)
+    category_cache.invalidate()
     return category
 
 
@@ -27,10 +116,44 @@ def update_category(db: Session, db_category: models.Category, category_in: sche
     for field, value in category_in.model_dump(exclude_unset=True).items():
         setattr(db_category, field, value)
     db.commit()
-    db.refresh(db_category)
+    category_cache.invalidate()
     return db_category
 
 
 def delete_category(db: Session, db_category: models.Category):
     db.delete(db_category)
     db.commit()
+    category_cache.invalidate()
+
+
+def reconcile_category_stats(db: Session) -> None:
+    """
+    Recompute every `category_stats` row from `recipes`.
+
+    The ORM events in `app.models.category_stats` keep the counters current; this is the
+    periodic safety net for drift from writes that bypass the ORM. It runs as two
+    statements in one transaction so concurrent increments are never lost.
+    """
+    stats = models.CategoryStats.__table__
+    recipes = models.Recipe.__table__
+
+    db.execute(
+        insert(stats).from_select(
+            ["category_id"],
+            select(models.Category.id).where(~models.Category.id.in_(select(stats.c.category_id))),
+        )
+    )
+
+    def aggregate(expression):
+        return select(expression).where(recipes.c.category_id == stats.c.category_id).scalar_subquery()
+
+    db.execute(
+        update(stats).values(
+            recipe_count=aggregate(func.count(recipes.c.id)),
+            prep_time_total=aggregate(func.coalesce(func.sum(recipes.c.prep_time), 0)),
+            prep_time_count=aggregate(func.count(recipes.c.prep_time)),
+            cook_time_total=aggregate(func.coalesce(func.sum(recipes.c.cook_time), 0)),
+            cook_time_count=aggregate(func.count(recipes.c.cook_time)),
+        )
+    )
+    db.commit()
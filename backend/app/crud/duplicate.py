@@ -0,0 +1,247 @@
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import and_, bindparam, delete, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app import minhash, models
+from app.config.settings import settings
+
+Band = models.RecipeMinHashBand
+
+
+def _lookup_candidates(db: Session, signature: np.ndarray) -> list:
+    """Recipes sharing at least one LSH bucket with the signature, with their own signatures."""
+    in_any_bucket = or_(*(and_(Band.band == band, Band.bucket == bucket) for band, bucket in minhash.band_buckets(signature)))
+    statement = (
+        select(models.Recipe.id, models.Recipe.duplicate_of_id, models.Recipe.minhash)
+        .join(Band, Band.recipe_id == models.Recipe.id)
+        .where(in_any_bucket)
+        .distinct()
+    )
+    return db.execute(statement).all()
+
+
+def _score(signature: np.ndarray, candidates: list, exclude_id: Optional[int]) -> List[Tuple[int, Optional[int], float]]:
+    """`(id, duplicate_of_id, similarity)` of candidates at or above the threshold, most similar first."""
+    candidates = [row for row in candidates if row.id != exclude_id and row.minhash]
+    if not candidates:
+        return []
+    scores = minhash.similarity(signature, np.stack([minhash.from_bytes(row.minhash) for row in candidates]))
+    matches = [
+        (row.id, row.duplicate_of_id, float(score))
+        for row, score in zip(candidates, scores)
+        if score >= settings.DUPLICATE_SIMILARITY_THRESHOLD
+    ]
+    return sorted(matches, key=lambda match: -match[2])
+
+
+def fingerprint_recipe(db: Session, recipe: models.Recipe, ingredient_names: Iterable[str]) -> Optional[np.ndarray]:
+    """
+    Compute `recipe.minhash` and flag `recipe.duplicate_of_id` before the recipe is flushed.
+
+    A recipe is only ever marked as a copy of an older one (lower id), pointing at the original
+    of that recipe's own cluster, so the links never form cycles. Call `store_bands` once the
+    recipe has an id.
+
+    Returns:
+        The signature, or None when the recipe has nothing to fingerprint.
+    """
+    signature = minhash.signature(minhash.recipe_shingles(ingredient_names, recipe.instructions))
+    recipe.minhash = signature.tobytes() if signature is not None else b""
+    if signature is None:
+        recipe.duplicate_of_id = None
+        return None
+
+    originals = [
+        duplicate_of_id or match_id
+        for match_id, duplicate_of_id, _ in _score(signature, _lookup_candidates(db, signature), exclude_id=recipe.id)
+    ]
+    if recipe.id is not None:
+        originals = [original for original in originals if original < recipe.id]
+    recipe.duplicate_of_id = min(originals) if originals else None
+    return signature
+
+
+def store_bands(db: Session, recipe_id: int, signature: Optional[np.ndarray], replace: bool = True) -> None:
+    """File a recipe's signature in the LSH index, dropping its previous buckets unless it is new."""
+    if replace:
+        db.execute(delete(Band).where(Band.recipe_id == recipe_id))
+    if signature is not None:
+        rows = [{"recipe_id": recipe_id, "band": band, "bucket": bucket} for band, bucket in minhash.band_buckets(signature)]
+        db.execute(insert(Band), rows)
+
+
+def lookup_duplicates(db: Session, signature: np.ndarray, exclude_id: Optional[int] = None) -> List[Tuple[int, float]]:
+    """`(recipe_id, estimated Jaccard similarity)` of indexed near-duplicates of a signature, most similar first."""
+    matches = _score(signature, _lookup_candidates(db, signature), exclude_id=exclude_id)
+    return [(match_id, score) for match_id, _, score in matches]
+
+
+def _backfill_signatures(db: Session, batch_size: int) -> int:
+    """Fingerprint recipes that have no signature yet, `batch_size` at a time."""
+    table = models.Recipe.__table__
+    filled = 0
+    last_id = 0
+    while True:
+        batch = db.execute(
+            select(table.c.id, table.c.instructions)
+            .where(table.c.minhash.is_(None), table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            return filled
+
+        names: Dict[int, List[str]] = defaultdict(list)
+        ingredient_rows = db.execute(
+            select(models.Ingredient.recipe_id, models.Ingredient.name).where(
+                models.Ingredient.recipe_id.in_([row.id for row in batch])
+            )
+        )
+        for recipe_id, name in ingredient_rows:
+            names[recipe_id].append(name)
+
+        signatures = {row.id: minhash.signature(minhash.recipe_shingles(names[row.id], row.instructions)) for row in batch}
+        db.execute(
+            update(table).where(table.c.id == bindparam("b_id")).values(minhash=bindparam("b_minhash")),
+            [
+                {"b_id": recipe_id, "b_minhash": signature.tobytes() if signature is not None else b""}
+                for recipe_id, signature in signatures.items()
+            ],
+        )
+        db.execute(delete(Band).where(Band.recipe_id.in_(list(signatures))))
+        band_rows = [
+            {"recipe_id": recipe_id, "band": band, "bucket": bucket}
+            for recipe_id, signature in signatures.items()
+            if signature is not None
+            for band, bucket in minhash.band_buckets(signature)
+        ]
+        if band_rows:
+            db.execute(insert(Band), band_rows)
+        db.commit()
+
+        filled += len(batch)
+        last_id = batch[-1].id
+
+
+def _shared_buckets(db: Session) -> List[List[int]]:
+    """Recipe ids, ascending, of every LSH bucket shared by more than one recipe."""
+    shared = (
+        select(Band.band, Band.bucket).group_by(Band.band, Band.bucket).having(func.count() > 1).subquery()
+    )
+    rows = db.execute(
+        select(Band.band, Band.bucket, Band.recipe_id)
+        .join(shared, and_(shared.c.band == Band.band, shared.c.bucket == Band.bucket))
+        .order_by(Band.band, Band.bucket, Band.recipe_id)
+    )
+
+    buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for band, bucket, recipe_id in rows:
+        buckets[(band, bucket)].append(recipe_id)
+    return list(buckets.values())
+
+
+def _pair_arrays(pairs: Iterable[Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+    pairs = sorted(set(pairs))
+    if not pairs:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    left, right = np.array(pairs, dtype=np.int64).T
+    return left, right
+
+
+def _similar_pairs(
+    buckets: List[List[int]], similar: Callable[[np.ndarray, np.ndarray], np.ndarray]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pairs of bucket members that `similar` confirms, enough to link every cluster.
+
+    Each member is compared once with its bucket's representative (the lowest id), so a large
+    cluster of near-identical recipes costs one comparison per member rather than one per pair.
+    Members that do not match the representative may still match each other or a member that
+    does; only those are compared with the rest of their bucket.
+    """
+    left, right = _pair_arrays((members[0], member) for members in buckets for member in members[1:])
+    if not len(left):
+        return left, right
+    matched = similar(left, right)
+
+    unmatched = set(zip(left[~matched].tolist(), right[~matched].tolist()))
+    fallback: Set[Tuple[int, int]] = set()
+    for members in buckets:
+        outliers = [member for member in members[1:] if (members[0], member) in unmatched]
+        for outlier in outliers:
+            fallback.update((min(outlier, other), max(outlier, other)) for other in members[1:] if other != outlier)
+    extra_left, extra_right = _pair_arrays(fallback)
+    confirmed = similar(extra_left, extra_right) if len(extra_left) else np.zeros(0, dtype=bool)
+    return (
+        np.concatenate((left[matched], extra_left[confirmed])),
+        np.concatenate((right[matched], extra_right[confirmed])),
+    )
+
+
+def _originals(left: np.ndarray, right: np.ndarray) -> Dict[int, int]:
+    """Map every recipe in a duplicate cluster, except its lowest id, to that lowest id."""
+    parent: Dict[int, int] = {}
+
+    def root(recipe_id: int) -> int:
+        parent.setdefault(recipe_id, recipe_id)
+        while parent[recipe_id] != recipe_id:
+            parent[recipe_id] = parent[parent[recipe_id]]
+            recipe_id = parent[recipe_id]
+        return recipe_id
+
+    for a, b in zip(left.tolist(), right.tolist()):
+        root_a, root_b = root(a), root(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    return {recipe_id: root(recipe_id) for recipe_id in list(parent) if root(recipe_id) != recipe_id}
+
+
+def dedupe_recipes(db: Session, batch_size: int = 1000) -> int:
+    """
+    Recompute `duplicate_of_id` for the whole catalog and return how many recipes are flagged.
+
+    Backfills missing signatures first, then verifies recipes that share an LSH bucket against
+    the similarity threshold (vectorized, see `_similar_pairs` for which pairs) and links each
+    cluster of near-duplicates to its oldest member. Rows whose flag changes get their
+    `version` bumped like any other edit.
+    """
+    _backfill_signatures(db, batch_size)
+
+    buckets = _shared_buckets(db)
+    originals: Dict[int, int] = {}
+    if buckets:
+        ids = np.unique(np.concatenate([np.asarray(members, dtype=np.int64) for members in buckets]))
+        signatures: Dict[int, np.ndarray] = {}
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start : start + batch_size].tolist()
+            for recipe_id, value in db.execute(select(models.Recipe.id, models.Recipe.minhash).where(models.Recipe.id.in_(chunk))):
+                signatures[recipe_id] = minhash.from_bytes(value)
+
+        # Only fingerprinted recipes are filed in buckets, so every member has a signature.
+        matrix = np.stack([signatures[recipe_id] for recipe_id in ids.tolist()])
+
+        def similar(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+            scores = (matrix[np.searchsorted(ids, left)] == matrix[np.searchsorted(ids, right)]).mean(axis=1)
+            return scores >= settings.DUPLICATE_SIMILARITY_THRESHOLD
+
+        originals = _originals(*_similar_pairs(buckets, similar))
+
+    table = models.Recipe.__table__
+    current = dict(db.execute(select(table.c.id, table.c.duplicate_of_id).where(table.c.duplicate_of_id.is_not(None))).all())
+    changes = [
+        {"b_id": recipe_id, "b_duplicate_of_id": originals.get(recipe_id)}
+        for recipe_id in set(current) | set(originals)
+        if current.get(recipe_id) != originals.get(recipe_id)
+    ]
+    if changes:
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(duplicate_of_id=bindparam("b_duplicate_of_id"), version=table.c.version + 1),
+            changes,
+        )
+    db.commit()
+    return len(originals)
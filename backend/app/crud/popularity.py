@@ -0,0 +1,64 @@
+from typing import List, Mapping, Tuple
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.crud.category import _ON_CONFLICT_INSERTS
+from app.crud.recipe import get_recipes_by_ids
+
+Stats = models.RecipeStats
+
+
+def add_recipe_views(db: Session, counts: Mapping[int, int]) -> int:
+    """
+    Add buffered view counts to `recipe_stats` in one batched upsert and commit.
+
+    Recipes deleted since they were viewed are skipped. Returns the number of views written.
+    """
+    if not counts:
+        return 0
+
+    existing = set(db.scalars(select(models.Recipe.id).where(models.Recipe.id.in_(list(counts)))))
+    rows = [{"recipe_id": recipe_id, "view_count": views} for recipe_id, views in counts.items() if recipe_id in existing]
+    if not rows:
+        return 0
+
+    table = Stats.__table__
+    dialect_insert = _ON_CONFLICT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        known = set(db.scalars(select(table.c.recipe_id).where(table.c.recipe_id.in_([row["recipe_id"] for row in rows]))))
+        updates = [{"b_id": row["recipe_id"], "b_views": row["view_count"]} for row in rows if row["recipe_id"] in known]
+        if updates:
+            db.execute(
+                update(table)
+                .where(table.c.recipe_id == bindparam("b_id"))
+                .values(view_count=table.c.view_count + bindparam("b_views")),
+                updates,
+            )
+        inserts = [row for row in rows if row["recipe_id"] not in known]
+        if inserts:
+            db.execute(table.insert(), inserts)
+    else:
+        statement = dialect_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.recipe_id],
+            set_={"view_count": table.c.view_count + statement.excluded.view_count},
+        )
+        # executemany: one compiled statement whatever the batch size.
+        db.execute(statement, rows)
+
+    db.commit()
+    return sum(row["view_count"] for row in rows)
+
+
+def get_popular_recipes(db: Session, limit: int) -> List[Tuple[models.Recipe, int]]:
+    """Return up to `limit` recipes with the most flushed views, paired with their count, most viewed first."""
+    ranking = db.execute(
+        select(Stats.recipe_id, Stats.view_count)
+        .where(Stats.view_count > 0)
+        .order_by(Stats.view_count.desc(), Stats.recipe_id.desc())
+        .limit(limit)
+    ).all()
+    recipes_by_id = {recipe.id: recipe for recipe in get_recipes_by_ids(db, [row.recipe_id for row in ranking])}
+    return [(recipes_by_id[row.recipe_id], row.view_count) for row in ranking if row.recipe_id in recipes_by_id]
@@ -1,19 +1,166 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, delete, insert, select
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app import models, schemas
+from app import minhash
+from app.cache import category_cache
+from app.database import after_commit
+from app.crud.duplicate import fingerprint_recipe, lookup_duplicates, store_bands
+from app.events import CREATED, DELETED, UPDATED, recipe_events
+from app.facets import facet_index
+from app.models.category_stats import subtract_deleted_recipes
+from app.rows import INGREDIENT_COLUMNS, RECIPE_COLUMNS, IngredientRow, RecipeRow
+from app.similarity import similarity_index
+
+# Built once so every call reuses its cache key and compiled form (see `app.crud.category`).
+_RECIPE_BY_ID = select(models.Recipe).where(models.Recipe.id == bindparam("recipe_id")).limit(1)
 
 
 def get_recipe(db: Session, recipe_id: int) -> Optional[models.Recipe]:
-    return db.query(models.Recipe).filter(models.Recipe.id == recipe_id).first()
+    recipe = db.scalars(_RECIPE_BY_ID, {"recipe_id": recipe_id}).first()
+    if recipe is not None:
+        category_cache.attach_to_recipes(db, [recipe])
+    return recipe
 
 
 def get_recipes(db: Session, category_id: Optional[int] = None) -> List[models.Recipe]:
     query = db.query(models.Recipe)
     if category_id is not None:
         query = query.filter(models.Recipe.category_id == category_id)
-    return query.order_by(models.Recipe.created_at.desc()).all()
+    recipes = query.order_by(models.Recipe.created_at.desc()).all()
+    category_cache.attach_to_recipes(db, recipes)
+    return recipes
+
+
+def get_recipe_rows(db: Session, category_id: Optional[int] = None) -> List[RecipeRow]:
+    """
+    Read-only variant of `get_recipes` for listings, returning plain rows instead of ORM instances.
+
+    Nothing enters the session's identity map or gets change tracking. Ingredients come from one
+    more query and are grouped onto their recipes as `IngredientRow` tuples in a single pass;
+    categories come from the cache.
+    """
+    recipes_table = models.Recipe.__table__
+    ingredients_table = models.Ingredient.__table__
+
+    recipe_statement = select(*(recipes_table.c[name] for name in RECIPE_COLUMNS))
+    ingredient_statement = select(*(ingredients_table.c[name] for name in INGREDIENT_COLUMNS))
+    # Plain-table SELECTs skip the tenant filter of ShardedStorage sessions, so add it here.
+    conditions = [recipes_table.c.tenant == db.info["tenant"]] if "tenant" in db.info else []
+    if category_id is not None:
+        conditions.append(recipes_table.c.category_id == category_id)
+    if conditions:
+        recipe_statement = recipe_statement.where(*conditions)
+        ingredient_statement = ingredient_statement.where(
+            ingredients_table.c.recipe_id.in_(select(recipes_table.c.id).where(*conditions))
+        )
+    recipe_statement = recipe_statement.order_by(recipes_table.c.created_at.desc())
+
+    recipes = [RecipeRow(*row) for row in db.execute(recipe_statement)]
+    by_id = {recipe.id: recipe.ingredients for recipe in recipes}
+    for row in db.execute(ingredient_statement.order_by(ingredients_table.c.id)):
+        ingredients = by_id.get(row[1])
+        # A recipe inserted between the two queries is not listed; skip its ingredients.
+        if ingredients is not None:
+            ingredients.append(IngredientRow(*row))
+    for recipe in recipes:
+        recipe.category = category_cache.get(db, recipe.category_id)
+    return recipes
+
+
+def get_recipes_by_ids(db: Session, recipe_ids: Sequence[int]) -> List[models.Recipe]:
+    """Fetch many recipes with one `IN` query plus one for their ingredients; categories come from the cache."""
+    if not recipe_ids:
+        return []
+
+    statement = select(models.Recipe).where(models.Recipe.id.in_(recipe_ids)).options(selectinload(models.Recipe.ingredients))
+    recipes = list(db.scalars(statement))
+    category_cache.attach_to_recipes(db, recipes)
+    return recipes
+
+
+def get_similar_recipes(db: Session, recipe_id: int, k: int) -> Optional[List[Tuple[models.Recipe, float]]]:
+    """
+    Return up to `k` recipes most similar to the given one, paired with their cosine score, best first.
+
+    Returns None if the recipe does not exist. Recipes the index does not know yet are vectorized
+    from the database on the fly.
+    """
+    neighbours = similarity_index.similar(recipe_id, k)
+    if neighbours is None:
+        recipe = get_recipe(db, recipe_id)
+        if recipe is None:
+            return None
+        names = [ingredient.name for ingredient in recipe.ingredients]
+        neighbours = similarity_index.similar_to(recipe.title, names, k, exclude=recipe_id)
+
+    recipes_by_id = {recipe.id: recipe for recipe in get_recipes_by_ids(db, [neighbour_id for neighbour_id, _ in neighbours])}
+    # Neighbours deleted by another worker since the last rebuild simply drop out.
+    return [(recipes_by_id[neighbour_id], score) for neighbour_id, score in neighbours if neighbour_id in recipes_by_id]
+
+
+def find_duplicate_recipes(db: Session, recipe_id: int) -> Optional[List[Tuple[models.Recipe, float]]]:
+    """
+    Return near-duplicates of the given recipe, paired with their estimated Jaccard similarity, most similar first.
+
+    Returns None if the recipe does not exist.
+    """
+    row = db.execute(select(models.Recipe.id, models.Recipe.minhash).where(models.Recipe.id == recipe_id)).first()
+    if row is None:
+        return None
+
+    signature = minhash.from_bytes(row.minhash)
+    if row.minhash is None:
+        # Written outside the ORM and not yet backfilled by the dedup job; fingerprint it now.
+        recipe = get_recipe(db, recipe_id)
+        names = [ingredient.name for ingredient in recipe.ingredients]
+        signature = minhash.signature(minhash.recipe_shingles(names, recipe.instructions))
+    if signature is None:
+        return []
+
+    matches = lookup_duplicates(db, signature, exclude_id=recipe_id)
+    recipes_by_id = {recipe.id: recipe for recipe in get_recipes_by_ids(db, [match_id for match_id, _ in matches])}
+    return [(recipes_by_id[match_id], score) for match_id, score in matches if match_id in recipes_by_id]
+
+
+def _insert_ingredients(db: Session, recipe: models.Recipe, ingredients_data: List[dict]) -> None:
+    """
+    Insert a recipe's ingredients with one INSERT ... RETURNING and attach them as its collection.
+
+    The returned rows become the loaded `recipe.ingredients`, so serializing the recipe afterwards
+    needs no further query.
+    """
+    rows = [
+        {"recipe_id": recipe.id, "name": item["name"], "amount": item.get("amount"), "unit": item.get("unit")}
+        for item in ingredients_data
+    ]
+    # render_nulls keeps every row's parameter set identical so they batch into a single statement.
+    statement = insert(models.Ingredient).returning(models.Ingredient).execution_options(render_nulls=True)
+    created = list(db.scalars(statement, rows)) if rows else []
+    set_committed_value(recipe, "ingredients", sorted(created, key=lambda ingredient: ingredient.id))
+
+
+def _event_data(recipe: models.Recipe) -> dict:
+    # Enough for a client to decide whether to refetch; the recipe itself is one GET away.
+    return {"id": recipe.id, "version": recipe.version, "category_id": recipe.category_id}
+
+
+def _announce_recipe(kind: str, recipe: models.Recipe, reindex_text: bool) -> None:
+    # Run through `after_commit`, so the indexes and subscribers never see a write that rolled back.
+    if reindex_text:
+        similarity_index.update(recipe)
+    facet_index.update(recipe)
+    recipe_events.publish(kind, _event_data(recipe))
+
+
+def _announce_deleted(recipe_ids: List[int]) -> None:
+    similarity_index.forget(recipe_ids)
+    facet_index.forget(recipe_ids)
+    recipe_events.publish(DELETED, {"ids": recipe_ids})
 
 
 def create_recipe(db: Session, recipe_in: schemas.RecipeCreate) -> models.Recipe:
@@ -26,15 +173,17 @@ def create_recipe(db: Session, recipe_in: schemas.RecipeCreate) -> models.Recipe
         servings=recipe_in.servings,
         category_id=recipe_in.category_id,
     )
-
-    recipe.ingredients = [
-        models.Ingredient(name=ingredient.name, amount=ingredient.amount, unit=ingredient.unit)
-        for ingredient in recipe_in.ingredients
-    ]
+    category = category_cache.attach(db, recipe_in.category_id)
+    if category is not None:
+        recipe.category = category
+    signature = fingerprint_recipe(db, recipe, (ingredient.name for ingredient in recipe_in.ingredients))
 
     db.add(recipe)
+    db.flush()
+    _insert_ingredients(db, recipe, [ingredient.model_dump() for ingredient in recipe_in.ingredients])
+    store_bands(db, recipe.id, signature, replace=False)
     db.commit()
-    db.refresh(recipe)
+    after_commit(db, lambda: _announce_recipe(CREATED, recipe, reindex_text=True))
     return recipe
 
 
@@ -42,22 +191,72 @@ def update_recipe(db: Session, db_recipe: models.Recipe, recipe_in: schemas.Reci
     data = recipe_in.model_dump(exclude_unset=True)
     ingredients_data = data.pop("ingredients", None)
 
+    if "category_id" in data:
+        category = category_cache.attach(db, data["category_id"])
+        if category is not None or data["category_id"] is None:
+            # Assign the relationship, not just the key, so the in-memory `category` matches what is saved.
+            db_recipe.category = category
+            del data["category_id"]
+
     for field, value in data.items():
         setattr(db_recipe, field, value)
 
+    # Always touch the row so ingredient-only edits still bump `updated_at` and `version`.
+    db_recipe.updated_at = datetime.utcnow()
+
+    refingerprint = ingredients_data is not None or "instructions" in data
+    if refingerprint:
+        names = [item["name"] for item in ingredients_data] if ingredients_data is not None else [
+            ingredient.name for ingredient in db_recipe.ingredients
+        ]
+        signature = fingerprint_recipe(db, db_recipe, names)
+
+    db.flush()
+
     if ingredients_data is not None:
         # Replace the entire ingredient collection to keep DB state aligned with the submitted payload.
-        db_recipe.ingredients.clear()
-        for ingredient in ingredients_data:
-            db_recipe.ingredients.append(
-                models.Ingredient(name=ingredient["name"], amount=ingredient.get("amount"), unit=ingredient.get("unit"))
-            )
+        db.execute(delete(models.Ingredient).where(models.Ingredient.recipe_id == db_recipe.id))
+        _insert_ingredients(db, db_recipe, ingredients_data)
+    if refingerprint:
+        store_bands(db, db_recipe.id, signature)
 
     db.commit()
-    db.refresh(db_recipe)
+    reindex_text = "title" in data or ingredients_data is not None
+    after_commit(db, lambda: _announce_recipe(UPDATED, db_recipe, reindex_text))
     return db_recipe
 
 
 def delete_recipe(db: Session, db_recipe: models.Recipe):
     db.delete(db_recipe)
     db.commit()
+    after_commit(db, lambda: _announce_deleted([db_recipe.id]))
+
+
+def delete_recipes(db: Session, recipe_ids: Sequence[int]) -> List[int]:
+    """
+    Delete many recipes with one set-based statement and return the ids that existed.
+
+    Ingredients go with them through `ON DELETE CASCADE`. The deleted rows come back via
+    RETURNING (a SELECT first on dialects without it) so the category counters can be adjusted.
+    """
+    if not recipe_ids:
+        return []
+
+    columns = (models.Recipe.id, models.Recipe.category_id, models.Recipe.prep_time, models.Recipe.cook_time)
+    condition = models.Recipe.id.in_(recipe_ids)
+    if "tenant" in db.info:
+        # Bulk DELETEs skip the tenant filter of ShardedStorage sessions; another tenant's ids are left alone.
+        condition = condition & (models.Recipe.tenant == db.info["tenant"])
+
+    if db.get_bind().dialect.delete_returning:
+        deleted = db.execute(delete(models.Recipe).where(condition).returning(*columns)).all()
+    else:
+        deleted = db.execute(select(*columns).where(condition).with_for_update()).all()
+        db.execute(delete(models.Recipe).where(condition))
+
+    subtract_deleted_recipes(db.connection(), ((row.category_id, row.prep_time, row.cook_time) for row in deleted))
+    db.commit()
+    deleted_ids = [row.id for row in deleted]
+    if deleted_ids:
+        after_commit(db, lambda: _announce_deleted(deleted_ids))
+    return deleted_ids
@@ -1,13 +1,89 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+import sqlite3
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
 
 from app.config.settings import settings
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def engine_options(database_url: str) -> Dict[str, Any]:
+    """Return pool and statement-cache keyword arguments for `create_engine` based on the current settings."""
+    if make_url(database_url).get_backend_name() == "sqlite":
+        # SQLite has no server-side connection limit; keep SQLAlchemy's default pool for it.
+        return {"query_cache_size": settings.DB_QUERY_CACHE_SIZE}
+
+    return {
+        "query_cache_size": settings.DB_QUERY_CACHE_SIZE,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+
+@event.listens_for(Engine, "connect")
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores ON DELETE CASCADE / SET NULL unless foreign keys are switched on per connection.
+    # Registered for every engine, so storage backends and their shards enforce them too.
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+
+# Objects keep their flushed state after commit so write endpoints can serialize what they just
+# wrote without a refresh SELECT; sessions are request-scoped, so nothing goes stale.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 Base = declarative_base()
 
 
+def dispose_engine_after_fork() -> None:
+    """
+    Drop pooled connections inherited from a parent process.
+
+    Must be called in a freshly forked worker before it touches the database. Using
+    `close=False` leaves the parent's sockets alone so they are not shut down underneath it.
+    """
+    engine.dispose(close=False)
+
+
+def pool_capacity() -> Optional[int]:
+    """Most connections the engine's pool will hand out at once, or None if it is not bounded."""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool) or pool._max_overflow < 0:
+        return None
+    return pool.size() + pool._max_overflow
+
+
+def pool_statistics() -> Dict[str, Optional[int]]:
+    """Current occupancy of the engine's pool (only `capacity` for pools that do not track it)."""
+    pool = engine.pool
+    statistics = {"capacity": pool_capacity()}
+    if isinstance(pool, QueuePool):
+        statistics.update(size=pool.size(), checked_out=pool.checkedout(), overflow=max(pool.overflow(), 0))
+    elif isinstance(pool, StaticPool):
+        # One connection shared by every checkout, so there is no count of them to report.
+        statistics.update(size=1, checked_out=None, overflow=0)
+    return statistics
+
+
+def after_commit(db: Session, effect: Callable[[], None]) -> None:
+    """
+    Run `effect` (index updates, change events) once the session's writes are durable.
+
+    Usually that is right away, after `db.commit()`. A session whose commit only releases a
+    savepoint of a larger transaction, like the jobs of `SQLiteWriteQueue`, carries a list under
+    `db.info["after_commit"]`; the effect is queued there and runs only if that transaction commits.
+    """
+    pending = db.info.get("after_commit")
+    if pending is None:
+        effect()
+    else:
+        pending.append(effect)
+
+
 def get_db():
     db = SessionLocal()
     try:
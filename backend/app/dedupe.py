@@ -0,0 +1,35 @@
+"""
+Batch near-duplicate detection over the whole recipe catalog.
+
+Fingerprints recipes that have no MinHash signature yet (e.g. rows bulk-loaded outside the ORM),
+then recomputes `recipes.duplicate_of_id` from the LSH index. Run after large imports:
+
+    python -m app.dedupe --batch-size 1000
+"""
+import argparse
+import logging
+import time
+
+from app import crud
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Recipes fingerprinted per transaction.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        flagged = crud.dedupe_recipes(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    logger.info("Flagged %d near-duplicate recipes in %.1fs", flagged, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+import asyncio
+import fcntl
+import itertools
+import json
+import os
+import secrets
+import threading
+from contextlib import contextmanager
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from app.config.settings import settings
+
+CREATED, UPDATED, DELETED, RESET = "created", "updated", "deleted", "reset"
+
+# Milliseconds an EventSource waits before reconnecting, sent as the stream's `retry:` field.
+RECONNECT_DELAY_MS = 2000
+
+
+class RecipeEvent:
+    """One change notification, encoded once as an SSE frame and shared by every subscriber."""
+
+    __slots__ = ("id", "kind", "data", "frame")
+
+    def __init__(self, id: str, kind: str, data: dict) -> None:
+        self.id = id
+        self.kind = kind
+        self.data = data
+        self.frame = f"id: {id}\nevent: {kind}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class Broadcaster(ABC):
+    """
+    Carries recipe events to every worker process's `RecipeEventHub`.
+
+    `publish` may be called from any thread. The broadcaster assigns each event its id, in one
+    order that all workers observe, and hands it to every hub registered through `connect`.
+    `LocalBroadcaster` delivers within one process; `FileLogBroadcaster` between the workers of
+    one host. Across hosts, an implementation over Redis pub/sub or PostgreSQL LISTEN/NOTIFY
+    would deliver from its listener thread.
+    """
+
+    # Whether each process must call `poll` periodically to receive events.
+    needs_polling = False
+
+    @abstractmethod
+    def connect(self, deliver: Callable[[RecipeEvent], None]) -> None:
+        ...
+
+    @abstractmethod
+    def publish(self, kind: str, data: dict) -> None:
+        ...
+
+    def poll(self) -> None:
+        """Deliver events published by other processes since the last call."""
+
+
+class LocalBroadcaster(Broadcaster):
+    """
+    Delivers events synchronously to the hubs of this process only.
+
+    Ids are `<epoch>-<sequence>`, with a random epoch per instance, so a client resuming with an
+    id from another process or an earlier run is told to reload rather than replayed the wrong
+    events. Behind several workers, clients would only hear about writes their own worker served,
+    so `python -m app.server` switches to `FileLogBroadcaster` when it runs more than one.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._epoch = secrets.token_hex(4)
+        self._sequence = itertools.count(1)
+        self._deliver: List[Callable[[RecipeEvent], None]] = []
+
+    def connect(self, deliver: Callable[[RecipeEvent], None]) -> None:
+        self._deliver.append(deliver)
+
+    def publish(self, kind: str, data: dict) -> None:
+        # Numbering and delivery under one lock keep every hub's history in id order.
+        with self._lock:
+            event = RecipeEvent(f"{self._epoch}-{next(self._sequence)}", kind, data)
+            for deliver in self._deliver:
+                deliver(event)
+
+
+class FileLogBroadcaster(Broadcaster):
+    """
+    Delivers events to the hubs of every worker process on this host through an append-only file.
+
+    `publish` appends the event as one JSON line while holding an exclusive `flock` on
+    `<path>.lock`, which puts all processes' events in one order; `poll` (run periodically by
+    every worker, see `needs_polling`) reads the lines appended since its last call and delivers
+    them, this process's own included, so every hub sees the same ids in the same order. Reads
+    use `pread` at a per-process offset, so descriptors inherited across `fork` stay independent.
+
+    Ids are `<epoch>-<offset>`, the epoch being random per log file. Once the log reaches
+    `max_bytes`, the next publisher replaces it with a fresh file and epoch; readers drain the
+    old file first. Ids from a replaced log or an earlier run are unknown to the hubs, so those
+    clients are told to reload. `max_bytes` should hold far more than one poll interval of events:
+    a reader that sleeps through two replacements never sees the log in between.
+
+    Args:
+        path: Log file shared by the workers; its directory must exist.
+        max_bytes: Size at which the log is started afresh.
+    """
+
+    needs_polling = True
+
+    def __init__(self, path: str, max_bytes: int = 16 * 2**20) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._deliver: List[Callable[[RecipeEvent], None]] = []
+        with self._exclusive():
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                self._start_log()
+            self._open()
+        # Only events published from now on; older ones belong to another run's clients.
+        self._offset = os.fstat(self._fd).st_size
+
+    def connect(self, deliver: Callable[[RecipeEvent], None]) -> None:
+        self._deliver.append(deliver)
+
+    def publish(self, kind: str, data: dict) -> None:
+        line = (json.dumps({"kind": kind, "data": data}, separators=(",", ":")) + "\n").encode()
+        with self._exclusive():
+            if not os.path.exists(self.path) or os.path.getsize(self.path) >= self.max_bytes:
+                self._start_log()
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+
+    def poll(self) -> None:
+        with self._lock:
+            while True:
+                self._read()
+                if not self._replaced():
+                    return
+                # Nothing is appended to a log once it has been replaced: drain it, then switch.
+                self._read()
+                os.close(self._fd)
+                self._open()
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        # A fresh descriptor each time: flock is per open file, and an inherited one would be shared.
+        with open(f"{self.path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _start_log(self) -> None:
+        with open(f"{self.path}.tmp", "w") as handle:
+            handle.write(json.dumps({"epoch": secrets.token_hex(4)}) + "\n")
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def _open(self) -> None:
+        self._fd = os.open(self.path, os.O_RDONLY)
+        header = os.pread(self._fd, 4096, 0).split(b"\n", 1)[0]
+        self._epoch = json.loads(header)["epoch"]
+        self._offset = len(header) + 1
+
+    def _replaced(self) -> bool:
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._fd).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _read(self) -> None:
+        while True:
+            chunk = os.pread(self._fd, 1 << 20, self._offset)
+            # A line is complete once its newline is there; the rest is read on the next poll.
+            end = chunk.rfind(b"\n") + 1
+            if not end:
+                return
+            offset = self._offset
+            for line in chunk[:end].splitlines(keepends=True):
+                record = json.loads(line)
+                event = RecipeEvent(f"{self._epoch}-{offset}", record["kind"], record["data"])
+                for deliver in self._deliver:
+                    deliver(event)
+                offset += len(line)
+            self._offset = offset
+
+
+def create_broadcaster(event_log_path: str) -> Broadcaster:
+    """The broadcaster for `EVENT_LOG_PATH`: a shared log file if one is set, in-process delivery otherwise."""
+    return FileLogBroadcaster(event_log_path) if event_log_path else LocalBroadcaster()
+
+
+class _Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_pending: int) -> None:
+        self.loop = loop
+        self.max_pending = max_pending
+        self.pending: Deque[RecipeEvent] = deque()
+        self.wake = asyncio.Event()
+        self.overflowed = False
+
+    def offer(self, event: RecipeEvent) -> None:
+        # Runs on the subscriber's loop.
+        if self.overflowed:
+            return
+        if len(self.pending) >= self.max_pending:
+            self.overflowed = True
+        else:
+            self.pending.append(event)
+        self.wake.set()
+
+
+def _offer_all(subscriptions: List[_Subscription], event: RecipeEvent) -> None:
+    for subscription in subscriptions:
+        subscription.offer(event)
+
+
+class RecipeEventHub:
+    """
+    Fans recipe change events out to Server-Sent Events streams on this process's event loop.
+
+    Every event is kept in a bounded history so a reconnecting client that sends `Last-Event-ID`
+    gets exactly what it missed; if that id has already left the history (or is unknown), the
+    stream starts with a `reset` event telling the client to reload the list instead.
+
+    Each stream buffers at most `max_pending` undelivered events. A client that reads slower
+    than recipes change fills that buffer and is disconnected rather than buffered without
+    bound; its `EventSource` reconnects with the last id it received and resumes from history.
+
+    Args:
+        broadcaster: Transport between worker processes; `LocalBroadcaster` by default.
+        history_size: Events kept for resumption.
+        max_pending: Events buffered per stream before it counts as too slow.
+    """
+
+    def __init__(self, broadcaster: Optional[Broadcaster] = None, history_size: int = 1000, max_pending: int = 256) -> None:
+        self._lock = threading.Lock()
+        self._history: Deque[RecipeEvent] = deque(maxlen=history_size)
+        self._subscriptions: Set[_Subscription] = set()
+        self.max_pending = max_pending
+        self.published = 0
+        self.dropped = 0
+        self.broadcaster = broadcaster or LocalBroadcaster()
+        self.broadcaster.connect(self._deliver)
+
+    def publish(self, kind: str, data: dict) -> None:
+        """Announce a change to every worker; safe to call from request threads."""
+        self.broadcaster.publish(kind, data)
+
+    def _deliver(self, event: RecipeEvent) -> None:
+        with self._lock:
+            self._history.append(event)
+            self.published += 1
+            subscriptions = list(self._subscriptions)
+        by_loop: Dict[asyncio.AbstractEventLoop, List[_Subscription]] = {}
+        for subscription in subscriptions:
+            by_loop.setdefault(subscription.loop, []).append(subscription)
+        # One wakeup per event loop, not per subscriber: each cross-thread call writes to the loop's self-pipe.
+        for loop, members in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_offer_all, members, event)
+            except RuntimeError:
+                # The loop has closed; its streams are gone.
+                for subscription in members:
+                    self._unsubscribe(subscription)
+
+    def _subscribe(self, last_event_id: Optional[str]) -> Tuple[_Subscription, List[RecipeEvent]]:
+        """Register a stream and return the events it missed, or a single `reset` if it must reload."""
+        subscription = _Subscription(asyncio.get_running_loop(), self.max_pending)
+        with self._lock:
+            # Copied under the lock with registration, so no event falls between backlog and live delivery.
+            self._subscriptions.add(subscription)
+            if last_event_id is None:
+                return subscription, []
+            history = list(self._history)
+        for position, event in enumerate(history):
+            if event.id == last_event_id:
+                return subscription, history[position + 1 :]
+        # Carry the newest id, so the client's next reconnect resumes from here.
+        return subscription, [RecipeEvent(history[-1].id if history else "", RESET, {})]
+
+    def _unsubscribe(self, subscription: _Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    async def stream(self, last_event_id: Optional[str] = None, keepalive: float = 15.0) -> AsyncIterator[bytes]:
+        """
+        SSE frames for one client: the missed backlog, then live events as they happen.
+
+        A comment line is sent after `keepalive` idle seconds so proxies keep the connection
+        open and a vanished client is noticed. The stream ends if the client falls behind.
+        """
+        subscription, backlog = self._subscribe(last_event_id)
+        try:
+            yield f"retry: {RECONNECT_DELAY_MS}\n\n".encode()
+            for event in backlog:
+                yield event.frame
+            while True:
+                try:
+                    # Unlike `wait_for`, `timeout` does not spawn a task for every wait.
+                    async with asyncio.timeout(keepalive):
+                        await subscription.wake.wait()
+                except TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                subscription.wake.clear()
+                while subscription.pending:
+                    yield subscription.pending.popleft().frame
+                if subscription.overflowed:
+                    self.dropped += 1
+                    return
+        finally:
+            self._unsubscribe(subscription)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"subscribers": len(self._subscriptions), "published": self.published, "dropped": self.dropped}
+
+    def reset(self) -> None:
+        """Forget the event history and counters (tests)."""
+        with self._lock:
+            self._history.clear()
+            self.published = 0
+            self.dropped = 0
+
+
+recipe_events = RecipeEventHub(
+    create_broadcaster(settings.EVENT_LOG_PATH),
+    history_size=settings.EVENT_HISTORY_SIZE,
+    max_pending=settings.EVENT_QUEUE_SIZE,
+)
@@ -0,0 +1,264 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+# Inclusive upper bounds of each bucket; values above the last bound share one open-ended bucket.
+TIME_BOUNDS = (15, 30, 60, 120)  # minutes of prep plus cook time
+SERVINGS_BOUNDS = (1, 2, 4, 6)
+INGREDIENT_BOUNDS = (5, 10, 15)
+
+UNKNOWN = "unknown"
+
+# (recorded_at, row); a `None` row marks a recipe deleted since the snapshot.
+PendingRow = Tuple[float, Optional[Tuple[int, Optional[int], Optional[int], Optional[int], Optional[int], int]]]
+
+
+def _bucket_labels(bounds: Sequence[int], lowest: int) -> Tuple[str, ...]:
+    """Labels of the buckets `bounds` defines, after the `unknown` bucket for NULLs, e.g. `("unknown", "0-15", ..., "121+")`."""
+    labels = [UNKNOWN]
+    start = lowest
+    for bound in bounds:
+        labels.append(f"{start}-{bound}" if bound > start else str(bound))
+        start = bound + 1
+    labels.append(f"{start}+")
+    return tuple(labels)
+
+
+# Facet name -> bucket labels, indexed by the codes stored in the snapshot columns.
+BUCKETS: Dict[str, Tuple[str, ...]] = {
+    "total_time": _bucket_labels(TIME_BOUNDS, 0),
+    "servings": _bucket_labels(SERVINGS_BOUNDS, 1),
+    "ingredients": _bucket_labels(INGREDIENT_BOUNDS, 0),
+}
+FACETS = ("category", *BUCKETS)
+
+
+def _bucket(values: np.ndarray, bounds: Sequence[int]) -> np.ndarray:
+    """Bucket codes for `values`, with -1 (NULL) in bucket 0 and the rest numbered from 1."""
+    codes = np.searchsorted(np.asarray(bounds), values, side="left") + 1
+    return np.where(values < 0, 0, codes).astype(np.uint8)
+
+
+class _Columns:
+    """
+    Facet codes of a set of recipes, one array per facet, aligned by row and ordered by recipe id.
+
+    `category` holds `category_id + 1` (0 for uncategorized); the bucketed facets hold indexes into
+    `BUCKETS`. Instances are never modified; a rebuild or a write produces a new one.
+    """
+
+    def __init__(self, ids: np.ndarray, codes: Dict[str, np.ndarray]) -> None:
+        self.ids = ids
+        self.codes = codes
+
+    @classmethod
+    def empty(cls) -> "_Columns":
+        return cls(np.empty(0, dtype=np.int64), {"category": np.empty(0, dtype=np.int32), **{name: np.empty(0, dtype=np.uint8) for name in BUCKETS}})
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple]) -> "_Columns":
+        """Encode `(id, category_id, prep_time, cook_time, servings, ingredient_count)` rows, NULLs as None."""
+        if not rows:
+            return cls.empty()
+        # NumPy reads None as NaN in a float array; as -1 every column is plain integer arithmetic.
+        table = np.nan_to_num(np.array(rows, dtype=np.float64), nan=-1).astype(np.int64)
+        ids, category, prep, cook, servings, ingredients = table.T
+        total_time = np.where((prep < 0) & (cook < 0), -1, np.maximum(prep, 0) + np.maximum(cook, 0))
+        order = np.argsort(ids, kind="stable")
+        codes = {
+            "category": (category + 1).astype(np.int32),
+            "total_time": _bucket(total_time, TIME_BOUNDS),
+            "servings": _bucket(servings, SERVINGS_BOUNDS),
+            "ingredients": _bucket(ingredients, INGREDIENT_BOUNDS),
+        }
+        return cls(ids[order], {name: column[order] for name, column in codes.items()})
+
+    def positions(self, recipe_ids: np.ndarray) -> np.ndarray:
+        """Row numbers of the given ids that are present in these columns."""
+        found = np.searchsorted(self.ids, recipe_ids)
+        found = found[found < len(self.ids)]
+        return found[np.isin(self.ids[found], recipe_ids)]
+
+    def take(self, positions: np.ndarray) -> "_Columns":
+        return _Columns(self.ids[positions], {name: column[positions] for name, column in self.codes.items()})
+
+    def counts(self, selected: Dict[str, np.ndarray]) -> Tuple[int, Dict[str, np.ndarray]]:
+        """
+        Count matching rows and, per facet, rows by code among those matching every *other* facet's selection.
+
+        A facet's own selection does not narrow its counts, so the client can see what widening it
+        would add. Each selection is one boolean mask over the column; counts are `np.bincount`s.
+        """
+        everything = np.ones(len(self.ids), dtype=bool)
+        masks = {name: _mask(self.codes[name], codes) for name, codes in selected.items() if codes is not None}
+        matching = everything.copy()
+        for mask in masks.values():
+            matching &= mask
+
+        counts = {}
+        for name in FACETS:
+            if name not in masks:
+                rows = matching
+            else:
+                rows = everything.copy()
+                for other, mask in masks.items():
+                    if other != name:
+                        rows &= mask
+            counts[name] = np.bincount(self.codes[name][rows])
+        return int(matching.sum()), counts
+
+
+def _mask(column: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    if len(codes) == 1:
+        return column == codes[0]
+    if column.dtype == np.uint8:
+        # A lookup table indexed by code is one gather instead of one comparison per selected code.
+        table = np.zeros(256, dtype=bool)
+        table[codes] = True
+        return table[column]
+    return np.isin(column, codes)
+
+
+def _combine(*terms: Tuple[int, np.ndarray]) -> np.ndarray:
+    """Sum bincounts of different lengths, each multiplied by its sign."""
+    size = max(len(counts) for _, counts in terms)
+    total = np.zeros(size, dtype=np.int64)
+    for sign, counts in terms:
+        total[: len(counts)] += sign * counts
+    return total
+
+
+class FacetIndex:
+    """
+    Faceted-browse counts over recipe metadata held as NumPy columns in memory.
+
+    `rebuild()` (run in the background) reads category, prep and cook time, servings and
+    ingredient count for every recipe in one query, encodes them as small integer codes and swaps
+    the new snapshot in under the lock, so readers see either the old columns or the new, never a
+    mix. Writes made through `app.crud.recipe` call `update()`/`forget()`, which keep a per-process
+    overlay of changed rows until the next rebuild includes them; counts are the snapshot's, minus
+    the rows the overlay supersedes, plus the overlay's.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshot = _Columns.empty()
+        self._pending: Dict[int, PendingRow] = {}
+        self._overlay: Optional[Tuple[_Columns, _Columns]] = None
+
+    def update(self, recipe: models.Recipe) -> None:
+        """Record a recipe that was just created or edited."""
+        row = (recipe.id, recipe.category_id, recipe.prep_time, recipe.cook_time, recipe.servings, len(recipe.ingredients))
+        with self._lock:
+            self._pending[recipe.id] = (time.time(), row)
+            self._overlay = None
+
+    def forget(self, recipe_ids: Sequence[int]) -> None:
+        """Stop counting recipes that were deleted."""
+        recorded_at = time.time()
+        with self._lock:
+            for recipe_id in recipe_ids:
+                self._pending[recipe_id] = (recorded_at, None)
+            self._overlay = None
+
+    def reset(self) -> None:
+        """Drop the snapshot and overlay; counts are empty until the next `rebuild()`."""
+        with self._lock:
+            self._snapshot = _Columns.empty()
+            self._pending = {}
+            self._overlay = None
+
+    def counts(
+        self,
+        category_ids: Sequence[Optional[int]] = (),
+        **buckets: Sequence[str],
+    ) -> Tuple[int, Dict[str, List[Tuple[object, int]]]]:
+        """
+        Count recipes matching the selection, and each facet's values among recipes matching the others.
+
+        Within a facet the selected values are alternatives; across facets they must all match.
+
+        Args:
+            category_ids: Selected categories; None selects uncategorized recipes.
+            buckets: Selected bucket labels per facet in `BUCKETS`, e.g. `total_time=["16-30"]`.
+
+        Returns:
+            The number of matching recipes and, per facet, `(value, count)` pairs with a non-zero
+            count: category ids (None for uncategorized) or bucket labels.
+
+        Raises:
+            ValueError: On an unknown facet or bucket label.
+        """
+        selected: Dict[str, Optional[np.ndarray]] = {
+            "category": np.array([0 if category_id is None else category_id + 1 for category_id in category_ids], dtype=np.int32)
+            if category_ids
+            else None
+        }
+        for name, labels in buckets.items():
+            if name not in BUCKETS:
+                raise ValueError(f"Unknown facet {name!r}")
+            unknown = [label for label in labels if label not in BUCKETS[name]]
+            if unknown:
+                raise ValueError(f"Unknown {name} bucket {unknown[0]!r}; expected one of {', '.join(BUCKETS[name])}")
+            selected[name] = np.array([BUCKETS[name].index(label) for label in labels], dtype=np.uint8) if labels else None
+
+        snapshot, (superseded, overlay) = self._state()
+        total, counts = snapshot.counts(selected)
+        if len(superseded.ids) or len(overlay.ids):
+            stale_total, stale = superseded.counts(selected)
+            fresh_total, fresh = overlay.counts(selected)
+            total += fresh_total - stale_total
+            counts = {name: _combine((1, counts[name]), (-1, stale[name]), (1, fresh[name])) for name in FACETS}
+
+        facets: Dict[str, List[Tuple[object, int]]] = {
+            "category": [(None if code == 0 else code - 1, int(count)) for code, count in enumerate(counts["category"]) if count]
+        }
+        for name, labels in BUCKETS.items():
+            facets[name] = [(labels[code], int(count)) for code, count in enumerate(counts[name]) if count]
+        return total, facets
+
+    def _state(self) -> Tuple[_Columns, Tuple[_Columns, _Columns]]:
+        with self._lock:
+            if self._overlay is None:
+                pending_ids = np.fromiter(self._pending, dtype=np.int64, count=len(self._pending))
+                superseded = self._snapshot.take(self._snapshot.positions(pending_ids))
+                overlay = _Columns.from_rows([row for _, row in self._pending.values() if row is not None])
+                self._overlay = (superseded, overlay)
+            return self._snapshot, self._overlay
+
+    def rebuild(self, db: Session) -> None:
+        """Read every recipe's facet columns and swap them in as the new snapshot."""
+        started = time.perf_counter()
+        built_at = time.time()
+
+        ingredient_counts = (
+            select(models.Ingredient.recipe_id, func.count().label("count")).group_by(models.Ingredient.recipe_id).subquery()
+        )
+        statement = select(
+            models.Recipe.id,
+            models.Recipe.category_id,
+            models.Recipe.prep_time,
+            models.Recipe.cook_time,
+            models.Recipe.servings,
+            func.coalesce(ingredient_counts.c.count, 0),
+        ).outerjoin(ingredient_counts, ingredient_counts.c.recipe_id == models.Recipe.id)
+        snapshot = _Columns.from_rows(db.execute(statement).all())
+
+        with self._lock:
+            self._snapshot = snapshot
+            # Changes recorded before the read started are part of the snapshot now.
+            self._pending = {recipe_id: row for recipe_id, row in self._pending.items() if row[0] >= built_at}
+            self._overlay = None
+        logger.info("Built facet snapshot of %d recipes in %.2fs", len(snapshot.ids), time.perf_counter() - started)
+
+
+facet_index = FacetIndex()
@@ -0,0 +1,216 @@
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import NullPool
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN = "closed", "open"
+
+# Seconds since the last WAL replay on a PostgreSQL standby; NULL on a primary.
+_REPLICATION_LAG = text(
+    "SELECT CASE WHEN pg_is_in_recovery() "
+    "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def create_probe_engine(database_url: str, timeout: float) -> Engine:
+    """
+    An engine for health probes only: a fresh connection per probe, bounded by `timeout` seconds.
+
+    Probes never wait on the application's pool, so a saturated pool is reported as saturation
+    rather than mistaken for an unreachable database.
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    connect_args: Dict[str, Any] = {}
+    if backend == "postgresql":
+        connect_args = {"connect_timeout": max(1, round(timeout)), "options": f"-c statement_timeout={int(timeout * 1000)}"}
+    elif backend == "mysql":
+        connect_args = {"connect_timeout": max(1, round(timeout)), "read_timeout": max(1, round(timeout))}
+    elif backend == "sqlite":
+        connect_args = {"timeout": timeout}
+    return create_engine(url, poolclass=NullPool, connect_args=connect_args)
+
+
+def probe_database(engine: Engine) -> Optional[float]:
+    """Run `SELECT 1` and return the replication lag in seconds (None unless a PostgreSQL standby); raises if unreachable."""
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        if engine.dialect.name == "postgresql":
+            lag = connection.execute(_REPLICATION_LAG).scalar()
+            return float(lag) if lag is not None else None
+    return None
+
+
+class CircuitBreaker:
+    """
+    Fail requests fast while the database is unreachable.
+
+    Opens after `failure_threshold` consecutive failures, counting both failed health probes and
+    requests that died on a connection error, so callers get an immediate `503` instead of each
+    waiting out `pool_timeout`. Closes again on the next success: a successful probe, or a trial
+    request, one of which is let through every `cooldown` seconds while the circuit is open. The
+    trials keep the circuit from staying open when no monitor is probing.
+
+    Args:
+        failure_threshold: Consecutive failures that open the circuit.
+        cooldown: Seconds between trial requests while the circuit is open.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float = 5.0) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._next_trial_at = 0.0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        return OPEN if self._opened_at is not None else CLOSED
+
+    def allow(self) -> bool:
+        """False while the circuit is open, except for a trial request; the caller should reject the request."""
+        if self._opened_at is None:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if self._opened_at is not None and now < self._next_trial_at:
+                self.rejected += 1
+                return False
+            # Closed meanwhile, or due a trial; one that never reports back (cancelled) is followed by the next.
+            self._next_trial_at = now + self.cooldown
+        return True
+
+    def record_success(self) -> None:
+        # Called for every request that got through; the common case needs no lock.
+        if self._failures == 0 and self._opened_at is None:
+            return
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Database reachable again; closing the circuit after %.1fs", time.monotonic() - self._opened_at)
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is None and self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._next_trial_at = self._opened_at + self.cooldown
+                logger.warning("Database unreachable after %d consecutive failures; opening the circuit", self._failures)
+
+    def reset(self) -> None:
+        """Close the circuit and forget past failures (tests)."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self.rejected = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self._failures, "rejected": self.rejected}
+
+
+@dataclass
+class HealthStatus:
+    """Outcome of the latest database probe."""
+
+    healthy: bool = False
+    # time.monotonic() of the probe; None before the first one.
+    checked_at: Optional[float] = None
+    latency_ms: Optional[float] = None
+    error: Optional[str] = None
+    replication_lag: Optional[float] = None
+    pool: Dict[str, Optional[int]] = field(default_factory=dict)
+
+
+class HealthMonitor:
+    """
+    Probe the database on an interval and serve the cached result.
+
+    `run_once` (run periodically by a `PeriodicTask`) calls `probe`, records its latency and
+    the pool's occupancy, and feeds the outcome to `breaker`. Liveness and readiness checks then
+    read `status` without touching the database, so orchestrator probes add no load or latency.
+
+    The instance is ready when the last probe succeeded, is younger than `stale_after`
+    seconds (a stuck monitor does not keep reporting ready), the replica is at most
+    `max_replication_lag` seconds behind, and the circuit is closed.
+
+    Args:
+        probe: Checks the database, raising if it is unreachable; returns the replication lag in
+            seconds, or None if the database is not a replica.
+        breaker: Circuit breaker fed with every probe's outcome.
+        pool_statistics: Returns the application pool's occupancy (`capacity`, `checked_out`, ...).
+        stale_after: Seconds a result stays valid; None keeps it valid until the next probe.
+        max_replication_lag: Lag in seconds beyond which the instance is not ready; 0 ignores lag.
+    """
+
+    def __init__(
+        self,
+        probe: Callable[[], Optional[float]],
+        breaker: CircuitBreaker,
+        pool_statistics: Callable[[], Dict[str, Optional[int]]],
+        stale_after: Optional[float] = None,
+        max_replication_lag: float = 0,
+    ) -> None:
+        self.probe = probe
+        self.breaker = breaker
+        self.pool_statistics = pool_statistics
+        self.stale_after = stale_after
+        self.max_replication_lag = max_replication_lag
+        self._status = HealthStatus()
+
+    @property
+    def status(self) -> HealthStatus:
+        return self._status
+
+    def run_once(self) -> None:
+        """Probe now and replace the cached status."""
+        started = time.monotonic()
+        status = HealthStatus(checked_at=started)
+        try:
+            status.replication_lag = self.probe()
+            status.healthy = True
+        except Exception as exc:
+            status.error = f"{type(exc).__name__}: {exc}"
+            logger.warning("Database health probe failed: %s", status.error)
+        status.latency_ms = round((time.monotonic() - started) * 1000, 2)
+        status.pool = self.pool_statistics()
+        self._status = status
+        if status.healthy:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def ready(self) -> bool:
+        status = self._status
+        if not status.healthy or status.checked_at is None or self.breaker.state != CLOSED:
+            return False
+        if self.stale_after is not None and time.monotonic() - status.checked_at > self.stale_after:
+            return False
+        lag = status.replication_lag
+        return not (self.max_replication_lag and lag is not None and lag > self.max_replication_lag)
+
+    def reset(self) -> None:
+        """Forget the cached status and close the circuit (tests)."""
+        self._status = HealthStatus()
+        self.breaker.reset()
+
+    def snapshot(self) -> Dict[str, Any]:
+        status = self._status
+        snapshot = asdict(status)
+        snapshot.pop("checked_at")
+        snapshot["age_seconds"] = round(time.monotonic() - status.checked_at, 3) if status.checked_at is not None else None
+        capacity, checked_out = status.pool.get("capacity"), status.pool.get("checked_out")
+        snapshot["pool_saturation"] = round(checked_out / capacity, 3) if capacity and checked_out is not None else None
+        snapshot["ready"] = self.ready()
+        snapshot["circuit"] = self.breaker.snapshot()
+        return snapshot
@@ -0,0 +1,195 @@
+"""
+Import schema.org recipes from crawled pages.
+
+Parses the JSON-LD and microdata of `.html`, `.htm` and `.json` files (directories are searched
+recursively) across a pool of worker processes, and streams the recipes into the bulk insert
+path (`StorageBackend.bulk_load`) in batches. At most two chunks of pages per worker are parsed
+ahead of the insert and one batch of recipes is buffered, so memory stays flat however large the
+crawl. A page's `recipeCategory` is matched by name, ignoring case, against existing categories;
+other recipes are left uncategorized. Reports pages per second, overall and per worker process.
+Run `python -m app.dedupe` after an import to fingerprint the new recipes.
+
+    python -m app.importer ./crawl --workers 8 --batch-size 1000
+"""
+import argparse
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from app import models, schemas
+from app.bulkload import storage_for
+from app.config.settings import settings
+from app.schema_org import ParsedRecipe, parse_files
+from app.storage import StorageBackend
+from app.storage.bulk import COPY_FORMATS
+
+logger = logging.getLogger(__name__)
+
+PAGE_EXTENSIONS = (".html", ".htm", ".json")
+
+
+@dataclass
+class ImportStats:
+    """Pages read by an import, what they yielded, and how long it took."""
+
+    pages: int = 0
+    recipes: int = 0
+    ingredients: int = 0
+    # Pages without a usable recipe, and pages that could not be read at all.
+    empty: int = 0
+    unreadable: int = 0
+    workers: int = 1
+    seconds: float = 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+    @property
+    def pages_per_second_per_core(self) -> float:
+        return self.pages_per_second / self.workers
+
+
+def find_pages(paths: Iterable[str]) -> Iterator[str]:
+    """The given files, and every page file under the given directories in name order."""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for directory, subdirectories, files in os.walk(path):
+            subdirectories.sort()
+            for name in sorted(files):
+                if name.lower().endswith(PAGE_EXTENSIONS):
+                    yield os.path.join(directory, name)
+
+
+def _chunks(paths: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(paths)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _collect(stats: ImportStats, pages: int, result: Tuple[List[ParsedRecipe], int, int]) -> List[ParsedRecipe]:
+    recipes, empty, unreadable = result
+    stats.pages += pages
+    stats.empty += empty
+    stats.unreadable += unreadable
+    return recipes
+
+
+def parse_pages(paths: Iterable[str], workers: int, chunk_size: int, stats: ImportStats) -> Iterator[ParsedRecipe]:
+    """
+    Recipes from `paths`, parsed `chunk_size` pages per task on `workers` processes, in input order.
+
+    Workers read the files themselves, so only paths and parsed recipes cross process boundaries.
+    Chunks are submitted only as results are consumed, keeping at most `2 * workers` in flight.
+    """
+    chunks = _chunks(paths, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            yield from _collect(stats, len(chunk), parse_files(chunk))
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    in_flight: Deque[Tuple[int, Future]] = deque()
+    try:
+        for chunk in chunks:
+            in_flight.append((len(chunk), pool.submit(parse_files, chunk)))
+            if len(in_flight) >= 2 * workers:
+                pages, future = in_flight.popleft()
+                yield from _collect(stats, pages, future.result())
+        while in_flight:
+            pages, future = in_flight.popleft()
+            yield from _collect(stats, pages, future.result())
+    finally:
+        # Also reached when the consumer stops early, e.g. because the insert failed.
+        pool.shutdown(cancel_futures=True)
+
+
+def _category_ids(engine: Engine) -> Dict[str, int]:
+    with engine.connect() as connection:
+        rows = connection.execute(select(models.Category.id, models.Category.name)).all()
+    return {name.casefold(): category_id for category_id, name in rows}
+
+
+def import_pages(
+    storage: StorageBackend,
+    paths: Sequence[str],
+    workers: Optional[int] = None,
+    batch_size: int = 1000,
+    chunk_size: int = 16,
+    format: str = "binary",
+) -> ImportStats:
+    """
+    Parse every recipe in the pages under `paths` and insert them in one bulk load.
+
+    Args:
+        storage: Backend whose `bulk_load` receives the recipes.
+        paths: Page files and directories of them.
+        workers: Parser processes; defaults to one per CPU. 1 parses in this process.
+        batch_size: Recipes buffered per COPY or `executemany`.
+        chunk_size: Pages handed to a worker per task.
+        format: `binary` or `csv`, the COPY format used on PostgreSQL.
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = ImportStats(workers=workers)
+    categories = _category_ids(storage.get_engine())
+    started = time.perf_counter()
+
+    def recipes() -> Iterator[schemas.RecipeCreate]:
+        for recipe, category in parse_pages(find_pages(paths), workers, chunk_size, stats):
+            category_id = categories.get(category.casefold()) if category else None
+            yield recipe if category_id is None else recipe.model_copy(update={"category_id": category_id})
+
+    transfer = storage.bulk_load(recipes(), format=format, batch_size=batch_size)
+    stats.recipes = transfer.recipes
+    stats.ingredients = transfer.ingredients
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Page files, or directories searched for them.")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL, help="Defaults to DATABASE_URL.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parser processes (default: one per CPU).")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Recipes sent per COPY or executemany.")
+    parser.add_argument("--chunk-size", type=int, default=16, help="Pages parsed per worker task.")
+    parser.add_argument("--format", choices=COPY_FORMATS, default="binary", help="COPY format (PostgreSQL only).")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    storage = storage_for(args.database_url)
+    try:
+        stats = import_pages(
+            storage, args.paths, workers=args.workers, batch_size=args.batch_size, chunk_size=args.chunk_size, format=args.format
+        )
+    finally:
+        storage.close()
+    logger.info(
+        "Imported %d recipes (%d ingredients) from %d pages (%d without a recipe, %d unreadable) in %.2fs: "
+        "%.0f pages/s, %.0f pages/s per worker",
+        stats.recipes,
+        stats.ingredients,
+        stats.pages,
+        stats.empty,
+        stats.unreadable,
+        stats.seconds,
+        stats.pages_per_second,
+        stats.pages_per_second_per_core,
+    )
+
+
+if __name__ == "__main__":
+    main()
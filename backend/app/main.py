@@ -1,12 +1,196 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from app import models
+from app import crud, models
 from app.api.routers import categories_router, recipes_router
-from app.database import Base, engine
+from app.background import PeriodicTask
+from app.config.settings import settings
+from app.counters import view_counter
+from app.database import Base, SessionLocal, engine, pool_capacity, pool_statistics
+from app.events import recipe_events
+from app.facets import facet_index
+from app.health import CircuitBreaker, HealthMonitor, create_probe_engine, probe_database
+from app.middleware import (
+    AdmissionControlMiddleware,
+    CircuitBreakerMiddleware,
+    CoalescingMiddleware,
+    CoalescingStats,
+    CompressionMiddleware,
+    Limiter,
+    ProfilingMiddleware,
+    limits_from_pool,
+)
+from app.similarity import similarity_index
+
+
+# Probes connect outside the request pool, so a saturated pool never reads as an outage. A result
+# older than three missed probes no longer counts as ready.
+circuit_breaker = CircuitBreaker(settings.HEALTH_FAILURE_THRESHOLD, cooldown=settings.HEALTH_RETRY_AFTER)
+probe_engine = create_probe_engine(settings.DATABASE_URL, settings.HEALTH_CHECK_TIMEOUT)
+health_monitor = HealthMonitor(
+    lambda: probe_database(probe_engine),
+    circuit_breaker,
+    pool_statistics,
+    stale_after=3 * settings.HEALTH_CHECK_INTERVAL + settings.HEALTH_CHECK_TIMEOUT if settings.HEALTH_CHECK_INTERVAL > 0 else None,
+    max_replication_lag=settings.HEALTH_MAX_REPLICATION_LAG,
+)
+
+
+def reconcile_category_stats():
+    db = SessionLocal()
+    try:
+        crud.reconcile_category_stats(db)
+    finally:
+        db.close()
+
+
+def rebuild_similarity_index():
+    db = SessionLocal()
+    try:
+        # Workers share one snapshot; skip the build if another worker published one this interval.
+        similarity_index.rebuild(db, max_age=settings.SIMILARITY_REBUILD_INTERVAL / 2)
+    finally:
+        db.close()
+
+
+def rebuild_facet_index():
+    db = SessionLocal()
+    try:
+        facet_index.rebuild(db)
+    finally:
+        db.close()
+
+
+def flush_view_counts():
+    db = SessionLocal()
+    try:
+        view_counter.flush(db)
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    health_task = PeriodicTask("database-health", settings.HEALTH_CHECK_INTERVAL, health_monitor.run_once)
+    # Probe before serving so /health/ready starts from a real result rather than "unknown".
+    health_task.run_once()
+    if settings.HEALTH_CHECK_INTERVAL > 0:
+        health_task.start()
+
+    reconcile_task = PeriodicTask("category-stats-reconcile", settings.CATEGORY_STATS_RECONCILE_INTERVAL, reconcile_category_stats)
+    if settings.CATEGORY_STATS_RECONCILE_INTERVAL > 0:
+        # Backfill counters for rows written before the stats table existed, then keep them honest.
+        reconcile_task.run_once()
+        reconcile_task.start()
+
+    similarity_task = PeriodicTask("similarity-index-rebuild", settings.SIMILARITY_REBUILD_INTERVAL, rebuild_similarity_index)
+    if settings.SIMILARITY_REBUILD_INTERVAL > 0:
+        # Build off the startup path; until it lands, similar-recipe queries vectorize on the fly.
+        similarity_task.start(run_immediately=True)
+
+    facet_task = PeriodicTask("facet-index-rebuild", settings.FACET_REBUILD_INTERVAL, rebuild_facet_index)
+    if settings.FACET_REBUILD_INTERVAL > 0:
+        # One query; built before serving so the first facet counts cover the whole catalog.
+        facet_task.run_once()
+        facet_task.start()
+
+    views_task = PeriodicTask("view-count-flush", settings.VIEW_COUNT_FLUSH_INTERVAL, flush_view_counts)
+    if settings.VIEW_COUNT_FLUSH_INTERVAL > 0:
+        views_task.start()
+
+    # Started per worker: the supervisor builds the broadcaster before forking, and threads do not survive a fork.
+    events_task = PeriodicTask("recipe-event-poll", settings.EVENT_POLL_INTERVAL, recipe_events.broadcaster.poll)
+    if recipe_events.broadcaster.needs_polling:
+        events_task.start()
+    yield
+    events_task.stop()
+    views_task.stop()
+    # Write out whatever was counted since the last flush; only an unclean exit loses it.
+    views_task.run_once()
+    facet_task.stop()
+    similarity_task.stop()
+    reconcile_task.stop()
+    health_task.stop()
 
-app = FastAPI(title="Recipe Manager API")
 
+app = FastAPI(title="Recipe Manager API", lifespan=lifespan)
+
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
+# Batch reads and multi-row writes get their own, smaller admission budget. The plain listing is the
+# app's main page and stays interactive: the bulk class may get a single slot.
+BULK_ROUTES = (("GET", "/api/recipes/batch"), ("DELETE", "/api/recipes"))
+admission_limits = limits_from_pool(
+    pool_capacity(),
+    {"read": settings.ADMISSION_READ_LIMIT, "write": settings.ADMISSION_WRITE_LIMIT, "bulk": settings.ADMISSION_BULK_LIMIT},
+)
+admission_limiters = {
+    route_class: Limiter(limit, settings.ADMISSION_QUEUE_SIZE) for route_class, limit in admission_limits.items()
+}
+app.add_middleware(
+    AdmissionControlMiddleware,
+    limiters=admission_limiters,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+    retry_after=settings.ADMISSION_RETRY_AFTER,
+    bulk_routes=BULK_ROUTES,
+    # The event stream holds its connection open but no database connection, so it takes no slot.
+    exempt_prefixes=("/health", "/metrics", "/api/recipes/events"),
+)
+
+# Wraps admission control, so while the database is down requests fail fast without queueing for a slot.
+app.add_middleware(
+    CircuitBreakerMiddleware,
+    breaker=circuit_breaker,
+    retry_after=settings.HEALTH_RETRY_AFTER,
+    exempt_prefixes=("/health", "/metrics", "/api/recipes/events"),
+)
+
+# Read routes whose identical concurrent requests share one execution. Outside admission control and
+# compression, so followers neither take an admission slot nor compress the body again.
+COALESCED_ROUTES = (
+    "/api/categories",
+    "/api/recipes",
+    "/api/recipes/batch",
+    "/api/recipes/popular",
+    "/api/recipes/facets",
+    "/api/recipes/{recipe_id:int}",
+    "/api/recipes/{recipe_id:int}/similar",
+    "/api/recipes/{recipe_id:int}/duplicates",
+)
+coalescing_stats = CoalescingStats()
+
+
+def count_replayed_view(template, params, status_code):
+    # A follower is served the leader's response without running `get_recipe`, which counts the view.
+    if template == "/api/recipes/{recipe_id:int}" and status_code == 200:
+        view_counter.increment(params["recipe_id"])
+
+
+if settings.REQUEST_COALESCING_TIMEOUT > 0:
+    app.add_middleware(
+        CoalescingMiddleware,
+        routes={route: settings.REQUEST_COALESCING_TIMEOUT for route in COALESCED_ROUTES},
+        stats=coalescing_stats,
+        on_replay=count_replayed_view,
+    )
+
+# Outside everything but CORS, so a profile covers every other middleware. Not installed at all unless configured.
+if settings.PROFILING_SECRET or settings.PROFILING_ADMIN_TOKEN:
+    app.add_middleware(
+        ProfilingMiddleware,
+        secret=settings.PROFILING_SECRET,
+        admin_token=settings.PROFILING_ADMIN_TOKEN,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        interval=settings.PROFILING_INTERVAL,
+        directory=settings.PROFILING_DIR,
+        max_files=settings.PROFILING_MAX_FILES,
+    )
+
+# Added last, so it is the outermost layer: the 503s that admission control, the circuit breaker and
+# coalescing answer with themselves carry CORS headers too, and the frontend sees a retryable error.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
@@ -20,10 +204,34 @@ Base.metadata.create_all(bind=engine)
 
 
 @app.get("/health")
+@app.get("/health/live")
 def health():
+    """Liveness: the process is serving requests. Never touches the database."""
     return {"status": "ok"}
 
 
+@app.get("/health/ready")
+def health_ready():
+    """Readiness, from the health monitor's cached probe: `503` while the database is unreachable, stale or lagging."""
+    snapshot = health_monitor.snapshot()
+    return JSONResponse(
+        {"status": "ok" if snapshot["ready"] else "unavailable", **snapshot},
+        status_code=200 if snapshot["ready"] else 503,
+    )
+
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "coalescing": coalescing_stats.snapshot(),
+        "admission": {route_class: limiter.snapshot() for route_class, limiter in admission_limiters.items()},
+        "pool": pool_statistics(),
+        "views_pending": sum(view_counter.pending().values()),
+        "events": recipe_events.snapshot(),
+        "health": health_monitor.snapshot(),
+    }
+
+
 app.include_router(categories_router, prefix="/api")
 app.include_router(recipes_router, prefix="/api")
 
@@ -0,0 +1,17 @@
+from app.middleware.admission import AdmissionControlMiddleware, Limiter, limits_from_pool
+from app.middleware.circuit_breaker import CircuitBreakerMiddleware
+from app.middleware.coalescing import CoalescingMiddleware, CoalescingStats
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.profiling import ProfilingMiddleware, sign_profile_request
+
+__all__ = [
+    "AdmissionControlMiddleware",
+    "CircuitBreakerMiddleware",
+    "CoalescingMiddleware",
+    "CoalescingStats",
+    "CompressionMiddleware",
+    "Limiter",
+    "ProfilingMiddleware",
+    "limits_from_pool",
+    "sign_profile_request",
+]
@@ -0,0 +1,162 @@
+import asyncio
+import math
+from collections import deque
+from typing import Deque, Dict, Optional, Sequence, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+READ, WRITE, BULK = "read", "write", "bulk"
+ROUTE_CLASSES = (READ, WRITE, BULK)
+
+# Share of the pool each class may occupy when its limit is derived from the pool.
+POOL_SHARES = {READ: 0.6, WRITE: 0.3, BULK: 0.1}
+
+
+def limits_from_pool(capacity: Optional[int], overrides: Dict[str, int], fallback: int = 40) -> Dict[str, int]:
+    """
+    Per-class concurrency limits: explicit overrides win, the rest split the pool's capacity.
+
+    Keeping the admitted total within the pool means an admitted request never waits for a
+    connection, so it never parks a threadpool thread on `pool_timeout` either.
+
+    Args:
+        capacity: `pool_size + max_overflow` of the engine's pool, or None if unbounded.
+        overrides: Limits configured explicitly; values of 0 or less are ignored.
+        fallback: Total budget to split when the pool is unbounded (the default threadpool size).
+    """
+    budget = capacity if capacity is not None else fallback
+    return {
+        route_class: overrides.get(route_class, 0) or max(1, int(budget * POOL_SHARES[route_class]))
+        for route_class in ROUTE_CLASSES
+    }
+
+
+class Limiter:
+    """
+    At most `limit` holders at a time, with a bounded FIFO queue of waiters.
+
+    A released slot is handed straight to the longest-waiting request rather than returned to
+    the pool of free slots, so newcomers cannot overtake the queue.
+    """
+
+    def __init__(self, limit: int, queue_size: int) -> None:
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+
+    async def acquire(self, timeout: float) -> bool:
+        """Take a slot, waiting at most `timeout` seconds in the queue; False means shed the request."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # The slot was handed over just as the deadline passed; keep it.
+                self.admitted += 1
+                return True
+            self._waiters.remove(waiter)
+            waiter.cancel()
+            self.rejected += 1
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+                waiter.cancel()
+            raise
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+def classify(method: str, path: str, bulk_routes: Sequence[Tuple[str, str]]) -> str:
+    """Route class of a request: bulk/export routes by exact match, otherwise by HTTP method."""
+    if (method, path.rstrip("/") or "/") in bulk_routes:
+        return BULK
+    return READ if method in ("GET", "HEAD", "OPTIONS") else WRITE
+
+
+class AdmissionControlMiddleware:
+    """
+    Bound concurrent requests per route class and shed the excess quickly.
+
+    Requests are classified as reads, writes or bulk/export (`bulk_routes`), and each class has
+    its own `Limiter`. A request over its class limit waits in the limiter's bounded queue for at
+    most `queue_timeout` seconds; if the queue is full or the deadline passes it gets an immediate
+    `503` with `Retry-After`, instead of queueing for a database connection until the client
+    gives up. Paths under `exempt_prefixes` (health checks, metrics) are never limited.
+
+    Args:
+        app: The ASGI application to wrap.
+        limiters: One `Limiter` per route class; pass shared instances to report them elsewhere.
+        queue_timeout: Seconds a queued request may wait for a slot.
+        retry_after: Value of the `Retry-After` header on rejections, in seconds.
+        bulk_routes: `(method, path)` pairs classified as bulk/export.
+        exempt_prefixes: Path prefixes that bypass admission control.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiters: Dict[str, Limiter],
+        queue_timeout: float = 2.0,
+        retry_after: float = 1.0,
+        bulk_routes: Sequence[Tuple[str, str]] = (),
+        exempt_prefixes: Sequence[str] = (),
+    ) -> None:
+        self.app = app
+        self.limiters = limiters
+        self.queue_timeout = queue_timeout
+        self.retry_after = str(max(1, math.ceil(retry_after)))
+        self.bulk_routes = tuple(bulk_routes)
+        self.exempt_prefixes = tuple(exempt_prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters[classify(scope["method"], scope["path"], self.bulk_routes)]
+        if not await limiter.acquire(self.queue_timeout):
+            response = JSONResponse(
+                {"detail": "Server is overloaded, retry later"},
+                status_code=503,
+                headers={"Retry-After": self.retry_after},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
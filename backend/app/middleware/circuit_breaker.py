@@ -0,0 +1,70 @@
+import math
+from typing import Sequence
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.health import CircuitBreaker
+
+# Errors meaning the database could not be reached, as opposed to a bad query. Not the pool's
+# `TimeoutError`: an exhausted pool is saturation, which admission control sheds, not an outage.
+CONNECTION_ERRORS = (OperationalError, InterfaceError)
+
+
+class CircuitBreakerMiddleware:
+    """
+    Fail requests fast with a `503` while the database is known to be down.
+
+    While `breaker` is open, requests are rejected before they reach a route, instead of each one
+    waiting up to `pool_timeout` for a connection that will not come. Requests that fail with a
+    connection error count as failures, so an outage opens the circuit even between health
+    probes. A successful probe closes it again, and so does a trial request (one per the
+    breaker's `cooldown`) that gets through without a connection error. Paths under
+    `exempt_prefixes` (health checks, metrics) always pass.
+
+    Args:
+        app: The ASGI application to wrap.
+        breaker: The circuit breaker shared with the health monitor.
+        retry_after: Value of the `Retry-After` header on rejections, in seconds.
+        exempt_prefixes: Path prefixes that bypass the breaker.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        breaker: CircuitBreaker,
+        retry_after: float = 5.0,
+        exempt_prefixes: Sequence[str] = (),
+    ) -> None:
+        self.app = app
+        self.breaker = breaker
+        self.retry_after = str(max(1, math.ceil(retry_after)))
+        self.exempt_prefixes = tuple(exempt_prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        if not self.breaker.allow():
+            response = JSONResponse(
+                {"detail": "Database unavailable, retry later"},
+                status_code=503,
+                headers={"Retry-After": self.retry_after},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        except CONNECTION_ERRORS:
+            self.breaker.record_failure()
+            raise
+        except Exception:
+            # Failed for another reason: the database answered, or was not needed.
+            self.breaker.record_success()
+            raise
+        else:
+            # Resets the count, so only consecutive failures open the circuit (or closes it after a trial).
+            self.breaker.record_success()
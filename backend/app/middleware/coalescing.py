@@ -0,0 +1,153 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Pattern, Tuple
+from urllib.parse import parse_qsl
+
+from starlette.convertors import Convertor
+from starlette.requests import Request
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.negotiation import wants_msgpack
+from app.middleware.compression import negotiate_encoding
+
+CoalescingKey = Tuple[str, Tuple, Tuple, bool, Optional[str], Optional[str]]
+# (status, headers, body) of a buffered response.
+CapturedResponse = Tuple[int, List[Tuple[bytes, bytes]], bytes]
+# Called as (route template, path parameters, status) for every request served a copy.
+ReplayHook = Callable[[str, Dict[str, Any], int], None]
+
+
+class CoalescingStats:
+    """Counters for `CoalescingMiddleware`; `ratio` is the share of eligible requests served from another's fetch."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    @property
+    def ratio(self) -> float:
+        return self.coalesced / self.requests if self.requests else 0.0
+
+    def snapshot(self) -> Dict[str, float]:
+        return {"requests": self.requests, "coalesced": self.coalesced, "timeouts": self.timeouts, "ratio": self.ratio}
+
+
+class _Flight:
+    def __init__(self, future: "asyncio.Future[Optional[CapturedResponse]]", deadline: float) -> None:
+        self.future = future
+        self.deadline = deadline
+
+
+class CoalescingMiddleware:
+    """
+    Share one in-flight execution among concurrent identical GET requests (singleflight).
+
+    A request to one of `routes` is keyed by its route template, its converted path parameters
+    (so `/recipes/007` and `/recipes/7` coincide), its query parameters sorted by name, and the
+    negotiated response format, encoding and CORS origin. The first request for a key runs
+    normally and its complete response is buffered; requests with the same key that arrive while
+    it is running wait for it and receive a copy, without touching the database or serializing
+    anything themselves. Nothing is kept once the response is sent, so this never serves data
+    older than a request already in progress.
+
+    Each route has its own timeout: followers wait at most that long before running the request
+    themselves, and a flight older than that no longer accepts followers. If the leading request
+    fails or is cancelled, its followers also run on their own.
+
+    Followers never reach the handler, so per-request side effects a handler performs (counting
+    a view) must be repeated for them through `on_replay`.
+
+    Args:
+        app: The ASGI application to wrap.
+        routes: Route templates (Starlette syntax, e.g. `/api/recipes/{recipe_id:int}`) mapped to
+            their timeout in seconds.
+        stats: Counters to update; pass a shared instance to expose them elsewhere.
+        on_replay: Called for each follower served a copy of the leader's response.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        routes: Mapping[str, float],
+        stats: Optional[CoalescingStats] = None,
+        on_replay: Optional[ReplayHook] = None,
+    ) -> None:
+        self.app = app
+        self.routes: List[Tuple[str, Pattern, Dict[str, Convertor], float]] = []
+        for template, timeout in routes.items():
+            pattern, _, convertors = compile_path(template)
+            self.routes.append((template, pattern, convertors, timeout))
+        self.stats = stats or CoalescingStats()
+        self.on_replay = on_replay
+        self._flights: Dict[CoalescingKey, _Flight] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        matched = self._match(scope) if scope["type"] == "http" and scope["method"] == "GET" else None
+        if matched is None:
+            await self.app(scope, receive, send)
+            return
+
+        key, timeout = matched
+        self.stats.requests += 1
+        flight = self._flights.get(key)
+        if flight is not None and time.monotonic() < flight.deadline:
+            try:
+                response = await asyncio.wait_for(asyncio.shield(flight.future), timeout)
+            except asyncio.TimeoutError:
+                self.stats.timeouts += 1
+                response = None
+            if response is not None:
+                self.stats.coalesced += 1
+                if self.on_replay is not None:
+                    template, params = key[0], key[1]
+                    self.on_replay(template, dict(params), response[0])
+                await self._replay(response, send)
+                return
+            await self.app(scope, receive, send)
+            return
+
+        flight = _Flight(asyncio.get_running_loop().create_future(), time.monotonic() + timeout)
+        self._flights[key] = flight
+        response = None
+        try:
+            response = await self._capture(scope, receive)
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            # None tells followers to run the request themselves.
+            flight.future.set_result(response)
+        await self._replay(response, send)
+
+    def _match(self, scope: Scope) -> Optional[Tuple[CoalescingKey, float]]:
+        path = scope["path"]
+        for template, pattern, convertors, timeout in self.routes:
+            found = pattern.match(path)
+            if found is None:
+                continue
+            params = tuple(sorted((name, convertors[name].convert(value)) for name, value in found.groupdict().items()))
+            # Sort by name only: a stable sort keeps the order of repeated values such as `?ids=3&ids=1`.
+            query_pairs = parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)
+            query = tuple(sorted(query_pairs, key=lambda item: item[0]))
+            request = Request(scope)
+            encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+            key = (template, params, query, wants_msgpack(request), encoding, request.headers.get("origin"))
+            return key, timeout
+        return None
+
+    async def _capture(self, scope: Scope, receive: Receive) -> CapturedResponse:
+        messages: List[Message] = []
+
+        async def collect(message: Message) -> None:
+            messages.append(message)
+
+        await self.app(scope, receive, collect)
+        start = next(message for message in messages if message["type"] == "http.response.start")
+        body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+        return start["status"], list(start.get("headers", [])), body
+
+    async def _replay(self, response: CapturedResponse, send: Send) -> None:
+        status, headers, body = response
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
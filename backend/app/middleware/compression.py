@@ -0,0 +1,105 @@
+import gzip
+from typing import Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.negotiation import parse_accept
+
+# Encodings in server preference order; brotli wins ties because it is smaller at similar CPU cost.
+SUPPORTED_ENCODINGS = ("br", "gzip")
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/msgpack", "application/x-msgpack", "application/javascript")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported content-coding for an `Accept-Encoding` header, or None."""
+    preferences = parse_accept(accept_encoding)
+    wildcard = preferences.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = preferences.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compress complete responses with brotli or gzip, as negotiated via `Accept-Encoding`.
+
+    Responses smaller than `minimum_size`, responses that are already encoded, and
+    non-compressible media types pass through untouched. Streaming responses (more than one
+    body message) are never buffered, so long-lived streams keep flowing. Every compressible
+    response carries `Vary: Accept-Encoding`, compressed or not, so shared caches never hand
+    one client's representation to a client that negotiated another.
+
+    Args:
+        app: The ASGI application to wrap.
+        minimum_size: Smallest body, in bytes, worth compressing.
+        gzip_level: zlib compression level for gzip (1-9).
+        brotli_quality: Brotli quality (0-11); mid values suit per-request compression.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send: Send) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        headers = MutableHeaders(raw=list(self.start_message["headers"]))
+        body = message.get("body", b"")
+        if self._compressible(headers):
+            headers.add_vary_header("Accept-Encoding")
+            self.start_message["headers"] = headers.raw
+        if self.encoding is None or message.get("more_body", False) or not self._should_compress(headers, body):
+            self.passthrough = True
+            await self.send(self.start_message)
+            await self.send(message)
+            return
+
+        compressed = self.middleware.compress(body, self.encoding)
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed))
+        self.start_message["headers"] = headers.raw
+        await self.send(self.start_message)
+        await self.send({"type": "http.response.body", "body": compressed})
+
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        # Whether some Accept-Encoding could change this response, whatever this request sent.
+        return "content-encoding" not in headers and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+    def _should_compress(self, headers: MutableHeaders, body: bytes) -> bool:
+        return len(body) >= self.middleware.minimum_size and self._compressible(headers)
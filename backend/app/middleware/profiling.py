@@ -0,0 +1,328 @@
+import asyncio
+import contextvars
+import hashlib
+import hmac
+import json
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+TOKEN_HEADER = b"x-profile-token"
+SIGNATURE_HEADER = b"x-profile-signature"
+OUTPUT_HEADER = b"x-profile-output"
+TOP_FUNCTIONS = 10
+
+# Frames from these modules count towards `pydantic` time: model validation and serialization,
+# and FastAPI's adapters that call into them for request bodies and response models.
+_PYDANTIC_PATH = re.compile(r"[/\\](pydantic|pydantic_core|fastapi[/\\]_compat)[/\\]")
+
+_current_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("current_profile", default=None)
+
+StackEntry = Tuple[str, str, int]  # (function, file, first line)
+
+
+def sign_profile_request(secret: str, method: str, path: str, expires: int) -> str:
+    """Value of `X-Profile-Signature` that lets `METHOD path` be profiled until `expires` (Unix time)."""
+    message = f"{expires}:{method.upper()}:{path}".encode()
+    return f"{expires}:{hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()}"
+
+
+def _valid_signature(secret: str, method: str, path: str, value: str) -> bool:
+    expires, _, _ = value.partition(":")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(sign_profile_request(secret, method, path, int(expires)), value)
+
+
+def _short_path(filename: str) -> str:
+    # Longest matching sys.path entry first, so site-packages wins over a parent directory.
+    for root in sorted((entry for entry in sys.path if entry), key=len, reverse=True):
+        if filename.startswith(root + os.sep):
+            return filename[len(root) + 1 :]
+    return filename
+
+
+class RequestProfile:
+    """Samples and SQL timings collected for one request."""
+
+    def __init__(self, loop_thread: int, task: Optional["asyncio.Task"]) -> None:
+        self.loop_thread = loop_thread
+        self.task = task
+        self.loop = asyncio.get_running_loop()
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.ticks = 0
+        # Seconds attributed to each distinct stack.
+        self.stacks: Counter = Counter()
+        self.pydantic_seconds = 0.0
+        self.sql_seconds = 0.0
+        self.queries = 0
+
+    def owns(self, thread_id: int, frame: FrameType) -> bool:
+        """Whether `frame`'s thread is working on this request right now."""
+        if thread_id == self.loop_thread:
+            return asyncio.current_task(self.loop) is self.task
+        # Threadpool workers run each call inside a copy of the caller's context; find it near
+        # the bottom of the stack, where the worker loop invokes `context.run(...)`.
+        frames: List[FrameType] = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        for position in range(len(frames) - 1, max(len(frames) - 5, 0), -1):
+            candidate = frames[position]
+            if "context" in candidate.f_code.co_varnames:
+                context = candidate.f_locals.get("context")
+                if isinstance(context, contextvars.Context):
+                    # Between calls the worker keeps its last context while it waits for work.
+                    idle = frames[position - 1].f_code.co_filename == queue.__file__
+                    return not idle and context.get(_current_profile) is self
+        return False
+
+    def record(self, stacks: List[Tuple[StackEntry, ...]], seconds: float) -> None:
+        """Attribute the `seconds` since the previous sample to each of the sampled stacks."""
+        self.ticks += 1
+        pydantic = False
+        for stack in stacks:
+            self.stacks[stack] += seconds
+            pydantic = pydantic or any(_PYDANTIC_PATH.search(filename) for _, filename, _ in stack)
+        if pydantic:
+            self.pydantic_seconds += seconds
+
+    def finish(self) -> None:
+        self.elapsed = time.perf_counter() - self.started
+
+    def summary(self) -> Dict:
+        """Wall time, SQL and Pydantic time, and the functions with the most samples."""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, seconds in self.stacks.items():
+            own[stack[-1]] += seconds
+            for entry in set(stack):
+                total[entry] += seconds
+        return {
+            "total_ms": round(self.elapsed * 1000, 2),
+            "samples": self.ticks,
+            "sql_ms": round(self.sql_seconds * 1000, 2),
+            "queries": self.queries,
+            "pydantic_ms": round(self.pydantic_seconds * 1000, 2),
+            "top": [
+                {
+                    "function": f"{function} ({_short_path(filename)}:{line})",
+                    "self_ms": round(seconds * 1000, 2),
+                    "total_ms": round(total[(function, filename, line)] * 1000, 2),
+                }
+                for (function, filename, line), seconds in own.most_common(TOP_FUNCTIONS)
+            ],
+        }
+
+    def folded(self) -> str:
+        """Stacks in the collapsed format read by flamegraph.pl, speedscope and inferno, weighted in microseconds."""
+        return "".join(
+            ";".join(f"{function} ({_short_path(filename)}:{line})" for function, filename, line in stack)
+            + f" {round(seconds * 1_000_000)}\n"
+            for stack, seconds in self.stacks.most_common()
+        )
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, profile: RequestProfile, interval: float) -> None:
+        super().__init__(name="request-profiler", daemon=True)
+        self.profile = profile
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        me = threading.get_ident()
+        previous = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            # Ticks stretch while a busy thread holds the GIL, so weight each by its real length.
+            now = time.perf_counter()
+            seconds, previous = now - previous, now
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != me and self.profile.owns(thread_id, frame):
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                        frame = frame.f_back
+                    stacks.append(tuple(reversed(stack)))
+            if stacks:
+                self.profile.record(stacks, seconds)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+_sql_hooks_installed = False
+_sql_hooks_lock = threading.Lock()
+
+
+def _install_sql_hooks() -> None:
+    # Installed on first use, so an app that is never profiled never pays for the listeners.
+    global _sql_hooks_installed
+    with _sql_hooks_lock:
+        if _sql_hooks_installed:
+            return
+
+        @event.listens_for(Engine, "before_cursor_execute")
+        def _start_query(conn, cursor, statement, parameters, context, executemany):
+            if _current_profile.get() is not None:
+                conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+        @event.listens_for(Engine, "after_cursor_execute")
+        def _end_query(conn, cursor, statement, parameters, context, executemany):
+            profile = _current_profile.get()
+            if profile is not None and conn.info.get("profile_query_start"):
+                profile.sql_seconds += time.perf_counter() - conn.info["profile_query_start"].pop()
+                profile.queries += 1
+
+        _sql_hooks_installed = True
+
+
+class ProfilingMiddleware:
+    """
+    Profile individual requests on demand with a sampling profiler.
+
+    A request is profiled only if it carries `X-Profile-Token: <admin_token>` or a valid
+    `X-Profile-Signature` from `sign_profile_request` (bound to its method and path, and
+    expiring), and then only with probability `sample_rate`, and only if fewer than
+    `max_concurrent` profiles are running. Every other request goes straight through; the SQL
+    timing listeners are not even installed until the first profile.
+
+    While a request is profiled, a sampler thread records every `interval` seconds the stack
+    of each thread working on it: the event loop while the request's task runs, and threadpool
+    workers running its sync endpoint, dependencies and response validation. SQL time comes
+    from cursor execution events; Pydantic time from samples inside pydantic or FastAPI's
+    validation adapters.
+
+    The response gets a `Server-Timing` header (total, sql, pydantic) and `X-Profile-Summary`
+    with the same figures plus the top functions by own time. With `X-Profile-Output: flamegraph`
+    the collapsed stacks are also written to `directory` (keeping the newest `max_files`) and
+    the file name is returned in `X-Profile-File`.
+
+    Args:
+        app: The ASGI application to wrap.
+        secret: HMAC key for signed requests; empty disables them.
+        admin_token: Token accepted in `X-Profile-Token`; empty disables it.
+        sample_rate: Share of triggered requests that are actually profiled.
+        interval: Seconds between stack samples.
+        directory: Where flamegraph files are written.
+        max_files: Flamegraph files kept; older ones are deleted.
+        max_concurrent: Requests profiled at the same time.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        secret: str = "",
+        admin_token: str = "",
+        sample_rate: float = 1.0,
+        interval: float = 0.001,
+        directory: str = ".profiles",
+        max_files: int = 50,
+        max_concurrent: int = 1,
+    ) -> None:
+        self.app = app
+        self.secret = secret
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self.max_concurrent = max_concurrent
+        self.active = 0
+
+    def _triggered(self, scope: Scope) -> Tuple[bool, bool]:
+        """(profile this request, write a flamegraph)."""
+        token = signature = output = None
+        for name, value in scope["headers"]:
+            if name == TOKEN_HEADER:
+                token = value.decode("latin-1")
+            elif name == SIGNATURE_HEADER:
+                signature = value.decode("latin-1")
+            elif name == OUTPUT_HEADER:
+                output = value.decode("latin-1")
+        if token is None and signature is None:
+            return False, False
+
+        authorized = (self.admin_token and token is not None and hmac.compare_digest(token, self.admin_token)) or (
+            self.secret and signature is not None and _valid_signature(self.secret, scope["method"], scope["path"], signature)
+        )
+        if not authorized or random.random() >= self.sample_rate or self.active >= self.max_concurrent:
+            return False, False
+        return True, output == "flamegraph"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profiled, flamegraph = self._triggered(scope)
+        if not profiled:
+            await self.app(scope, receive, send)
+            return
+
+        _install_sql_hooks()
+        self.active += 1
+        profile = RequestProfile(threading.get_ident(), asyncio.current_task())
+        token = _current_profile.set(profile)
+        sampler = _Sampler(profile, self.interval)
+        sampler.start()
+        # The GIL is handed over every switch interval at most; shorten it so samples land on time.
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(switch_interval, self.interval))
+
+        async def send_with_profile(message: Message) -> None:
+            if message["type"] == "http.response.start" and sampler.is_alive():
+                # The body is complete by now for ordinary responses, so the profile covers
+                # the endpoint and serialization.
+                sampler.stop()
+                profile.finish()
+                headers = MutableHeaders(scope=message)
+                self._attach(headers, profile, scope, flamegraph)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            if sampler.is_alive():
+                sampler.stop()
+            sys.setswitchinterval(switch_interval)
+            _current_profile.reset(token)
+            self.active -= 1
+
+    def _attach(self, headers: MutableHeaders, profile: RequestProfile, scope: Scope, flamegraph: bool) -> None:
+        summary = profile.summary()
+        headers["Server-Timing"] = (
+            f"total;dur={summary['total_ms']}, "
+            f'sql;dur={summary["sql_ms"]};desc="{summary["queries"]} queries", '
+            f"pydantic;dur={summary['pydantic_ms']}"
+        )
+        headers["X-Profile-Summary"] = json.dumps(summary, separators=(",", ":"))
+        if flamegraph:
+            headers["X-Profile-File"] = self._write_flamegraph(profile, scope)
+
+    def _write_flamegraph(self, profile: RequestProfile, scope: Scope) -> str:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-") or "root"
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{scope['method']}-{slug}-{uuid.uuid4().hex[:8]}.folded"
+        (self.directory / name).write_text(profile.folded())
+        files = sorted(self.directory.glob("*.folded"), key=lambda path: path.stat().st_mtime)
+        for stale in files[: max(0, len(files) - self.max_files)]:
+            stale.unlink(missing_ok=True)
+        return name
@@ -0,0 +1,82 @@
+import hashlib
+import re
+from typing import Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+NUM_PERM = 128
+# 16 bands of 8 rows: recipes with Jaccard similarity around 0.7 collide in at least one band
+# about half the time, and near-identical copies (>= 0.85) almost always do.
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Fixed seed: signatures are persisted and compared across processes and releases.
+_PERMUTATIONS = np.random.RandomState(1).randint(1, int(_MERSENNE_PRIME), size=(2, NUM_PERM), dtype=np.uint64)
+
+
+def recipe_shingles(ingredient_names: Iterable[str], instructions: Optional[str]) -> Set[str]:
+    """Whole normalized ingredient names plus overlapping word 3-grams of the instructions."""
+    shingles = set()
+    for name in ingredient_names:
+        tokens = TOKEN_PATTERN.findall(name.lower())
+        if tokens:
+            shingles.add("i:" + " ".join(tokens))
+
+    words = TOKEN_PATTERN.findall((instructions or "").lower())
+    if 0 < len(words) < SHINGLE_SIZE:
+        shingles.add("s:" + " ".join(words))
+    for start in range(len(words) - SHINGLE_SIZE + 1):
+        shingles.add("s:" + " ".join(words[start : start + SHINGLE_SIZE]))
+    return shingles
+
+
+def signature(shingles: Set[str]) -> Optional[np.ndarray]:
+    """
+    MinHash signature of a shingle set: for each of `NUM_PERM` hash functions, the minimum hash.
+
+    Returns:
+        A `uint32` array of length `NUM_PERM`, or None for an empty set (nothing to compare).
+    """
+    if not shingles:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=4).digest(), "little") for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    a, b = _PERMUTATIONS
+    # Universal hashing (a*x + b) mod p for every shingle/permutation pair at once.
+    permuted = ((hashes[:, np.newaxis] * a + b) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_buckets(minhash: np.ndarray) -> List[Tuple[int, int]]:
+    """The `(band, bucket)` keys under which a signature is filed in the LSH index."""
+    return [
+        (
+            band,
+            int.from_bytes(
+                hashlib.blake2b(minhash[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND].tobytes(), digest_size=8).digest(),
+                "little",
+                signed=True,
+            ),
+        )
+        for band in range(BANDS)
+    ]
+
+
+def from_bytes(value: Optional[bytes]) -> Optional[np.ndarray]:
+    """Decode a stored signature; empty or missing values mean the recipe has nothing to compare."""
+    if not value:
+        return None
+    return np.frombuffer(value, dtype=np.uint32)
+
+
+def similarity(minhash: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity of one signature against each row of `others`."""
+    return (others == minhash).mean(axis=1)
@@ -1,6 +1,9 @@
 from app.database import Base
 from app.models.category import Category
+from app.models.category_stats import CategoryStats
 from app.models.ingredient import Ingredient
 from app.models.recipe import Recipe
+from app.models.recipe_minhash_band import RecipeMinHashBand
+from app.models.recipe_stats import RecipeStats
 
-__all__ = ["Base", "Category", "Ingredient", "Recipe"]
+__all__ = ["Base", "Category", "CategoryStats", "Ingredient", "Recipe", "RecipeMinHashBand", "RecipeStats"]
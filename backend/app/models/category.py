@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text
+from typing import Optional
+
+from sqlalchemy import Column, Integer, String, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -8,7 +10,30 @@ class Category(Base):
     __tablename__ = "categories"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(100), unique=True, nullable=False, index=True)
+    name = Column(String(100), nullable=False, index=True)
     description = Column(Text, nullable=True)
+    # Household or collection the row belongs to under ShardedStorage; "" in an unsharded database.
+    tenant = Column(String(64), nullable=False, default="", server_default="")
+
+    # passive_deletes: recipes.category_id is ON DELETE SET NULL, so deleting a category never loads its recipes.
+    recipes = relationship("Recipe", back_populates="category", passive_deletes=True)
+    stats = relationship("CategoryStats", uselist=False, viewonly=True)
+
+    # Names are unique per tenant; the constraint's leading column also serves tenant lookups.
+    __table_args__ = (UniqueConstraint("tenant", "name", name="uq_categories_tenant_name"),)
+
+    @property
+    def recipe_count(self) -> int:
+        return self.stats.recipe_count if self.stats is not None else 0
+
+    @property
+    def avg_prep_time(self) -> Optional[float]:
+        if self.stats is None or not self.stats.prep_time_count:
+            return None
+        return self.stats.prep_time_total / self.stats.prep_time_count
 
-    recipes = relationship("Recipe", back_populates="category")
+    @property
+    def avg_cook_time(self) -> Optional[float]:
+        if self.stats is None or not self.stats.cook_time_count:
+            return None
+        return self.stats.cook_time_total / self.stats.cook_time_count
@@ -0,0 +1,132 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Column, ForeignKey, Integer, delete, event, inspect, insert, select, update
+
+from app.database import Base
+from app.models.category import Category
+from app.models.recipe import Recipe
+
+
+class CategoryStats(Base):
+    """
+    Denormalized per-category counters kept in step with `recipes` by the ORM events below.
+
+    Sums and counts are stored instead of averages so every change is a simple increment.
+    `crud.reconcile_category_stats` recomputes them from scratch to repair any drift
+    (e.g. rows written outside the ORM).
+    """
+
+    __tablename__ = "category_stats"
+
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    recipe_count = Column(Integer, nullable=False, default=0, server_default="0")
+    prep_time_total = Column(Integer, nullable=False, default=0, server_default="0")
+    prep_time_count = Column(Integer, nullable=False, default=0, server_default="0")
+    cook_time_total = Column(Integer, nullable=False, default=0, server_default="0")
+    cook_time_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+_TRACKED_FIELDS = ("category_id", "prep_time", "cook_time")
+
+
+def _apply_delta(connection, category_id, prep_time, cook_time, sign: int) -> None:
+    if category_id is None:
+        return
+
+    table = CategoryStats.__table__
+    connection.execute(
+        update(table)
+        .where(table.c.category_id == category_id)
+        .values(
+            recipe_count=table.c.recipe_count + sign,
+            prep_time_total=table.c.prep_time_total + sign * (prep_time or 0),
+            prep_time_count=table.c.prep_time_count + sign * int(prep_time is not None),
+            cook_time_total=table.c.cook_time_total + sign * (cook_time or 0),
+            cook_time_count=table.c.cook_time_count + sign * int(cook_time is not None),
+        )
+    )
+
+
+def subtract_deleted_recipes(connection, rows: Iterable[Tuple[Optional[int], Optional[int], Optional[int]]]) -> None:
+    """
+    Remove recipes deleted in bulk from the counters, issuing one UPDATE per affected category.
+
+    Args:
+        rows: `(category_id, prep_time, cook_time)` of each deleted recipe, e.g. from `DELETE ... RETURNING`.
+    """
+    totals: Dict[int, List[int]] = defaultdict(lambda: [0, 0, 0, 0, 0])
+    for category_id, prep_time, cook_time in rows:
+        if category_id is None:
+            continue
+        total = totals[category_id]
+        total[0] += 1
+        total[1] += prep_time or 0
+        total[2] += int(prep_time is not None)
+        total[3] += cook_time or 0
+        total[4] += int(cook_time is not None)
+
+    table = CategoryStats.__table__
+    for category_id, (count, prep_total, prep_count, cook_total, cook_count) in totals.items():
+        connection.execute(
+            update(table)
+            .where(table.c.category_id == category_id)
+            .values(
+                recipe_count=table.c.recipe_count - count,
+                prep_time_total=table.c.prep_time_total - prep_total,
+                prep_time_count=table.c.prep_time_count - prep_count,
+                cook_time_total=table.c.cook_time_total - cook_total,
+                cook_time_count=table.c.cook_time_count - cook_count,
+            )
+        )
+
+
+def insert_stats_row(connection, category_id: int) -> None:
+    """Create the zeroed stats row for a new category (bulk/upsert inserts bypass the mapper event)."""
+    connection.execute(insert(CategoryStats.__table__).values(category_id=category_id))
+
+
+@event.listens_for(Category, "after_insert")
+def _create_stats_row(mapper, connection, target):
+    insert_stats_row(connection, target.id)
+
+
+@event.listens_for(Category, "before_delete")
+def _delete_stats_row(mapper, connection, target):
+    # Explicit so SQLite connections without `PRAGMA foreign_keys=ON` do not leave orphans behind.
+    connection.execute(delete(CategoryStats.__table__).where(CategoryStats.category_id == target.id))
+
+
+@event.listens_for(Recipe, "after_insert")
+def _count_new_recipe(mapper, connection, target):
+    _apply_delta(connection, target.category_id, target.prep_time, target.cook_time, 1)
+
+
+@event.listens_for(Recipe, "before_update")
+def _move_updated_recipe(mapper, connection, target):
+    state = inspect(target)
+    histories = {field: state.attrs[field].history for field in _TRACKED_FIELDS}
+    if not any(history.has_changes() for history in histories.values()):
+        return
+
+    old_values = {}
+    for field, history in histories.items():
+        if history.deleted:
+            old_values[field] = history.deleted[0]
+        elif history.unchanged:
+            old_values[field] = history.unchanged[0]
+
+    if len(old_values) < len(_TRACKED_FIELDS):
+        # The previous value was never loaded; the row has not been rewritten yet, so read it.
+        row = connection.execute(
+            select(Recipe.category_id, Recipe.prep_time, Recipe.cook_time).where(Recipe.id == target.id)
+        ).one()
+        old_values = dict(row._mapping)
+
+    _apply_delta(connection, old_values["category_id"], old_values["prep_time"], old_values["cook_time"], -1)
+    _apply_delta(connection, target.category_id, target.prep_time, target.cook_time, 1)
+
+
+@event.listens_for(Recipe, "before_delete")
+def _uncount_deleted_recipe(mapper, connection, target):
+    _apply_delta(connection, target.category_id, target.prep_time, target.cook_time, -1)
@@ -1,7 +1,7 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, LargeBinary, String, Text
+from sqlalchemy.orm import deferred, relationship
 
 from app.database import Base
 
@@ -19,6 +19,19 @@ class Recipe(Base):
     category_id = Column(Integer, ForeignKey("categories.id", ondelete="SET NULL"), nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # MinHash signature of ingredient names and instruction shingles (see app.minhash); deferred so
+    # ordinary reads do not carry it. Empty when the recipe has nothing to fingerprint.
+    minhash = deferred(Column(LargeBinary, nullable=True))
+    # Earliest recipe this one is a near-duplicate of, if any.
+    duplicate_of_id = Column(Integer, ForeignKey("recipes.id", ondelete="SET NULL"), nullable=True, index=True)
+    # Household or collection the row belongs to under ShardedStorage; "" in an unsharded database.
+    tenant = Column(String(64), nullable=False, default="", server_default="", index=True)
 
     category = relationship("Category", back_populates="recipes")
-    ingredients = relationship("Ingredient", back_populates="recipe", cascade="all, delete-orphan")
+    # passive_deletes: ingredients.recipe_id is ON DELETE CASCADE, so the database removes them.
+    ingredients = relationship("Ingredient", back_populates="recipe", cascade="all, delete-orphan", passive_deletes=True)
+
+    # Every UPDATE is issued as `... WHERE id = :id AND version = :loaded_version` and bumps the
+    # counter, so a concurrent edit makes the flush raise StaleDataError instead of being lost.
+    __mapper_args__ = {"version_id_col": version}
@@ -0,0 +1,20 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Index, Integer, SmallInteger
+
+from app.database import Base
+
+
+class RecipeMinHashBand(Base):
+    """
+    LSH banding index over `Recipe.minhash`: one row per recipe and band.
+
+    Recipes whose signatures agree on every row of some band share that band's bucket, so near
+    duplicates are found with one indexed lookup per band instead of comparing against the catalog.
+    """
+
+    __tablename__ = "recipe_minhash_bands"
+
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    band = Column(SmallInteger, primary_key=True)
+    bucket = Column(BigInteger, nullable=False)
+
+    __table_args__ = (Index("ix_recipe_minhash_bands_band_bucket", "band", "bucket"),)
@@ -0,0 +1,19 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Index, Integer
+
+from app.database import Base
+
+
+class RecipeStats(Base):
+    """
+    Per-recipe view counters, kept out of `recipes` so counting a view never locks or rewrites a recipe row.
+
+    Written only in batches by `crud.add_recipe_views`; the `(view_count, recipe_id)` index serves
+    the most-popular listing as a backward index scan.
+    """
+
+    __tablename__ = "recipe_stats"
+
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    view_count = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (Index("ix_recipe_stats_view_count", "view_count", "recipe_id"),)
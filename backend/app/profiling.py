@@ -0,0 +1,31 @@
+"""
+Sign a request for on-demand profiling.
+
+Prints an `X-Profile-Signature` value, valid for `--ttl` seconds, that makes the API profile
+requests to exactly `METHOD PATH` (see `ProfilingMiddleware`). Signing needs PROFILING_SECRET;
+hand the header to whoever reproduces the slow request without sharing the secret.
+
+    python -m app.profiling GET /api/recipes --ttl 600
+    curl -H "X-Profile-Signature: $(python -m app.profiling GET /api/recipes)" \\
+         -H "X-Profile-Output: flamegraph" -D - -o /dev/null http://localhost:8000/api/recipes
+"""
+import argparse
+import time
+
+from app.config.settings import settings
+from app.middleware.profiling import sign_profile_request
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("method")
+    parser.add_argument("path", help="Exact request path, without the query string.")
+    parser.add_argument("--ttl", type=int, default=300, help="Seconds the signature stays valid.")
+    args = parser.parse_args()
+    if not settings.PROFILING_SECRET:
+        parser.error("PROFILING_SECRET is not set.")
+    print(sign_profile_request(settings.PROFILING_SECRET, args.method, args.path, int(time.time()) + args.ttl))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Move tenants onto the shard they route to.
+
+Shards are identified by their position in the list, so add capacity by appending a URL: about
+1/N of the tenants then hash to the new shard, and this tool creates its schema and copies each
+of them over (rows get new ids there), deleting them from the old shard. Run it before the
+application starts using the longer list, with writes for the moving tenants paused; a tenant
+that already lives where it routes is left alone, so it can be re-run. `--dry-run` only lists
+the moves.
+
+    python -m app.rebalance --dry-run
+    python -m app.rebalance --shard sqlite:///./data/shard-0.db --shard sqlite:///./data/shard-1.db
+"""
+import argparse
+import logging
+
+from app.bulkload import storage_for
+from app.config.settings import settings
+from app.storage import ShardedStorage
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--shard",
+        action="append",
+        dest="shards",
+        help="Shard database URL, in routing order; repeat for each shard. Defaults to SHARD_URLS.",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="List the moves without making them.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    urls = args.shards or [url.strip() for url in settings.SHARD_URLS.split(",") if url.strip()]
+    if not urls:
+        parser.error("no shards: pass --shard or set SHARD_URLS")
+
+    storage = ShardedStorage([storage_for(url) for url in urls])
+    try:
+        storage.initialize()
+        moves = storage.rebalance(dry_run=args.dry_run)
+    finally:
+        storage.close()
+    for move in moves:
+        if args.dry_run:
+            logger.info("Would move tenant %s from shard %d to %d", move.tenant, move.source, move.destination)
+    logger.info("%s %d tenant(s) across %d shards", "Would move" if args.dry_run else "Moved", len(moves), len(urls))
+
+
+if __name__ == "__main__":
+    main()
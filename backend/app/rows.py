@@ -0,0 +1,47 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+
+class CategoryRow(NamedTuple):
+    id: int
+    name: str
+    description: Optional[str]
+
+
+class IngredientRow(NamedTuple):
+    id: int
+    recipe_id: int
+    name: str
+    amount: Optional[str]
+    unit: Optional[str]
+
+
+@dataclass(slots=True)
+class RecipeRow:
+    """
+    Read-only recipe for listings: the columns of `models.Recipe` (minus its signature) without
+    the ORM's instance state.
+
+    Field order matches `RECIPE_COLUMNS` so a result row unpacks straight into it. Validates into
+    `schemas.Recipe` like an ORM instance does.
+    """
+
+    id: int
+    title: str
+    description: Optional[str]
+    instructions: Optional[str]
+    prep_time: Optional[int]
+    cook_time: Optional[int]
+    servings: Optional[int]
+    category_id: Optional[int]
+    created_at: datetime
+    updated_at: datetime
+    version: int
+    duplicate_of_id: Optional[int]
+    category: Optional[CategoryRow] = None
+    ingredients: List[IngredientRow] = field(default_factory=list)
+
+
+RECIPE_COLUMNS = tuple(name for name in RecipeRow.__dataclass_fields__ if name not in ("category", "ingredients"))
+INGREDIENT_COLUMNS = IngredientRow._fields
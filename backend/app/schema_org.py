@@ -0,0 +1,373 @@
+"""
+Extraction of schema.org `Recipe` data from crawled pages into `RecipeCreate`.
+
+Reads JSON-LD (`<script type="application/ld+json">`, including `@graph` and nested entities)
+and microdata (`itemscope`/`itemprop`), splits ingredient lines into name, amount and unit, and
+converts ISO 8601 durations to minutes. Only the standard library's HTML parser is used, and
+nothing here touches the database, so `parse_files` can run in worker processes.
+"""
+import html
+import json
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from pydantic import ValidationError
+
+from app import schemas
+
+# Column widths of the recipes and ingredients tables.
+MAX_TITLE = 200
+MAX_NAME = 200
+MAX_AMOUNT = 50
+
+# A recipe and the name of its `recipeCategory`, which the importer maps to a category id.
+ParsedRecipe = Tuple[schemas.RecipeCreate, Optional[str]]
+
+_VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+# Microdata properties whose value is an attribute rather than the element's text.
+# Start tags that end an open element whose end tag is optional, e.g. `<p>` is closed by a `<ul>`.
+_IMPLIED_END = {
+    "p": {"address", "article", "aside", "blockquote", "div", "dl", "fieldset", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "main", "nav", "ol", "p", "pre", "section", "table", "ul"},
+    "li": {"li"},
+}
+_VALUE_ATTRIBUTES = {"meta": "content", "a": "href", "link": "href", "img": "src", "source": "src", "time": "datetime", "data": "value", "meter": "value"}
+
+_JSON_LD = re.compile(r"<script\b[^>]*\btype\s*=\s*[\"']?application/ld\+json[\"']?[^>]*>(.*?)</script\s*>", re.IGNORECASE | re.DOTALL)
+_MICRODATA_CHUNK = 8192
+_TAG = re.compile(r"<[^>]+>")
+_SPACE = re.compile(r"[ \t\r\f\v\xa0]+")
+_SPACE_BEFORE_PUNCTUATION = re.compile(r" ([.,;:!?)])")
+_DURATION = re.compile(r"^P(?:(\d+(?:\.\d+)?)D)?(?:T(?:(\d+(?:\.\d+)?)H)?(?:(\d+(?:\.\d+)?)M)?(?:(\d+(?:\.\d+)?)S)?)?$", re.IGNORECASE)
+_INTEGER = re.compile(r"\d+")
+
+_UNICODE_FRACTIONS = {
+    "¼": "1/4", "½": "1/2", "¾": "3/4", "⅐": "1/7", "⅑": "1/9", "⅒": "1/10", "⅓": "1/3", "⅔": "2/3",
+    "⅕": "1/5", "⅖": "2/5", "⅗": "3/5", "⅘": "4/5", "⅙": "1/6", "⅚": "5/6", "⅛": "1/8", "⅜": "3/8", "⅝": "5/8", "⅞": "7/8",
+}
+_UNICODE_FRACTION = re.compile(f"(\\d?)([{''.join(_UNICODE_FRACTIONS)}])")
+_QUANTITY = r"(?:\d+\s+\d+/\d+|\d+/\d+|\d+(?:[.,]\d+)?)"
+_LEADING_AMOUNT = re.compile(rf"^(?P<amount>{_QUANTITY}(?:\s*(?:-|–|to)\s*{_QUANTITY})?)\s*(?P<rest>.*)$", re.IGNORECASE)
+_RANGE = re.compile(r"\s*(?:-|–|\bto\b)\s*")
+
+_UNIT_ALIASES = {
+    "tsp": ("teaspoon", "teaspoons", "tsp", "tsps"),
+    "tbsp": ("tablespoon", "tablespoons", "tbsp", "tbsps", "tbs", "tbl"),
+    "cup": ("cup", "cups"),
+    "ml": ("ml", "milliliter", "milliliters", "millilitre", "millilitres"),
+    "l": ("l", "liter", "liters", "litre", "litres"),
+    "g": ("g", "gr", "gram", "grams", "gramme", "grammes"),
+    "kg": ("kg", "kilogram", "kilograms"),
+    "mg": ("mg", "milligram", "milligrams"),
+    "oz": ("oz", "ounce", "ounces"),
+    "fl oz": ("fl oz", "fl. oz", "fluid ounce", "fluid ounces"),
+    "lb": ("lb", "lbs", "pound", "pounds"),
+    "pint": ("pint", "pints", "pt"),
+    "quart": ("quart", "quarts", "qt"),
+    "gallon": ("gallon", "gallons", "gal"),
+    "pinch": ("pinch", "pinches"),
+    "dash": ("dash", "dashes"),
+    "clove": ("clove", "cloves"),
+    "can": ("can", "cans", "tin", "tins"),
+    "package": ("package", "packages", "pkg", "packet", "packets"),
+    "slice": ("slice", "slices"),
+    "stick": ("stick", "sticks"),
+    "sprig": ("sprig", "sprigs"),
+    "bunch": ("bunch", "bunches"),
+    "handful": ("handful", "handfuls"),
+    "piece": ("piece", "pieces"),
+}
+_UNITS = {alias: unit for unit, aliases in _UNIT_ALIASES.items() for alias in aliases}
+_TWO_WORD_UNITS = {alias for alias in _UNITS if " " in alias}
+
+
+def clean_text(value: str) -> str:
+    """Strip markup and entities, and collapse runs of whitespace (keeping line breaks)."""
+    text = html.unescape(_TAG.sub(" ", value))
+    lines = (_SPACE_BEFORE_PUNCTUATION.sub(r"\1", _SPACE.sub(" ", line)).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def parse_duration(value: Any) -> Optional[int]:
+    """Minutes in an ISO 8601 duration such as `PT1H30M`, or in a bare number; None if unparseable."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    match = _DURATION.match(value)
+    if match is None or not any(match.groups()):
+        return None
+    days, hours, minutes, seconds = (float(group or 0) for group in match.groups())
+    return round(days * 1440 + hours * 60 + minutes + seconds / 60)
+
+
+def _normalize_amount(amount: str) -> str:
+    amount = amount.replace(",", ".")
+    return _RANGE.sub("-", " ".join(amount.split()))
+
+
+def parse_ingredient(line: str) -> Optional[schemas.IngredientCreate]:
+    """
+    Split an ingredient line into amount, unit and name, e.g. `"1 ½ cups flour, sifted"` into
+    `amount="1 1/2"`, `unit="cup"`, `name="flour, sifted"`.
+
+    Amounts may be integers, decimals, fractions (ASCII or Unicode), mixed numbers or ranges.
+    Units are normalized to one spelling (`tablespoons` -> `tbsp`); a word not recognized as a
+    unit stays part of the name. A line without a leading amount is all name.
+
+    Returns:
+        None for a blank line.
+    """
+    line = clean_text(line).replace("\n", " ").replace("⁄", "/")
+    line = _UNICODE_FRACTION.sub(lambda match: (f"{match[1]} " if match[1] else "") + _UNICODE_FRACTIONS[match[2]], line)
+    if not line:
+        return None
+
+    amount = unit = None
+    name = line
+    match = _LEADING_AMOUNT.match(line)
+    if match:
+        amount = _normalize_amount(match["amount"])
+        rest = match["rest"]
+        # "1 (14 oz) can tomatoes": the size note moves behind the name so the unit can be read.
+        note = ""
+        if rest.startswith("("):
+            end = rest.find(")")
+            if end > 0:
+                note, rest = rest[: end + 1], rest[end + 1 :].lstrip()
+        words = rest.split(" ", 2)
+        two_words = " ".join(words[:2]).lower()
+        if two_words in _TWO_WORD_UNITS:
+            unit, rest = _UNITS[two_words], " ".join(words[2:])
+        elif words[0].lower().rstrip(".") in _UNITS:
+            unit, rest = _UNITS[words[0].lower().rstrip(".")], " ".join(words[1:])
+        rest = re.sub(r"^of\s+", "", rest.lstrip(" ,.-"), flags=re.IGNORECASE)
+        name = f"{rest} {note}".strip() if rest else (note.strip("()") or line)
+    return schemas.IngredientCreate(name=name[:MAX_NAME], amount=amount[:MAX_AMOUNT] if amount else None, unit=unit)
+
+
+class _MicrodataParser(HTMLParser):
+    """Collects the top-level microdata items of one HTML page, in the shape of JSON-LD objects."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.items: List[Dict[str, Any]] = []
+        # Open elements that carry `itemscope` or a text-valued `itemprop`: (tag, item, text, property names).
+        self._open: List[Tuple[str, Optional[Dict[str, Any]], Optional[List[str]], Sequence[str]]] = []
+
+    def finished_recipe(self) -> bool:
+        """Whether a recipe item has been read and every item is closed again."""
+        return not self._open and any(_is_recipe(item) for item in self.items)
+
+    def _current_item(self) -> Optional[Dict[str, Any]]:
+        for _, item, _, _ in reversed(self._open):
+            if item is not None:
+                return item
+        return None
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attributes = dict(attrs)
+        while self._open and tag in _IMPLIED_END.get(self._open[-1][0], ()):
+            self._close(len(self._open) - 1)
+        scoped = "itemscope" in attributes
+        names = (attributes.get("itemprop") or "").split()
+        if not scoped and not names:
+            return
+        parent = self._current_item()
+
+        if scoped:
+            types = [itemtype.rstrip("/").rsplit("/", 1)[-1] for itemtype in (attributes.get("itemtype") or "").split()]
+            item: Dict[str, Any] = {"@type": types}
+            if names and parent is not None:
+                for name in names:
+                    parent.setdefault(name, []).append(item)
+            else:
+                self.items.append(item)
+            if tag not in _VOID_ELEMENTS:
+                self._open.append((tag, item, None, ()))
+            return
+
+        value_attribute = _VALUE_ATTRIBUTES.get(tag)
+        if value_attribute is not None and attributes.get(value_attribute) is not None:
+            if parent is not None:
+                for name in names:
+                    parent.setdefault(name, []).append(attributes[value_attribute])
+        elif tag not in _VOID_ELEMENTS:
+            self._open.append((tag, None, [], names))
+
+    def handle_endtag(self, tag: str) -> None:
+        # Pages do not always close their elements; close everything above the nearest match.
+        for position in range(len(self._open) - 1, -1, -1):
+            if self._open[position][0] == tag:
+                break
+        else:
+            return
+        self._close(position)
+
+    def _close(self, position: int) -> None:
+        while len(self._open) > position:
+            _, _, text, names = self._open.pop()
+            parent = self._current_item()
+            if text is not None and parent is not None:
+                for name in names:
+                    parent.setdefault(name, []).append("".join(text))
+
+    def handle_data(self, data: str) -> None:
+        for _, _, text, _ in self._open:
+            if text is not None:
+                text.append(data)
+
+
+def _is_recipe(node: Dict[str, Any]) -> bool:
+    types = node.get("@type")
+    types = types if isinstance(types, list) else [types]
+    return any(isinstance(value, str) and value.rsplit("/", 1)[-1] == "Recipe" for value in types)
+
+
+def _find_recipes(node: Any) -> Iterator[Dict[str, Any]]:
+    """Recipe objects anywhere in a JSON-LD document (top level, `@graph`, or e.g. a page's `mainEntity`)."""
+    if isinstance(node, list):
+        for child in node:
+            yield from _find_recipes(child)
+    elif isinstance(node, dict):
+        if _is_recipe(node):
+            yield node
+            return
+        for child in node.values():
+            yield from _find_recipes(child)
+
+
+def _first(value: Any) -> Any:
+    if isinstance(value, list):
+        return next((element for element in value if element not in (None, "")), None)
+    return value
+
+
+def _text(value: Any) -> Optional[str]:
+    value = _first(value)
+    if isinstance(value, dict):
+        value = _first(value.get("text") or value.get("name") or value.get("@value"))
+    if isinstance(value, (int, float)):
+        value = str(value)
+    if not isinstance(value, str):
+        return None
+    return clean_text(value) or None
+
+
+def _steps(value: Any) -> Iterator[str]:
+    """Instruction text from a string, a list of strings, `HowToStep`s or `HowToSection`s."""
+    if isinstance(value, str):
+        text = clean_text(value)
+        if text:
+            yield text
+    elif isinstance(value, list):
+        for element in value:
+            yield from _steps(element)
+    elif isinstance(value, dict):
+        if "itemListElement" in value:
+            yield from _steps(value["itemListElement"])
+        else:
+            text = _text(value)
+            if text:
+                yield text
+
+
+def _servings(value: Any) -> Optional[int]:
+    """The first whole number in `recipeYield`, e.g. 4 from `["4", "4 servings"]` or `"Serves 4-6"`."""
+    for element in value if isinstance(value, list) else [value]:
+        if isinstance(element, (int, float)):
+            return int(element)
+        if isinstance(element, str):
+            match = _INTEGER.search(element)
+            if match:
+                return int(match[0])
+    return None
+
+
+def recipe_from_schema(node: Dict[str, Any]) -> Optional[ParsedRecipe]:
+    """
+    Map one schema.org `Recipe` object (JSON-LD, or microdata in the same shape) to a `RecipeCreate`.
+
+    Returns:
+        The recipe and its category name, or None if it has no name or does not validate.
+    """
+    title = _text(node.get("name") or node.get("headline"))
+    if not title:
+        return None
+    lines = node.get("recipeIngredient") or node.get("ingredients") or []
+    ingredients = [parse_ingredient(line) for line in (lines if isinstance(lines, list) else [lines]) if isinstance(line, str)]
+    instructions = "\n".join(_steps(node.get("recipeInstructions")))
+    try:
+        recipe = schemas.RecipeCreate(
+            title=title.replace("\n", " ")[:MAX_TITLE],
+            description=_text(node.get("description")),
+            instructions=instructions or None,
+            prep_time=parse_duration(_first(node.get("prepTime"))),
+            cook_time=parse_duration(_first(node.get("cookTime"))),
+            servings=_servings(node.get("recipeYield", node.get("yield"))),
+            ingredients=[ingredient for ingredient in ingredients if ingredient is not None],
+        )
+    except ValidationError:
+        return None
+    return recipe, _text(node.get("recipeCategory"))
+
+
+def extract_recipes(document: str) -> List[ParsedRecipe]:
+    """
+    Every schema.org recipe in an HTML page (JSON-LD first, then microdata) or a bare JSON-LD document.
+
+    Malformed JSON-LD blocks are skipped; a page may still yield recipes from its other blocks.
+    """
+    stripped = document.lstrip()
+    # Script contents are raw text, so a regex finds the blocks without tokenizing the whole page.
+    blocks = [stripped] if stripped.startswith(("{", "[")) else _JSON_LD.findall(document)
+
+    recipes: List[ParsedRecipe] = []
+    for block in blocks:
+        try:
+            # strict=False accepts the raw newlines and tabs pages often leave inside strings.
+            data = json.loads(block, strict=False)
+        except ValueError:
+            continue
+        recipes.extend(parsed for parsed in map(recipe_from_schema, _find_recipes(data)) if parsed is not None)
+    if not recipes and "itemscope" in document:
+        # Only pages without JSON-LD recipes pay for a full HTML parse.
+        parser = _MicrodataParser()
+        # Nothing before the first item can belong to one, so the parse starts at that tag, and it
+        # stops once a recipe has been read and closed rather than tokenizing the rest of the page.
+        start = max(document.rfind("<", 0, document.index("itemscope")), 0)
+        for offset in range(start, len(document), _MICRODATA_CHUNK):
+            parser.feed(document[offset : offset + _MICRODATA_CHUNK])
+            if parser.finished_recipe():
+                break
+        else:
+            parser.close()
+        recipes.extend(parsed for parsed in map(recipe_from_schema, _find_recipes(parser.items)) if parsed is not None)
+    return recipes
+
+
+def parse_files(paths: Sequence[str]) -> Tuple[List[ParsedRecipe], int, int]:
+    """
+    Read and parse a chunk of pages; the unit of work the importer hands to each worker process.
+
+    Returns:
+        The recipes found, the number of pages without a usable recipe, and the number that could
+        not be read.
+    """
+    recipes: List[ParsedRecipe] = []
+    empty = unreadable = 0
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8", errors="replace") as handle:
+                document = handle.read()
+        except OSError:
+            unreadable += 1
+            continue
+        found = extract_recipes(document)
+        if not found:
+            empty += 1
+        recipes.extend(found)
+    return recipes, empty, unreadable
@@ -1,15 +1,36 @@
-from app.schemas.category import Category, CategoryCreate, CategoryUpdate
+from app.schemas.category import Category, CategoryCreate, CategoryUpdate, CategoryWithStats
 from app.schemas.ingredient import Ingredient, IngredientCreate, IngredientUpdate
-from app.schemas.recipe import Recipe, RecipeCreate, RecipeUpdate
+from app.schemas.recipe import (
+    BucketFacet,
+    CategoryFacet,
+    PopularRecipe,
+    Recipe,
+    RecipeBatch,
+    RecipeBulkDeleteResult,
+    RecipeCreate,
+    RecipeFacets,
+    RecipeIds,
+    RecipeUpdate,
+    SimilarRecipe,
+)
 
 __all__ = [
+    "BucketFacet",
     "Category",
+    "CategoryFacet",
     "CategoryCreate",
     "CategoryUpdate",
+    "CategoryWithStats",
     "Ingredient",
     "IngredientCreate",
     "IngredientUpdate",
+    "PopularRecipe",
     "Recipe",
+    "RecipeBatch",
+    "RecipeBulkDeleteResult",
     "RecipeCreate",
+    "RecipeFacets",
+    "RecipeIds",
     "RecipeUpdate",
+    "SimilarRecipe",
 ]
@@ -23,3 +23,9 @@ class CategoryUpdate(BaseModel):
 
 class Category(CategoryBase):
     id: int
+
+
+class CategoryWithStats(Category):
+    recipe_count: int = 0
+    avg_prep_time: Optional[float] = None
+    avg_cook_time: Optional[float] = None
@@ -42,3 +42,47 @@ class Recipe(RecipeBase):
     category: Optional[Category] = None
     created_at: datetime
     updated_at: datetime
+    version: int
+    duplicate_of_id: Optional[int] = None
+
+
+class RecipeBatch(BaseModel):
+    recipes: List[Recipe] = []
+    missing: List[int] = []
+
+
+class RecipeIds(BaseModel):
+    ids: List[int]
+
+
+class RecipeBulkDeleteResult(BaseModel):
+    deleted: List[int] = []
+    missing: List[int] = []
+
+
+class SimilarRecipe(BaseModel):
+    score: float
+    recipe: Recipe
+
+
+class PopularRecipe(BaseModel):
+    views: int
+    recipe: Recipe
+
+
+class CategoryFacet(BaseModel):
+    category_id: Optional[int] = None
+    count: int
+
+
+class BucketFacet(BaseModel):
+    bucket: str
+    count: int
+
+
+class RecipeFacets(BaseModel):
+    total: int
+    category: List[CategoryFacet] = []
+    total_time: List[BucketFacet] = []
+    servings: List[BucketFacet] = []
+    ingredients: List[BucketFacet] = []
@@ -0,0 +1,234 @@
+"""
+Production entry point for the Recipe Manager API.
+
+Run with `python -m app.server`. The supervisor process imports the application once,
+binds the listening socket, then forks `WEB_CONCURRENCY` workers (one per CPU core by
+default) that share the socket. Each worker's connection pool is sized so all workers
+together stay within `DB_MAX_CONNECTIONS`, and pooled connections inherited from the
+supervisor are discarded after the fork. Recipe change events travel between the workers
+through a shared log file (`EVENT_LOG_PATH`).
+
+SIGTERM/SIGINT trigger a graceful shutdown: workers stop accepting connections, finish
+in-flight requests for up to `GRACEFUL_TIMEOUT` seconds, and are then killed.
+"""
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Dict, Tuple
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_REAP_INTERVAL = 0.5
+# Event log shared by the workers when `EVENT_LOG_PATH` does not name one.
+DEFAULT_EVENT_LOG = ".recipe-events.log"
+
+
+def resolve_worker_count(requested: int) -> int:
+    """Return the number of workers to start, defaulting to the number of CPU cores."""
+    if requested > 0:
+        return requested
+    return os.cpu_count() or 1
+
+
+def pool_limits_for_workers(workers: int, max_connections: int, pool_size: int, max_overflow: int) -> Tuple[int, int]:
+    """
+    Split a total connection budget across worker processes.
+
+    Args:
+        workers: Number of processes that will each own a connection pool.
+        max_connections: Total connections allowed across all workers (0 disables the budget).
+        pool_size: Preferred number of persistent connections per worker.
+        max_overflow: Preferred number of burst connections per worker.
+
+    Returns:
+        Tuple[int, int]: The `(pool_size, max_overflow)` each worker should use so that
+        `workers * (pool_size + max_overflow)` never exceeds `max_connections`.
+
+    Raises:
+        ValueError: If the budget cannot give every worker at least one connection.
+    """
+    if max_connections <= 0:
+        return pool_size, max_overflow
+
+    per_worker = max_connections // max(workers, 1)
+    if per_worker < 1:
+        raise ValueError(
+            f"DB_MAX_CONNECTIONS={max_connections} is too small for {workers} workers; "
+            "each worker needs at least one connection."
+        )
+
+    worker_pool_size = max(1, min(pool_size, per_worker))
+    worker_max_overflow = max(0, min(max_overflow, per_worker - worker_pool_size))
+    return worker_pool_size, worker_max_overflow
+
+
+def event_log_for_workers(workers: int, event_log_path: str) -> str:
+    """
+    The `EVENT_LOG_PATH` the workers should use.
+
+    In-process delivery only reaches the change streams of the worker that served the write, so
+    several workers always share a log file: `event_log_path` if set, else `DEFAULT_EVENT_LOG`.
+    """
+    if workers > 1 and not event_log_path:
+        return DEFAULT_EVENT_LOG
+    return event_log_path
+
+
+class Supervisor:
+    """
+    Pre-fork process manager that keeps a fixed number of uvicorn workers running.
+
+    Args:
+        host: Interface to bind.
+        port: TCP port to bind.
+        workers: Number of worker processes to keep alive.
+        graceful_timeout: Seconds to wait for workers to drain before killing them.
+    """
+
+    def __init__(self, host: str, port: int, workers: int, graceful_timeout: int) -> None:
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self._children: Dict[int, int] = {}
+        self._stopping = False
+        self._socket = None
+        self._app = None
+
+    def run(self) -> None:
+        """Bind, preload the app, fork workers and supervise them until asked to stop."""
+        pool_size, max_overflow = pool_limits_for_workers(
+            self.workers, settings.DB_MAX_CONNECTIONS, settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+        )
+        # Must happen before `app.database` is imported so the engine is built with these limits.
+        settings.DB_POOL_SIZE = pool_size
+        settings.DB_MAX_OVERFLOW = max_overflow
+        # Likewise before `app.events` builds its broadcaster.
+        settings.EVENT_LOG_PATH = event_log_for_workers(self.workers, settings.EVENT_LOG_PATH)
+
+        self._socket = self._bind()
+
+        from app.database import engine
+        from app.main import app
+
+        # The supervisor never serves requests; release whatever `create_all` checked out.
+        engine.dispose()
+        self._app = app
+
+        logger.info(
+            "Starting %d workers on %s:%d (pool_size=%d, max_overflow=%d per worker)",
+            self.workers,
+            self.host,
+            self.port,
+            pool_size,
+            max_overflow,
+        )
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        for index in range(self.workers):
+            self._spawn(index)
+
+        while not self._stopping:
+            self._reap(respawn=True)
+            time.sleep(_REAP_INTERVAL)
+
+        self._shutdown()
+
+    def _bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _handle_stop(self, signum, frame) -> None:
+        logger.info("Received %s, shutting down workers", signal.Signals(signum).name)
+        self._stopping = True
+
+    def _spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        self._children[pid] = index
+
+    def _run_worker(self) -> None:
+        import uvicorn
+
+        from app.database import dispose_engine_after_fork
+
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        dispose_engine_after_fork()
+
+        exit_code = 0
+        try:
+            config = uvicorn.Config(self._app, timeout_graceful_shutdown=self.graceful_timeout)
+            uvicorn.Server(config).run(sockets=[self._socket])
+        except Exception:
+            logger.exception("Worker %d crashed", os.getpid())
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _reap(self, respawn: bool) -> None:
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._children.clear()
+                return
+            if pid == 0:
+                return
+
+            index = self._children.pop(pid, None)
+            if index is None:
+                continue
+            if respawn and not self._stopping:
+                logger.warning("Worker %d exited with status %d; restarting", pid, status)
+                self._spawn(index)
+
+    def _shutdown(self) -> None:
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self._children.pop(pid, None)
+
+        deadline = time.monotonic() + self.graceful_timeout
+        while self._children and time.monotonic() < deadline:
+            self._reap(respawn=False)
+            time.sleep(0.1)
+
+        for pid in list(self._children):
+            logger.warning("Worker %d did not stop in %ds; killing it", pid, self.graceful_timeout)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self._children.clear()
+
+        if self._socket is not None:
+            self._socket.close()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s")
+    supervisor = Supervisor(
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=resolve_worker_count(settings.WEB_CONCURRENCY),
+        graceful_timeout=settings.GRACEFUL_TIMEOUT,
+    )
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+import fcntl
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# (recorded_at, feature ids, weights); `None` arrays mark a recipe deleted since the snapshot.
+PendingRow = Tuple[float, Optional[np.ndarray], Optional[np.ndarray]]
+
+_ARRAYS = ("ids", "indptr", "indices", "data", "postings_indptr", "postings_rows", "postings_data", "idf")
+
+
+def recipe_features(title: Optional[str], ingredient_names: Iterable[str], n_features: int) -> np.ndarray:
+    """
+    Hash a recipe's title tokens and ingredient names into sorted, unique feature ids.
+
+    Each ingredient contributes its whole normalized name and its individual words, so "olive oil"
+    matches "extra virgin olive oil" partially and itself exactly. CRC32 keeps the ids stable
+    across processes, which Python's randomized `hash()` would not.
+    """
+    keys = {f"t:{token}" for token in TOKEN_PATTERN.findall((title or "").lower())}
+    for name in ingredient_names:
+        tokens = TOKEN_PATTERN.findall(name.lower())
+        if tokens:
+            keys.add("i:" + " ".join(tokens))
+            keys.update(f"w:{token}" for token in tokens)
+    features = np.fromiter((zlib.crc32(key.encode()) % n_features for key in keys), dtype=np.int32, count=len(keys))
+    return np.unique(features)
+
+
+class _Snapshot:
+    """
+    One immutable, L2-normalized TF-IDF matrix with rows ordered by recipe id.
+
+    Kept twice: row-major to look up a recipe's own vector, and column-major (an inverted index)
+    so a query only touches the recipes that share at least one of its features.
+    """
+
+    def __init__(
+        self,
+        generation: str,
+        built_at: float,
+        ids: np.ndarray,
+        matrix: sparse.csr_matrix,
+        postings: sparse.csc_matrix,
+        idf: Optional[np.ndarray],
+    ) -> None:
+        self.generation = generation
+        self.built_at = built_at
+        self.ids = ids
+        self.matrix = matrix
+        self.postings = postings
+        self.idf = idf
+
+    @classmethod
+    def empty(cls, n_features: int) -> "_Snapshot":
+        matrix = sparse.csr_matrix((0, n_features), dtype=np.float32)
+        return cls("", 0.0, np.empty(0, dtype=np.int64), matrix, matrix.tocsc(), None)
+
+    @classmethod
+    def load(cls, path: str, generation: str, built_at: float) -> "_Snapshot":
+        # Memory-mapped, so every worker shares the same page-cache copy of the arrays.
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in _ARRAYS}
+        shape = (len(arrays["ids"]), len(arrays["idf"]))
+        matrix = sparse.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]), shape=shape, copy=False)
+        postings = sparse.csc_matrix(
+            (arrays["postings_data"], arrays["postings_rows"], arrays["postings_indptr"]), shape=shape, copy=False
+        )
+        return cls(generation, built_at, arrays["ids"], matrix, postings, arrays["idf"])
+
+    def positions(self, recipe_ids: np.ndarray) -> np.ndarray:
+        """Row numbers of the given ids that are present in this snapshot."""
+        found = np.searchsorted(self.ids, recipe_ids)
+        found = found[found < len(self.ids)]
+        return found[np.isin(self.ids[found], recipe_ids)]
+
+    def row(self, recipe_id: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        position = int(np.searchsorted(self.ids, recipe_id))
+        if position >= len(self.ids) or self.ids[position] != recipe_id:
+            return None
+        start, end = self.matrix.indptr[position], self.matrix.indptr[position + 1]
+        return self.matrix.indices[start:end], self.matrix.data[start:end]
+
+    def weights(self, features: np.ndarray) -> np.ndarray:
+        """L2-normalized TF-IDF weights for a binary feature vector, using this snapshot's IDF."""
+        if self.idf is None:
+            values = np.ones(len(features), dtype=np.float32)
+        else:
+            values = np.asarray(self.idf[features], dtype=np.float32)
+        norm = np.linalg.norm(values)
+        return values / norm if norm else values
+
+
+class _Overlay:
+    """The pending rows flattened into arrays, rebuilt only when a write or a new snapshot changes them."""
+
+    def __init__(self, snapshot: _Snapshot, pending: Dict[int, PendingRow]) -> None:
+        pending_ids = np.fromiter(pending, dtype=np.int64, count=len(pending))
+        # The overlay supersedes whatever the snapshot holds for those recipes.
+        self.superseded = snapshot.positions(pending_ids)
+
+        live = [
+            (recipe_id, features, weights)
+            for recipe_id, (_, features, weights) in pending.items()
+            if features is not None and len(features)
+        ]
+        self.ids = np.array([item[0] for item in live], dtype=np.int64)
+        lengths = np.array([len(item[1]) for item in live], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])) if live else np.empty(0, dtype=np.int64)
+        self.indices = np.concatenate([item[1] for item in live]) if live else np.empty(0, dtype=np.int32)
+        self.values = np.concatenate([item[2] for item in live]) if live else np.empty(0, dtype=np.float32)
+
+    def scores(self, features: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Dot product of every overlay row with a query, matching sorted feature ids by binary search."""
+        if not len(self.ids):
+            return np.empty(0, dtype=np.float32)
+        found = np.minimum(np.searchsorted(features, self.indices), len(features) - 1)
+        products = np.where(features[found] == self.indices, weights[found] * self.values, 0.0)
+        return np.add.reduceat(products, self.offsets).astype(np.float32)
+
+
+class SimilarityIndex:
+    """
+    Nearest-neighbour search over recipes by cosine similarity of TF-IDF vectors.
+
+    Each recipe is a binary bag of hashed title words and ingredient names (`recipe_features`),
+    weighted by inverse document frequency and L2-normalized. A query is one sparse
+    matrix-vector product against the whole matrix followed by a partial sort.
+
+    The matrix is rebuilt from the database by `rebuild()` (run in the background) and written
+    as `.npy` files under `directory`; every worker memory-maps the newest snapshot rather than
+    holding its own copy. Only one process rebuilds at a time, guarded by a file lock. Writes made
+    through `app.crud.recipe` call `update()`/`forget()`, which keep a small per-process overlay on
+    top of the snapshot until the next rebuild includes them. Other workers see those changes once
+    that rebuild lands.
+
+    Args:
+        directory: Where snapshots are written and read from; shared by all workers.
+        n_features: Size of the hashed feature space.
+    """
+
+    def __init__(self, directory: str, n_features: int = 2**20) -> None:
+        self.directory = directory
+        self.n_features = n_features
+        self._lock = threading.Lock()
+        self._snapshot = _Snapshot.empty(n_features)
+        self._pending: Dict[int, PendingRow] = {}
+        self._overlay: Optional[_Overlay] = None
+
+    def update(self, recipe: models.Recipe) -> None:
+        """Index a recipe that was just created or edited."""
+        features = recipe_features(recipe.title, (ingredient.name for ingredient in recipe.ingredients), self.n_features)
+        with self._lock:
+            self._pending[recipe.id] = (time.time(), features, self._snapshot.weights(features))
+            self._overlay = None
+
+    def forget(self, recipe_ids: Iterable[int]) -> None:
+        """Stop returning recipes that were deleted."""
+        recorded_at = time.time()
+        with self._lock:
+            for recipe_id in recipe_ids:
+                self._pending[recipe_id] = (recorded_at, None, None)
+            self._overlay = None
+
+    def reset(self) -> None:
+        """Drop the in-memory snapshot and overlay; the next `reload()` maps the newest snapshot again."""
+        with self._lock:
+            self._snapshot = _Snapshot.empty(self.n_features)
+            self._pending = {}
+            self._overlay = None
+
+    def similar(self, recipe_id: int, k: int) -> Optional[List[Tuple[int, float]]]:
+        """
+        Return up to `k` `(recipe_id, score)` pairs most similar to an indexed recipe, best first.
+
+        Returns:
+            None when the recipe is not in the index (unknown, deleted, or not yet indexed).
+        """
+        snapshot, overlay = self._state()
+        entry = self._pending.get(recipe_id)
+        if entry is not None:
+            _, features, weights = entry
+            if features is None:
+                return None
+        else:
+            row = snapshot.row(recipe_id)
+            if row is None:
+                return None
+            features, weights = row
+        return self._nearest(snapshot, overlay, features, weights, k, exclude=recipe_id)
+
+    def similar_to(self, title: Optional[str], ingredient_names: Sequence[str], k: int, exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Return up to `k` `(recipe_id, score)` pairs most similar to an arbitrary title and ingredient list."""
+        snapshot, overlay = self._state()
+        features = recipe_features(title, ingredient_names, self.n_features)
+        return self._nearest(snapshot, overlay, features, snapshot.weights(features), k, exclude=exclude)
+
+    def _nearest(
+        self,
+        snapshot: _Snapshot,
+        overlay: _Overlay,
+        features: np.ndarray,
+        weights: np.ndarray,
+        k: int,
+        exclude: Optional[int],
+    ) -> List[Tuple[int, float]]:
+        if not len(features):
+            return []
+
+        # Rows are unit length, so the dot products are the cosine similarities.
+        scores = snapshot.postings[:, features] @ weights
+        scores[overlay.superseded] = 0.0
+
+        ids = np.concatenate((snapshot.ids, overlay.ids))
+        scores = np.concatenate((scores, overlay.scores(features, weights)))
+        if exclude is not None:
+            scores[ids == exclude] = 0.0
+
+        wanted = min(k, len(scores))
+        if wanted == 0:
+            return []
+        top = np.argpartition(-scores, wanted - 1)[:wanted]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(ids[position]), float(scores[position])) for position in top if scores[position] > 0]
+
+    def _state(self) -> Tuple[_Snapshot, _Overlay]:
+        with self._lock:
+            if self._overlay is None:
+                self._overlay = _Overlay(self._snapshot, self._pending)
+            return self._snapshot, self._overlay
+
+    def rebuild(self, db: Session, max_age: float = 0.0) -> None:
+        """
+        Build a fresh snapshot from the database unless another process did so within `max_age` seconds.
+
+        Then map the newest snapshot on disk, whoever built it.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another worker is building right now; it will publish shortly.
+                pass
+            else:
+                try:
+                    current = self._read_current()
+                    if current is None or time.time() - current[1] >= max_age:
+                        self._build(db)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self.reload()
+
+    def reload(self) -> None:
+        """Map the newest published snapshot if it is not the one already in use."""
+        current = self._read_current()
+        if current is None or current[0] == self._snapshot.generation:
+            return
+        generation, built_at = current
+        try:
+            snapshot = _Snapshot.load(os.path.join(self.directory, generation), generation, built_at)
+        except FileNotFoundError:
+            # Two builds landed since the pointer was read; the next reload maps the newest.
+            logger.info("Similarity snapshot %s was retired before it could be mapped", generation)
+            return
+        with self._lock:
+            self._snapshot = snapshot
+            # Changes recorded before the build started are part of the snapshot now.
+            self._pending = {recipe_id: row for recipe_id, row in self._pending.items() if row[0] >= built_at}
+            self._overlay = None
+
+    def _read_current(self) -> Optional[Tuple[str, float]]:
+        try:
+            with open(os.path.join(self.directory, "CURRENT")) as handle:
+                current = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        return current["generation"], current["built_at"]
+
+    def _build(self, db: Session) -> None:
+        started = time.perf_counter()
+        built_at = time.time()
+
+        recipes = db.execute(select(models.Recipe.id, models.Recipe.title).order_by(models.Recipe.id)).all()
+        ids = np.fromiter((row.id for row in recipes), dtype=np.int64, count=len(recipes))
+        names: Dict[int, List[str]] = {}
+        for recipe_id, name in db.execute(select(models.Ingredient.recipe_id, models.Ingredient.name)):
+            names.setdefault(recipe_id, []).append(name)
+
+        rows = [recipe_features(row.title, names.get(row.id, ()), self.n_features) for row in recipes]
+        lengths = np.fromiter((len(features) for features in rows), dtype=np.int64, count=len(rows))
+        # Matching index dtypes let scipy wrap the memory-mapped arrays without copying them.
+        index_dtype = np.int32 if lengths.sum() < 2**31 else np.int64
+        indptr = np.zeros(len(rows) + 1, dtype=index_dtype)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.concatenate(rows).astype(index_dtype) if rows else np.empty(0, dtype=index_dtype)
+
+        document_frequency = np.bincount(indices, minlength=self.n_features)
+        idf = (np.log((1 + len(rows)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        data = idf[indices]
+        row_numbers = np.repeat(np.arange(len(rows)), lengths)
+        norms = np.sqrt(np.bincount(row_numbers, weights=data * data, minlength=len(rows))).astype(np.float32)
+        data /= norms[row_numbers]
+
+        postings = sparse.csr_matrix((data, indices, indptr), shape=(len(rows), self.n_features)).tocsc()
+        postings.sort_indices()
+
+        generation = f"gen-{time.time_ns()}"
+        path = os.path.join(self.directory, generation)
+        os.makedirs(path)
+        arrays = (ids, indptr, indices, data, postings.indptr, postings.indices, postings.data, idf)
+        for name, array in zip(_ARRAYS, arrays):
+            np.save(os.path.join(path, f"{name}.npy"), array)
+
+        # Publish atomically: readers see either the old pointer or the new, never a partial snapshot.
+        previous = self._read_current()
+        pointer = os.path.join(self.directory, "CURRENT")
+        with open(f"{pointer}.tmp", "w") as handle:
+            json.dump({"generation": generation, "built_at": built_at}, handle)
+        os.replace(f"{pointer}.tmp", pointer)
+
+        # Keep the generation just replaced: another worker's `reload()` may have read the old
+        # pointer and not mapped its files yet. Anything older was superseded a full build ago.
+        # (Workers that already mapped a deleted generation keep their pages until they reload.)
+        keep = {generation, previous[0] if previous else None}
+        for entry in os.listdir(self.directory):
+            if entry.startswith("gen-") and entry not in keep:
+                shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+
+        logger.info("Built similarity index of %d recipes in %.2fs", len(ids), time.perf_counter() - started)
+
+
+similarity_index = SimilarityIndex(directory=settings.SIMILARITY_INDEX_DIR)
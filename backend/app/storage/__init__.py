@@ -1,5 +1,6 @@
 from .base import StorageBackend
 from .cloud import CloudStorage
 from .local import LocalStorage
+from .sharded import ShardedStorage
 
-__all__ = ["StorageBackend", "LocalStorage", "CloudStorage"]
+__all__ = ["StorageBackend", "LocalStorage", "CloudStorage", "ShardedStorage"]
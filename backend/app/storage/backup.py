@@ -0,0 +1,306 @@
+import gzip
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import DateTime, Integer, LargeBinary, delete, insert, text
+from sqlalchemy.engine import Connection, Engine
+
+from app import models
+
+from .bulk import _check_format, _uses_copy, decode_csv, dump_filename, dump_tables
+
+logger = logging.getLogger(__name__)
+
+# Called with (completed, total): pages for SQLite, tables for COPY backups.
+Progress = Callable[[int, int], None]
+
+MANIFEST = "manifest.json"
+
+
+@dataclass
+class BackupStats:
+    """Size of a backup or restore and how long it took."""
+
+    bytes: int = 0
+    rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
+class _BackupRestarted(Exception):
+    pass
+
+
+def _stepped_copy(
+    source: sqlite3.Connection,
+    target: sqlite3.Connection,
+    pages_per_step: int,
+    step_pause: float,
+    max_restarts: int,
+    progress: Optional[Progress],
+) -> None:
+    """
+    Copy `source` into `target` with the online backup API, `pages_per_step` pages at a time.
+
+    No lock is held between steps, and the pause there lets writers in. A write through another
+    connection makes SQLite restart the copy; after `max_restarts` restarts the remainder is
+    copied in one step so the backup finishes under sustained writes.
+    """
+    state = {"remaining": None, "restarts": 0}
+
+    def step(status: int, remaining: int, total: int) -> None:
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > max_restarts:
+                raise _BackupRestarted()
+        state["remaining"] = remaining
+        if progress is not None:
+            progress(total - remaining, total)
+        if remaining and step_pause:
+            time.sleep(step_pause)
+
+    try:
+        source.backup(target, pages=pages_per_step, progress=step)
+    except _BackupRestarted:
+        logger.warning("Backup restarted %d times by concurrent writes; copying the rest in one step", max_restarts)
+        source.backup(target)
+
+
+def _quick_check(connection: sqlite3.Connection) -> str:
+    return connection.execute("PRAGMA quick_check").fetchone()[0]
+
+
+def sqlite_backup(
+    engine: Engine,
+    dest: str,
+    pages_per_step: int = 4096,
+    step_pause: float = 0.005,
+    max_restarts: int = 3,
+    progress: Optional[Progress] = None,
+) -> BackupStats:
+    """
+    Copy a live SQLite database to `dest` without blocking its writers for the whole copy.
+
+    The copy is written to `<dest>.partial`, checked with `PRAGMA quick_check`, and only then
+    renamed over `dest`, so an interrupted backup never leaves a truncated file at `dest`.
+
+    Raises:
+        RuntimeError: If the copy fails its integrity check.
+    """
+    target_path = Path(dest)
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    partial = target_path.with_name(target_path.name + ".partial")
+    partial.unlink(missing_ok=True)
+
+    started = time.perf_counter()
+    raw = engine.raw_connection()
+    try:
+        target = sqlite3.connect(partial)
+        try:
+            _stepped_copy(raw.driver_connection, target, pages_per_step, step_pause, max_restarts, progress)
+            check = _quick_check(target)
+        finally:
+            target.close()
+    finally:
+        raw.close()
+
+    if check != "ok":
+        partial.unlink(missing_ok=True)
+        raise RuntimeError(f"Backup failed its integrity check: {check}")
+    os.replace(partial, target_path)
+
+    stats = BackupStats(bytes=target_path.stat().st_size, seconds=time.perf_counter() - started)
+    logger.info("Backed up SQLite database to %s: %d bytes in %.2fs (%.0f MB/s)", dest, stats.bytes, stats.seconds, stats.bytes_per_second / 1e6)
+    return stats
+
+
+def sqlite_restore(engine: Engine, src: str, pages_per_step: int = 4096, progress: Optional[Progress] = None) -> BackupStats:
+    """
+    Replace the contents of a live SQLite database with the backup at `src`.
+
+    The backup is checked before anything is overwritten. Other connections see the restored
+    data on their next transaction.
+
+    Raises:
+        ValueError: If `src` is missing or is not an intact SQLite database.
+    """
+    if not os.path.isfile(src):
+        raise ValueError(f"No backup at {src}")
+    started = time.perf_counter()
+    try:
+        source = sqlite3.connect(f"file:{Path(src).resolve().as_posix()}?mode=ro", uri=True)
+    except sqlite3.Error as exc:
+        raise ValueError(f"Cannot open backup {src}: {exc}") from exc
+    try:
+        try:
+            check = _quick_check(source)
+        except sqlite3.DatabaseError as exc:
+            raise ValueError(f"{src} is not a SQLite database: {exc}") from exc
+        if check != "ok":
+            raise ValueError(f"Backup {src} failed its integrity check: {check}")
+
+        raw = engine.raw_connection()
+        try:
+            # Nothing else reads the backup file, so the copy never restarts.
+            _stepped_copy(source, raw.driver_connection, pages_per_step, 0.0, 0, progress)
+        finally:
+            raw.close()
+    finally:
+        source.close()
+
+    stats = BackupStats(bytes=os.path.getsize(src), seconds=time.perf_counter() - started)
+    logger.info("Restored SQLite database from %s: %d bytes in %.2fs", src, stats.bytes, stats.seconds)
+    return stats
+
+
+def copy_backup(engine: Engine, dest: str, progress: Optional[Progress] = None) -> BackupStats:
+    """
+    Dump every application table to the directory `dest` as gzip-compressed COPY output.
+
+    Binary COPY is used with psycopg 3 and CSV otherwise, all tables from one snapshot. A
+    `manifest.json` records the format and each table's columns and row count. The dump is
+    written to `<dest>.partial` and renamed into place once complete.
+    """
+    format = "binary" if engine.dialect.driver == "psycopg" else "csv"
+    tables = [table.name for table in models.Base.metadata.sorted_tables]
+    target_path = Path(dest)
+    partial = target_path.with_name(target_path.name + ".partial")
+    shutil.rmtree(partial, ignore_errors=True)
+
+    started = time.perf_counter()
+    counts = dump_tables(engine, str(partial), tables, format=format, compression="gzip", progress=progress)
+    manifest = {
+        "format": format,
+        "compression": "gzip",
+        "tables": [
+            {"name": name, "columns": [column.name for column in models.Base.metadata.tables[name].columns], "rows": counts[name]}
+            for name in tables
+        ],
+    }
+    (partial / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    if target_path.exists():
+        shutil.rmtree(target_path)
+    os.replace(partial, target_path)
+
+    stats = BackupStats(
+        bytes=sum(path.stat().st_size for path in target_path.iterdir()),
+        rows=sum(counts.values()),
+        seconds=time.perf_counter() - started,
+    )
+    logger.info("Backed up %d rows to %s: %d bytes in %.2fs (%.0f rows/s)", stats.rows, dest, stats.bytes, stats.seconds, stats.rows / stats.seconds if stats.seconds else 0.0)
+    return stats
+
+
+def copy_restore(engine: Engine, src: str, progress: Optional[Progress] = None) -> BackupStats:
+    """
+    Replace every application table with the contents of a `copy_backup` directory.
+
+    Runs in one transaction: the tables are truncated, each file is streamed back through
+    `COPY ... FROM STDIN`, and the id sequences are moved past the restored ids. Databases
+    without COPY (MySQL) get the rows of a CSV backup through batched INSERTs instead.
+
+    Raises:
+        ValueError: If `src` has no manifest, or is a binary backup and the database is not PostgreSQL.
+    """
+    manifest_path = Path(src) / MANIFEST
+    if not manifest_path.is_file():
+        raise ValueError(f"No backup manifest at {manifest_path}")
+    manifest = json.loads(manifest_path.read_text())
+    format = manifest["format"]
+    if format == "binary" and not _uses_copy(engine):
+        raise ValueError("Binary COPY backups can only be restored on PostgreSQL.")
+    _check_format(engine, format)
+
+    started = time.perf_counter()
+    tables = manifest["tables"]
+    if not _uses_copy(engine):
+        with engine.begin() as connection:
+            _insert_restore(connection, src, tables, progress)
+        return _restore_stats(src, tables, started)
+
+    with engine.begin() as connection:
+        names = ", ".join(table["name"] for table in tables)
+        connection.execute(text(f"TRUNCATE {names} RESTART IDENTITY CASCADE"))
+        cursor = connection.connection.cursor()
+        try:
+            for done, table in enumerate(tables, start=1):
+                statement = f"COPY {table['name']} ({', '.join(table['columns'])}) FROM STDIN (FORMAT {format.upper()})"
+                with gzip.open(Path(src) / dump_filename(table["name"], format, "gzip"), "rb") as source:
+                    if connection.dialect.driver == "psycopg":
+                        with cursor.copy(statement) as copy:
+                            while chunk := source.read(1 << 20):
+                                copy.write(chunk)
+                    else:
+                        cursor.copy_expert(statement, source)
+                if progress is not None:
+                    progress(done, len(tables))
+        finally:
+            cursor.close()
+
+        for table in tables:
+            primary_key = list(models.Base.metadata.tables[table["name"]].primary_key.columns)
+            if len(primary_key) == 1 and isinstance(primary_key[0].type, Integer) and primary_key[0].autoincrement is True:
+                name, column = table["name"], primary_key[0].name
+                connection.execute(
+                    text(
+                        f"SELECT setval(pg_get_serial_sequence('{name}', '{column}'), "
+                        f"COALESCE(MAX({column}), 1), MAX({column}) IS NOT NULL) FROM {name}"
+                    )
+                )
+
+    return _restore_stats(src, tables, started)
+
+
+def _restore_stats(src: str, tables: List[Dict[str, Any]], started: float) -> BackupStats:
+    stats = BackupStats(
+        bytes=sum(path.stat().st_size for path in Path(src).iterdir()),
+        rows=sum(table["rows"] for table in tables),
+        seconds=time.perf_counter() - started,
+    )
+    logger.info("Restored %d rows from %s in %.2fs", stats.rows, src, stats.seconds)
+    return stats
+
+
+def _csv_value(column, value: Optional[str]) -> Any:
+    # Inverse of `_csv_field` for the column types the models use.
+    if value is None:
+        return None
+    if isinstance(column.type, LargeBinary):
+        return bytes.fromhex(value[2:])
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Integer):
+        return int(value)
+    return value
+
+
+def _insert_restore(connection: Connection, src: str, tables: List[Dict[str, Any]], progress: Optional[Progress], batch_size: int = 1000) -> None:
+    """Restore a CSV backup without COPY: empty the tables, then INSERT the rows back in batches."""
+    metadata = models.Base.metadata
+    # Children first, so no foreign key is left pointing at a deleted row.
+    for table in reversed(tables):
+        connection.execute(delete(metadata.tables[table["name"]]))
+    for done, table in enumerate(tables, start=1):
+        target = metadata.tables[table["name"]]
+        columns = [target.c[name] for name in table["columns"]]
+        with gzip.open(Path(src) / dump_filename(table["name"], "csv", "gzip"), "rt", encoding="utf-8", newline="") as source:
+            rows = (
+                {column.name: _csv_value(column, value) for column, value in zip(columns, row)}
+                for row in decode_csv(source)
+            )
+            while batch := list(islice(rows, batch_size)):
+                connection.execute(insert(target), batch)
+        if progress is not None:
+            progress(done, len(tables))
@@ -1,8 +1,15 @@
 from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Iterable, Optional
 
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, sessionmaker
 
+if TYPE_CHECKING:
+    from app.schemas import RecipeCreate
+
+    from .backup import BackupStats, Progress
+    from .bulk import TransferStats
+
 
 class StorageBackend(ABC):
     """
@@ -102,3 +109,71 @@ class StorageBackend(ABC):
             bool: True if the backend is healthy, False otherwise.
         """
         ...
+
+    @abstractmethod
+    def backup(self, dest: str, progress: Optional["Progress"] = None) -> "BackupStats":
+        """
+        Copy the live database to `dest` without taking it offline.
+
+        Args:
+            dest: Destination file or directory, depending on the backend.
+            progress: Called with `(completed, total)` units as the copy advances.
+
+        Returns:
+            BackupStats: Bytes and rows written and how long it took.
+        """
+        ...
+
+    @abstractmethod
+    def restore(self, src: str, progress: Optional["Progress"] = None) -> "BackupStats":
+        """
+        Replace the database contents with a backup made by `backup()`.
+
+        Args:
+            src: A path previously passed to `backup()`.
+            progress: Called with `(completed, total)` units as the restore advances.
+
+        Returns:
+            BackupStats: Bytes and rows read and how long it took.
+
+        Raises:
+            ValueError: If `src` is not a usable backup.
+        """
+        ...
+
+    def bulk_load(self, recipes: Iterable["RecipeCreate"], format: str = "binary", batch_size: int = 10_000) -> "TransferStats":
+        """
+        Insert many recipes and their ingredients in one transaction, bypassing the ORM.
+
+        PostgreSQL streams rows through `COPY FROM STDIN`; other databases fall back to
+        `executemany`. See `app.storage.bulk.bulk_load`.
+
+        Args:
+            recipes: Recipes to insert, consumed lazily.
+            format: `binary` or `csv`, the COPY format used on PostgreSQL.
+            batch_size: Recipes buffered per COPY or `executemany`.
+
+        Returns:
+            TransferStats: Rows inserted and throughput.
+        """
+        from .bulk import bulk_load
+
+        return bulk_load(self.get_engine(), recipes, format=format, batch_size=batch_size)
+
+    def dump(self, directory: str, format: str = "csv", compression: Optional[str] = None) -> "TransferStats":
+        """
+        Write categories, recipes and ingredients to one file per table in `directory`.
+
+        PostgreSQL uses `COPY TO STDOUT`; see `app.storage.bulk.dump`.
+
+        Args:
+            directory: Where to write `<table>.<csv|bin>[.gz]`.
+            format: `csv`, or `binary` on PostgreSQL.
+            compression: None or `gzip`.
+
+        Returns:
+            TransferStats: Rows written and throughput.
+        """
+        from .bulk import dump
+
+        return dump(self.get_engine(), directory, format=format, compression=compression)
@@ -0,0 +1,372 @@
+import gzip
+import io
+import logging
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import BigInteger, DateTime, Integer, SmallInteger, func, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+
+logger = logging.getLogger(__name__)
+
+COPY_FORMATS = ("binary", "csv")
+COMPRESSIONS = (None, "gzip")
+# File extension of each table dump, by format.
+DUMP_EXTENSIONS = {"binary": "bin", "csv": "csv"}
+# Dumped in dependency order so a restore can load them front to back.
+DUMP_TABLES = ("categories", "recipes", "ingredients")
+
+RECIPE_COLUMNS = (
+    "id",
+    "title",
+    "description",
+    "instructions",
+    "prep_time",
+    "cook_time",
+    "servings",
+    "category_id",
+    "created_at",
+    "updated_at",
+    "version",
+    "tenant",
+)
+# Ingredient ids come from the table's own sequence.
+INGREDIENT_COLUMNS = ("recipe_id", "name", "amount", "unit")
+
+Row = Tuple[Any, ...]
+
+
+def dump_filename(table: str, format: str, compression: Optional[str] = None) -> str:
+    return f"{table}.{DUMP_EXTENSIONS[format]}" + (".gz" if compression == "gzip" else "")
+
+
+@dataclass
+class TransferStats:
+    """Rows moved by a bulk load or dump and how long it took."""
+
+    recipes: int = 0
+    ingredients: int = 0
+    categories: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return self.recipes + self.ingredients + self.categories
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _uses_copy(engine: Engine) -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def _check_format(engine: Engine, format: str) -> None:
+    if format not in COPY_FORMATS:
+        raise ValueError(f"Unsupported format '{format}'. Supported formats: {', '.join(COPY_FORMATS)}")
+    if format == "binary" and _uses_copy(engine) and engine.dialect.driver != "psycopg":
+        raise ValueError("Binary COPY requires the psycopg 3 driver (postgresql+psycopg://).")
+
+
+def _csv_field(value: Any) -> str:
+    # PostgreSQL's CSV format: an unquoted empty field is NULL, a quoted one an empty string.
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    if isinstance(value, bytes):
+        # bytea's hex output format.
+        return "\\x" + value.hex()
+    return str(value)
+
+
+def encode_csv(rows: Iterable[Row]) -> Iterator[str]:
+    """Encode rows as lines of the CSV dialect `COPY ... (FORMAT CSV)` reads and writes."""
+    for row in rows:
+        yield ",".join(_csv_field(value) for value in row) + "\n"
+
+
+# One field and the separator after it; group 1 is a quoted field's content, group 2 an unquoted field.
+_CSV_FIELD = re.compile(r'(?:"((?:[^"]|"")*)"|([^,"\n]*))(,|\n)')
+
+
+def decode_csv(lines: Iterable[str]) -> Iterator[List[Optional[str]]]:
+    """
+    Parse `encode_csv` output back into rows of strings, for loading without COPY.
+
+    As in PostgreSQL's CSV, an unquoted empty field is NULL and a quoted one an empty string;
+    a quoted field may span lines. Values are left for the caller to convert.
+    """
+    record = ""
+    for line in lines:
+        record += line
+        # An odd number of quotes so far means a quoted field continues on the next line.
+        if record.count('"') % 2:
+            continue
+        row: List[Optional[str]] = []
+        for match in _CSV_FIELD.finditer(record):
+            quoted, plain, separator = match.groups()
+            if quoted is not None:
+                row.append(quoted.replace('""', '"'))
+            else:
+                row.append(plain or None)
+            if separator == "\n":
+                break
+        yield row
+        record = ""
+
+
+def _binary_type(column) -> str:
+    if isinstance(column.type, BigInteger):
+        return "int8"
+    if isinstance(column.type, SmallInteger):
+        return "int2"
+    if isinstance(column.type, Integer):
+        return "int4"
+    if isinstance(column.type, DateTime):
+        return "timestamp"
+    # varchar and text share the binary wire format.
+    return "text"
+
+
+def _copy_in(connection: Connection, table: str, columns: Sequence[str], rows: List[Row], format: str) -> None:
+    """Stream rows into `table` through `COPY ... FROM STDIN` on the connection's own transaction."""
+    statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN (FORMAT {format.upper()})"
+    cursor = connection.connection.cursor()
+    try:
+        if connection.dialect.driver == "psycopg":
+            with cursor.copy(statement) as copy:
+                if format == "binary":
+                    table_columns = models.Base.metadata.tables[table].c
+                    copy.set_types([_binary_type(table_columns[name]) for name in columns])
+                    for row in rows:
+                        copy.write_row(row)
+                else:
+                    # write_row() emits COPY's TEXT or BINARY encoding, never CSV.
+                    copy.write("".join(encode_csv(rows)))
+        else:
+            # psycopg2 takes a file; CSV is the only format it can be handed without an encoder.
+            cursor.copy_expert(statement, io.StringIO("".join(encode_csv(rows))))
+    finally:
+        cursor.close()
+
+
+def _copy_out(connection: Connection, query: str, format: str, out: BinaryIO) -> int:
+    """Stream the result of `query` into `out` through `COPY ... TO STDOUT`; returns the row count."""
+    statement = f"COPY ({query}) TO STDOUT (FORMAT {format.upper()})"
+    cursor = connection.connection.cursor()
+    try:
+        if connection.dialect.driver == "psycopg":
+            with cursor.copy(statement) as copy:
+                for data in copy:
+                    out.write(data)
+        else:
+            # psycopg2 writes raw bytes to binary files.
+            cursor.copy_expert(statement, out)
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def _reserve_recipe_ids(connection: Connection, count: int, next_id: int) -> Tuple[List[int], int]:
+    """
+    Recipe ids for the next `count` recipes.
+
+    PostgreSQL draws them from the table's sequence, so concurrent inserts never collide. Other
+    dialects continue from `next_id`, which the caller read under a lock at the start of the load.
+    """
+    if _uses_copy(connection.engine):
+        ids = connection.execute(
+            text("SELECT nextval(pg_get_serial_sequence('recipes', 'id')) FROM generate_series(1, :count)"),
+            {"count": count},
+        ).scalars().all()
+        return ids, next_id
+    return list(range(next_id, next_id + count)), next_id + count
+
+
+def _batches(items: Iterable[schemas.RecipeCreate], size: int) -> Iterator[List[schemas.RecipeCreate]]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_load(
+    engine: Engine,
+    recipes: Iterable[schemas.RecipeCreate],
+    format: str = "binary",
+    batch_size: int = 10_000,
+    tenant: str = "",
+) -> TransferStats:
+    """
+    Insert recipes and their ingredients in bulk, in a single transaction.
+
+    On PostgreSQL both tables are streamed through `COPY ... FROM STDIN` in `format` (`binary`
+    needs psycopg 3; `csv` works with psycopg2 too). Recipe ids are reserved from the sequence
+    up front and assigned in memory, so ingredient rows carry their recipe's id without a
+    round trip per recipe. Other dialects (MySQL, SQLite) get the same rows through
+    `executemany`, with ids continuing from the current maximum, and ignore `format`.
+
+    The ORM is bypassed: category counters are reconciled at the end, while MinHash signatures
+    and the similarity index are left to `python -m app.dedupe` and the next index rebuild.
+
+    Args:
+        engine: Engine of the target database.
+        recipes: Recipes to insert; consumed lazily, `batch_size` at a time.
+        format: `binary` or `csv`, the COPY format used on PostgreSQL.
+        batch_size: Recipes held in memory and sent per COPY or `executemany`.
+        tenant: Stamped on every recipe; see `ShardedStorage`.
+
+    Raises:
+        ValueError: If the format is unknown, or binary is requested without psycopg 3.
+    """
+    _check_format(engine, format)
+    copy = _uses_copy(engine)
+    stats = TransferStats()
+    started = time.perf_counter()
+    recipes_table = models.Recipe.__table__
+    with engine.begin() as connection:
+        next_id = 0
+        if not copy:
+            # FOR UPDATE holds off concurrent inserts on MySQL; SQLite serializes writers anyway.
+            next_id = connection.execute(select(func.coalesce(func.max(recipes_table.c.id), 0)).with_for_update()).scalar() + 1
+
+        now = datetime.utcnow()
+        for batch in _batches(recipes, batch_size):
+            ids, next_id = _reserve_recipe_ids(connection, len(batch), next_id)
+            recipe_rows: List[Row] = []
+            ingredient_rows: List[Row] = []
+            for recipe_id, recipe in zip(ids, batch):
+                recipe_rows.append(
+                    (
+                        recipe_id,
+                        recipe.title,
+                        recipe.description,
+                        recipe.instructions,
+                        recipe.prep_time,
+                        recipe.cook_time,
+                        recipe.servings,
+                        recipe.category_id,
+                        now,
+                        now,
+                        1,
+                        tenant,
+                    )
+                )
+                ingredient_rows.extend((recipe_id, item.name, item.amount, item.unit) for item in recipe.ingredients)
+
+            if copy:
+                _copy_in(connection, "recipes", RECIPE_COLUMNS, recipe_rows, format)
+                if ingredient_rows:
+                    _copy_in(connection, "ingredients", INGREDIENT_COLUMNS, ingredient_rows, format)
+            else:
+                connection.execute(insert(recipes_table), [dict(zip(RECIPE_COLUMNS, row)) for row in recipe_rows])
+                if ingredient_rows:
+                    connection.execute(
+                        insert(models.Ingredient.__table__), [dict(zip(INGREDIENT_COLUMNS, row)) for row in ingredient_rows]
+                    )
+            stats.recipes += len(recipe_rows)
+            stats.ingredients += len(ingredient_rows)
+
+        # Joins the load's transaction, so the counters commit (or roll back) with the rows.
+        with Session(bind=connection) as db:
+            crud.reconcile_category_stats(db)
+
+    stats.seconds = time.perf_counter() - started
+    logger.info(
+        "Bulk-loaded %d recipes and %d ingredients in %.2fs (%.0f rows/s)",
+        stats.recipes,
+        stats.ingredients,
+        stats.seconds,
+        stats.rows_per_second,
+    )
+    return stats
+
+
+def dump_tables(
+    engine: Engine,
+    directory: str,
+    tables: Sequence[str] = DUMP_TABLES,
+    format: str = "csv",
+    compression: Optional[str] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, int]:
+    """
+    Write each table to `<directory>/<table>.<csv|bin>[.gz]` and return the row count per table.
+
+    On PostgreSQL each table is streamed out with `COPY (SELECT ...) TO STDOUT`, all from one
+    repeatable-read snapshot. Other dialects write the same CSV from a streamed SELECT in one
+    read transaction; `binary` is PostgreSQL only.
+
+    Args:
+        engine: Engine of the source database.
+        directory: Created if missing; existing dump files are overwritten.
+        tables: Table names, in the order a restore should load them.
+        format: `csv` or `binary`.
+        compression: None or `gzip`.
+        progress: Called with `(tables written, total tables)` after each table.
+
+    Raises:
+        ValueError: If the format or compression is unknown or unavailable on this database.
+    """
+    _check_format(engine, format)
+    copy = _uses_copy(engine)
+    if format == "binary" and not copy:
+        raise ValueError("Binary dumps require PostgreSQL.")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unsupported compression '{compression}'. Supported: gzip")
+    target = Path(directory)
+    target.mkdir(parents=True, exist_ok=True)
+
+    counts: Dict[str, int] = {}
+    options = {"isolation_level": "REPEATABLE READ"} if copy else {}
+    with engine.connect().execution_options(**options) as connection, connection.begin():
+        for name in tables:
+            table = models.Base.metadata.tables[name]
+            query = select(table).order_by(*table.primary_key.columns)
+            path = target / dump_filename(name, format, compression)
+            # Level 1: COPY output is repetitive enough that faster levels lose little ratio.
+            with (gzip.open(path, "wb", compresslevel=1) if compression else open(path, "wb")) as out:
+                if copy:
+                    counts[name] = _copy_out(connection, str(query.compile(dialect=connection.dialect)), format, out)
+                else:
+                    counts[name] = 0
+                    result = connection.execution_options(yield_per=10_000).execute(query)
+                    for partition in result.partitions():
+                        out.write("".join(encode_csv(partition)).encode("utf-8"))
+                        counts[name] += len(partition)
+            if progress is not None:
+                progress(len(counts), len(tables))
+    return counts
+
+
+def dump(engine: Engine, directory: str, format: str = "csv", compression: Optional[str] = None) -> TransferStats:
+    """
+    Write `categories`, `recipes` and `ingredients` to `<directory>/<table>.<csv|bin>[.gz]`.
+
+    See `dump_tables`; PostgreSQL uses `COPY TO STDOUT`.
+    """
+    started = time.perf_counter()
+    counts = dump_tables(engine, directory, DUMP_TABLES, format=format, compression=compression)
+    stats = TransferStats(**counts, seconds=time.perf_counter() - started)
+    logger.info("Dumped %d rows to %s in %.2fs (%.0f rows/s)", stats.rows, directory, stats.seconds, stats.rows_per_second)
+    return stats
+
+
+def read_recipes(path: str) -> Iterator[schemas.RecipeCreate]:
+    """Recipes from a JSON Lines file, one `RecipeCreate` object per line."""
+    with open(path, encoding="utf-8") as lines:
+        for line in lines:
+            if line.strip():
+                yield schemas.RecipeCreate.model_validate_json(line)
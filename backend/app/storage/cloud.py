@@ -1,6 +1,6 @@
 import logging
 import re
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Dict, Optional
 from urllib.parse import ParseResult, parse_qsl, urlparse
 
 from sqlalchemy import create_engine, text
@@ -10,6 +10,9 @@ from sqlalchemy.orm import Session, sessionmaker
 
 from .base import StorageBackend
 
+if TYPE_CHECKING:
+    from .backup import BackupStats, Progress
+
 logger = logging.getLogger(__name__)
 
 _DIALECT_PATTERN = re.compile(r"^(postgresql|mysql)(?:\+[a-zA-Z0-9]+)?://")
@@ -147,6 +150,7 @@ class CloudStorage(StorageBackend):
             self._session_maker = sessionmaker(
                 autocommit=False,
                 autoflush=False,
+                expire_on_commit=False,
                 bind=engine,
             )
         return self._session_maker
@@ -180,7 +184,7 @@ class CloudStorage(StorageBackend):
             raise ConnectionError("Unable to reach the cloud database for initialization.")
 
         try:
-            from backend.app.models import Base
+            from app.models import Base
 
             Base.metadata.create_all(bind=engine)
             logger.info("Initialized cloud schema for %s", self._connection_summary)
@@ -198,3 +202,15 @@ class CloudStorage(StorageBackend):
         except (OperationalError, SQLAlchemyError) as exc:
             logger.error("Cloud health check failed for %s: %s", self._connection_summary, exc)
             return False
+
+    def backup(self, dest: str, progress: Optional["Progress"] = None) -> "BackupStats":
+        """Dump every table to the directory `dest` as gzip-compressed COPY output with a manifest."""
+        from .backup import copy_backup
+
+        return copy_backup(self.get_engine(), dest, progress=progress)
+
+    def restore(self, src: str, progress: Optional["Progress"] = None) -> "BackupStats":
+        """Load a `backup()` directory back in one transaction, through COPY on PostgreSQL and INSERTs elsewhere."""
+        from .backup import copy_restore
+
+        return copy_restore(self.get_engine(), src, progress=progress)
@@ -1,17 +1,56 @@
 import logging
 import os
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Callable, Dict, Optional, TypeVar
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session, sessionmaker
 
 from .base import StorageBackend
 
+if TYPE_CHECKING:
+    from .backup import BackupStats, Progress
+from .sqlite_writer import SQLiteWriteQueue
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Applied to every connection in tuned mode. `journal_mode` is persistent and set by writers only.
+# `foreign_keys` is switched on for every SQLite connection by app.database.
+TUNED_PRAGMAS: Dict[str, str] = {
+    "synchronous": "NORMAL",
+    "mmap_size": str(256 * 1024 * 1024),
+    "cache_size": str(-64 * 1024),  # negative = KiB, i.e. 64 MiB per connection
+    "busy_timeout": "5000",
+}
+
+
+def _install_pragmas(engine: Engine, pragmas: Dict[str, str]) -> None:
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def _install_immediate_transactions(engine: Engine) -> None:
+    # pysqlite defers BEGIN until the first DML and mishandles SAVEPOINT; let SQLAlchemy emit
+    # BEGIN IMMEDIATE itself so the write lock is taken up front and savepoints work.
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
 
 class LocalStorage(StorageBackend):
     """
@@ -21,22 +60,34 @@ class LocalStorage(StorageBackend):
     local-only deployments or single-user scenarios where a lightweight embedded
     database is sufficient.
 
+    With `tuned=True` the database runs in WAL mode with `TUNED_PRAGMAS` applied to
+    every connection. Reads should then use `create_read_session()`, which draws from a
+    separate pool of read-only connections, and writes should go through `submit_write()`,
+    which group-commits them on a single writer thread so concurrent API writes no longer
+    fail with `database is locked`.
+
     Args:
         db_path: Path where the SQLite database file will be stored. The path is
             expanded and converted to an absolute location before use.
+        tuned: Enable WAL, pragma tuning, the read-only pool and the writer queue.
+        read_pool_size: Number of pooled read-only connections in tuned mode.
 
     Example:
-        storage = LocalStorage(db_path="./data/recipe_manager.db")
+        storage = LocalStorage(db_path="./data/recipe_manager.db", tuned=True)
         storage.initialize()
-        session = storage.create_session()
+        recipe = storage.submit_write(lambda session: crud_helper(session)).result()
+        with storage.create_read_session() as session:
+            ...
     """
 
-    def __init__(self, db_path: str = "./data/recipe_manager.db") -> None:
+    def __init__(self, db_path: str = "./data/recipe_manager.db", tuned: bool = False, read_pool_size: int = 8) -> None:
         """
         Prepare the filesystem path and setup internal state.
 
         Args:
             db_path: Relative or absolute path to the SQLite database file.
+            tuned: Enable the high-throughput WAL mode described on the class.
+            read_pool_size: Number of pooled read-only connections in tuned mode.
         """
         resolved_path = Path(db_path).expanduser().resolve()
         directory = resolved_path.parent
@@ -53,9 +104,14 @@ class LocalStorage(StorageBackend):
         database_url = f"sqlite:///{resolved_path.as_posix()}"
         super().__init__(database_url)
         self.db_path = resolved_path
+        self.tuned = tuned
+        self.read_pool_size = read_pool_size
         self._engine: Optional[Engine] = None
         self._session_maker: Optional[sessionmaker] = None
-        logger.info("LocalStorage configured with database file %s", self.db_path)
+        self._read_engine: Optional[Engine] = None
+        self._read_session_maker: Optional[sessionmaker] = None
+        self._write_queue: Optional[SQLiteWriteQueue] = None
+        logger.info("LocalStorage configured with database file %s (tuned=%s)", self.db_path, self.tuned)
 
     def get_engine(self) -> Engine:
         """Return the cached SQLAlchemy engine, creating it if needed."""
@@ -67,6 +123,8 @@ class LocalStorage(StorageBackend):
                     pool_pre_ping=True,
                     echo=False,
                 )
+                if self.tuned:
+                    _install_pragmas(self._engine, {"journal_mode": "WAL", **TUNED_PRAGMAS})
                 self.is_connected = True
                 logger.info("Created SQLite engine for %s", self.database_url)
             except SQLAlchemyError as exc:
@@ -82,6 +140,7 @@ class LocalStorage(StorageBackend):
             self._session_maker = sessionmaker(
                 autocommit=False,
                 autoflush=False,
+                expire_on_commit=False,
                 bind=engine,
             )
 
@@ -96,8 +155,92 @@ class LocalStorage(StorageBackend):
             logger.error("Failed to create SQLite session: %s", exc)
             raise
 
+    def get_read_engine(self) -> Engine:
+        """
+        Return the engine backed by read-only connections.
+
+        Outside tuned mode this is the regular engine.
+        """
+        if not self.tuned:
+            return self.get_engine()
+
+        if self._read_engine is None:
+            # Make sure the file exists and is in WAL mode before opening it read-only.
+            self.get_engine().connect().close()
+            try:
+                self._read_engine = create_engine(
+                    f"sqlite:///file:{self.db_path.as_posix()}?mode=ro&uri=true",
+                    connect_args={"check_same_thread": False},
+                    pool_size=self.read_pool_size,
+                    max_overflow=0,
+                    echo=False,
+                )
+                _install_pragmas(self._read_engine, {**TUNED_PRAGMAS, "query_only": "ON"})
+                logger.info("Created read-only SQLite pool (%d connections) for %s", self.read_pool_size, self.db_path)
+            except SQLAlchemyError as exc:
+                logger.error("Failed to create read-only SQLite engine: %s", exc)
+                raise
+
+        return self._read_engine
+
+    def create_read_session(self) -> Session:
+        """Create a session for queries only; in tuned mode it cannot write."""
+        if self._read_session_maker is None:
+            self._read_session_maker = sessionmaker(
+                autocommit=False,
+                autoflush=False,
+                expire_on_commit=False,
+                bind=self.get_read_engine(),
+            )
+        return self._read_session_maker()
+
+    def submit_write(self, func: Callable[[Session], T]) -> "Future[T]":
+        """
+        Queue `func(session)` to run on the writer thread and return a future for its result.
+
+        In tuned mode jobs are group-committed by `SQLiteWriteQueue`; otherwise the job runs
+        immediately in its own session and the returned future is already resolved.
+        """
+        if not self.tuned:
+            future: "Future[T]" = Future()
+            session = self.create_session()
+            try:
+                result = func(session)
+                session.commit()
+                future.set_result(result)
+            except Exception as exc:
+                session.rollback()
+                future.set_exception(exc)
+            finally:
+                session.close()
+            return future
+
+        if self._write_queue is None:
+            writer_engine = create_engine(
+                self.database_url,
+                connect_args={"check_same_thread": False},
+                pool_size=1,
+                max_overflow=0,
+                echo=False,
+            )
+            _install_pragmas(writer_engine, {"journal_mode": "WAL", **TUNED_PRAGMAS})
+            _install_immediate_transactions(writer_engine)
+            self._write_queue = SQLiteWriteQueue(writer_engine)
+
+        return self._write_queue.submit(func)
+
     def close(self) -> None:
-        """Dispose the SQLite engine and reset internal connection state."""
+        """Flush queued writes, dispose the SQLite engines and reset internal connection state."""
+        if self._write_queue is not None:
+            self._write_queue.close()
+            self._write_queue.engine.dispose()
+            self._write_queue = None
+
+        if self._read_engine is not None:
+            self._read_engine.dispose()
+            self._read_engine = None
+            self._read_session_maker = None
+
         if self._engine is not None:
             try:
                 self._engine.dispose()
@@ -131,3 +274,29 @@ class LocalStorage(StorageBackend):
         except SQLAlchemyError as exc:
             logger.error("SQLite health check failed: %s", exc)
             return False
+
+    def backup(self, dest: str, progress: Optional["Progress"] = None) -> "BackupStats":
+        """
+        Copy the database to the file `dest` with SQLite's online backup API.
+
+        Pages are copied in steps with the source unlocked in between, so the API keeps
+        serving reads and writes while the backup runs.
+        """
+        from .backup import sqlite_backup
+
+        return sqlite_backup(self.get_engine(), dest, progress=progress)
+
+    def restore(self, src: str, progress: Optional["Progress"] = None) -> "BackupStats":
+        """
+        Overwrite the database with the SQLite backup file `src`.
+
+        Queued writes are flushed and pooled connections dropped first, so nothing cached
+        from the old contents survives the restore.
+        """
+        from .backup import sqlite_restore
+
+        self.close()
+        try:
+            return sqlite_restore(self.get_engine(), src, progress=progress)
+        finally:
+            self.get_engine().dispose()
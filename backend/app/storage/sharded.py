@@ -0,0 +1,446 @@
+import hashlib
+import heapq
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple, TypeVar
+
+from sqlalchemy import bindparam, delete, event, insert, select, update
+from sqlalchemy.engine import Connection, Engine, Row
+from sqlalchemy.orm import Session, sessionmaker, with_loader_criteria
+
+from .base import StorageBackend
+
+if TYPE_CHECKING:
+    from app.schemas import RecipeCreate
+
+    from .backup import BackupStats, Progress
+    from .bulk import TransferStats
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TenantSession(Session):
+    """
+    Session confined to the tenant in `info["tenant"]`, as handed out by `ShardedStorage`.
+
+    ORM SELECTs of categories and recipes only see the tenant's rows (ingredients follow their
+    recipe), and categories and recipes added through it are stamped with the tenant at flush.
+    Statements against the plain tables (`Model.__table__`) and bulk UPDATEs and DELETEs are not
+    filtered; CRUD adds the tenant condition to those itself.
+    """
+
+
+@event.listens_for(TenantSession, "do_orm_execute")
+def _filter_by_tenant(execute_state):
+    if not execute_state.is_select or execute_state.is_column_load or execute_state.is_relationship_load:
+        return
+    from app import models
+
+    tenant = execute_state.session.info["tenant"]
+    execute_state.statement = execute_state.statement.options(
+        with_loader_criteria(models.Category, lambda cls: cls.tenant == tenant, include_aliases=True),
+        with_loader_criteria(models.Recipe, lambda cls: cls.tenant == tenant, include_aliases=True),
+    )
+
+
+@event.listens_for(TenantSession, "before_flush")
+def _stamp_tenant(session, flush_context, instances):
+    from app import models
+
+    for instance in session.new:
+        if isinstance(instance, (models.Category, models.Recipe)):
+            instance.tenant = session.info["tenant"]
+
+
+def _weight(tenant: str, shard: int) -> int:
+    digest = hashlib.blake2b(f"{shard}\0{tenant}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _without_id(row: Mapping[str, Any]) -> Dict[str, Any]:
+    return {name: value for name, value in row.items() if name != "id"}
+
+
+@dataclass
+class TenantMove:
+    """A tenant's rows found on a shard other than the one the tenant routes to."""
+
+    tenant: str
+    source: int
+    destination: int
+    # Rows copied; None until the move has run (e.g. in a dry run).
+    stats: Optional["TransferStats"] = None
+
+
+class ShardedStorage(StorageBackend):
+    """
+    Storage spread over several databases, each tenant (household or collection) living on one.
+
+    Every shard is a complete `StorageBackend` with the full schema. A tenant key picks its shard
+    by rendezvous hashing, so a tenant's categories, recipes and ingredients are always written
+    together on one database and joins never cross shards. Shards are identified by position:
+    appending one moves only the tenants that now hash to it (about 1/N of them), which
+    `rebalance()` (or `python -m app.rebalance`) then copies over.
+
+    Per-tenant work goes through `create_session(tenant)`, a `TenantSession` on the tenant's
+    shard. Admin-wide reads run on every shard at once and are merged: see `scatter()`,
+    `tenants()` and `list_recipes()`. Ids are per shard, so (shard, id) identifies a row.
+
+    The API's in-process caches and indexes (category cache, similarity and facet indexes)
+    describe a single database; the API keeps serving from `DATABASE_URL`.
+
+    Args:
+        shards: One backend per shard, in routing order.
+
+    Raises:
+        ValueError: If no shards are given.
+
+    Example:
+        storage = ShardedStorage([LocalStorage("./data/shard-0.db"), LocalStorage("./data/shard-1.db")])
+        storage.initialize()
+        with storage.create_session("smith-household") as session:
+            crud.create_recipe(session, recipe_in)
+    """
+
+    def __init__(self, shards: Sequence[StorageBackend]) -> None:
+        """
+        Route over `shards`.
+
+        Args:
+            shards: One backend per shard, in routing order.
+
+        Raises:
+            ValueError: If `shards` is empty.
+        """
+        if not shards:
+            raise ValueError("ShardedStorage needs at least one shard.")
+        super().__init__(",".join(shard.database_url for shard in shards))
+        self.shards: List[StorageBackend] = list(shards)
+        logger.info("ShardedStorage configured with %d shards", len(self.shards))
+
+    def shard_for(self, tenant: Optional[str]) -> int:
+        """
+        Index of the shard that holds `tenant`.
+
+        Raises:
+            ValueError: If `tenant` is missing or empty.
+        """
+        if not tenant:
+            raise ValueError("ShardedStorage routes by tenant; pass a non-empty tenant key.")
+        return max(range(len(self.shards)), key=lambda index: _weight(tenant, index))
+
+    def _each(self, func: Callable[[int, StorageBackend], T], progress: Optional["Progress"] = None) -> List[T]:
+        """`func(index, shard)` on every shard concurrently; results in shard order."""
+        with ThreadPoolExecutor(max_workers=len(self.shards)) as pool:
+            futures = [pool.submit(func, index, shard) for index, shard in enumerate(self.shards)]
+            for done, _ in enumerate(as_completed(futures), start=1):
+                if progress is not None:
+                    progress(done, len(futures))
+            return [future.result() for future in futures]
+
+    def get_engine(self, tenant: Optional[str] = None) -> Engine:
+        """Return the engine of `tenant`'s shard."""
+        return self.shards[self.shard_for(tenant)].get_engine()
+
+    def get_session_maker(self, tenant: Optional[str] = None) -> sessionmaker:
+        """Return a sessionmaker of `TenantSession`s for `tenant` on its shard."""
+        return sessionmaker(
+            class_=TenantSession,
+            autocommit=False,
+            autoflush=False,
+            expire_on_commit=False,
+            bind=self.get_engine(tenant),
+            info={"tenant": tenant},
+        )
+
+    def create_session(self, tenant: Optional[str] = None) -> Session:
+        """Create a `TenantSession` for `tenant` on its shard."""
+        return self.get_session_maker(tenant)()
+
+    def close(self) -> None:
+        """Close every shard."""
+        for shard in self.shards:
+            shard.close()
+        self.is_connected = False
+
+    def initialize(self) -> None:
+        """Create the schema on every shard, including ones just appended."""
+        for shard in self.shards:
+            shard.initialize()
+        self.is_connected = True
+
+    def health_check(self) -> bool:
+        """True only if every shard answers; shards are probed concurrently."""
+        return all(self._each(lambda index, shard: shard.health_check()))
+
+    def scatter(self, func: Callable[[Session], T]) -> List[T]:
+        """
+        Run `func` on every shard at once, each with its own unfiltered session.
+
+        Returns:
+            List: `func`'s results, in shard order.
+        """
+
+        def run(index: int, shard: StorageBackend) -> T:
+            with shard.create_session() as session:
+                return func(session)
+
+        return self._each(run)
+
+    def tenants(self) -> Dict[str, List[int]]:
+        """Every tenant with rows anywhere, and the shards those rows are on ("" is unsharded data)."""
+        from app import models
+
+        statement = select(models.Category.__table__.c.tenant).union(select(models.Recipe.__table__.c.tenant))
+        placement: Dict[str, List[int]] = {}
+        for index, found in enumerate(self.scatter(lambda session: session.scalars(statement).all())):
+            for tenant in found:
+                placement.setdefault(tenant, []).append(index)
+        return dict(sorted(placement.items()))
+
+    def list_recipes(self, limit: int = 100, offset: int = 0) -> List[Tuple[int, Row]]:
+        """
+        A page of recipes across all tenants, newest first, as `(shard, row)` pairs.
+
+        Each shard returns its newest `offset + limit` rows and the sorted lists are merged, so
+        deep pages cost every shard more; rows carry `id`, `tenant`, `title`, `category_id` and
+        `created_at`.
+        """
+        from app import models
+
+        recipes = models.Recipe.__table__
+        statement = (
+            select(recipes.c.id, recipes.c.tenant, recipes.c.title, recipes.c.category_id, recipes.c.created_at)
+            .order_by(recipes.c.created_at.desc(), recipes.c.id.desc())
+            .limit(offset + limit)
+        )
+        pages = self.scatter(lambda session: session.execute(statement).all())
+        merged = heapq.merge(
+            *([(index, row) for row in rows] for index, rows in enumerate(pages)),
+            key=lambda item: (item[1].created_at, item[1].id),
+            reverse=True,
+        )
+        return list(islice(merged, offset, offset + limit))
+
+    def bulk_load(
+        self,
+        recipes: Iterable["RecipeCreate"],
+        format: str = "binary",
+        batch_size: int = 10_000,
+        tenant: Optional[str] = None,
+    ) -> "TransferStats":
+        """Bulk-insert `tenant`'s recipes on its shard; `category_id`s must be ids on that shard."""
+        from .bulk import bulk_load
+
+        return bulk_load(self.get_engine(tenant), recipes, format=format, batch_size=batch_size, tenant=tenant)
+
+    def dump(self, directory: str, format: str = "csv", compression: Optional[str] = None) -> "TransferStats":
+        """Dump every shard, concurrently, to `<directory>/shard-<n>`."""
+        from .bulk import TransferStats
+
+        started = time.perf_counter()
+        results = self._each(
+            lambda index, shard: shard.dump(os.path.join(directory, f"shard-{index}"), format=format, compression=compression)
+        )
+        return TransferStats(
+            recipes=sum(stats.recipes for stats in results),
+            ingredients=sum(stats.ingredients for stats in results),
+            categories=sum(stats.categories for stats in results),
+            seconds=time.perf_counter() - started,
+        )
+
+    def backup(self, dest: str, progress: Optional["Progress"] = None) -> "BackupStats":
+        """
+        Back up every shard, concurrently, to `<dest>/shard-<n>` in that shard's own format.
+
+        `progress` counts finished shards.
+        """
+        from .backup import BackupStats
+
+        os.makedirs(dest, exist_ok=True)
+        started = time.perf_counter()
+        results = self._each(lambda index, shard: shard.backup(os.path.join(dest, f"shard-{index}")), progress)
+        return BackupStats(
+            bytes=sum(stats.bytes for stats in results),
+            rows=sum(stats.rows for stats in results),
+            seconds=time.perf_counter() - started,
+        )
+
+    def restore(self, src: str, progress: Optional["Progress"] = None) -> "BackupStats":
+        """
+        Restore every shard from a `backup()` directory; `progress` counts finished shards.
+
+        Raises:
+            ValueError: If a shard's backup is missing, checked before any shard is touched.
+        """
+        from .backup import BackupStats
+
+        missing = [f"shard-{index}" for index in range(len(self.shards)) if not os.path.exists(os.path.join(src, f"shard-{index}"))]
+        if missing:
+            raise ValueError(f"Backup at {src} has no {', '.join(missing)}")
+        started = time.perf_counter()
+        results = self._each(lambda index, shard: shard.restore(os.path.join(src, f"shard-{index}")), progress)
+        return BackupStats(
+            bytes=sum(stats.bytes for stats in results),
+            rows=sum(stats.rows for stats in results),
+            seconds=time.perf_counter() - started,
+        )
+
+    def rebalance(self, dry_run: bool = False) -> List[TenantMove]:
+        """
+        Move every tenant found on a shard it does not route to onto the one it does.
+
+        Run it after appending a shard, before the application starts routing with the new
+        shard list, and with writes for the affected tenants paused: each move copies the
+        tenant's rows in one transaction on the destination, then deletes them from the source in
+        another. A run interrupted between the two is safe to repeat: the repeated copy replaces
+        the tenant's rows on the destination rather than adding to them. Unsharded rows (tenant
+        "") stay where they are.
+
+        Args:
+            dry_run: Only report the moves.
+
+        Returns:
+            List[TenantMove]: The moves, with `stats` filled in unless `dry_run`.
+        """
+        moves = [
+            TenantMove(tenant, source, self.shard_for(tenant))
+            for tenant, shards in self.tenants().items()
+            if tenant
+            for source in shards
+            if source != self.shard_for(tenant)
+        ]
+        if dry_run:
+            return moves
+        moved: Set[str] = set()
+        for move in moves:
+            # Only the tenant's first move replaces its rows on the destination; later ones (from
+            # other shards it was spread over) add to what that one copied.
+            move.stats = move_tenant(
+                self.shards[move.source].get_engine(),
+                self.shards[move.destination].get_engine(),
+                move.tenant,
+                replace=move.tenant not in moved,
+            )
+            moved.add(move.tenant)
+            logger.info(
+                "Moved tenant %s from shard %d to %d: %d categories, %d recipes, %d ingredients in %.2fs",
+                move.tenant,
+                move.source,
+                move.destination,
+                move.stats.categories,
+                move.stats.recipes,
+                move.stats.ingredients,
+                move.stats.seconds,
+            )
+        return moves
+
+
+def _delete_tenant_rows(connection: Connection, tenant: str) -> None:
+    """Delete `tenant`'s categories and recipes, with everything hanging off them, on `connection`."""
+    from app import models
+
+    categories = models.Category.__table__
+    recipes = models.Recipe.__table__
+    tenant_recipes = select(recipes.c.id).where(recipes.c.tenant == tenant)
+    tenant_categories = select(categories.c.id).where(categories.c.tenant == tenant)
+    for table in (models.Ingredient.__table__, models.RecipeMinHashBand.__table__, models.RecipeStats.__table__):
+        connection.execute(delete(table).where(table.c.recipe_id.in_(tenant_recipes)))
+    # Rows of other tenants should not point into this one, but must not dangle if they do.
+    connection.execute(
+        update(recipes).where(recipes.c.tenant != tenant, recipes.c.duplicate_of_id.in_(tenant_recipes)).values(duplicate_of_id=None)
+    )
+    connection.execute(
+        update(recipes).where(recipes.c.tenant != tenant, recipes.c.category_id.in_(tenant_categories)).values(category_id=None)
+    )
+    connection.execute(delete(recipes).where(recipes.c.tenant == tenant))
+    category_stats = models.CategoryStats.__table__
+    connection.execute(delete(category_stats).where(category_stats.c.category_id.in_(tenant_categories)))
+    connection.execute(delete(categories).where(categories.c.tenant == tenant))
+
+
+def move_tenant(source: Engine, destination: Engine, tenant: str, replace: bool = True) -> "TransferStats":
+    """
+    Copy `tenant`'s rows from `source` to `destination`, then delete them from `source`.
+
+    Categories are matched to existing ones of the tenant by name; recipes, ingredients, MinHash
+    bands and view counts get new ids on the destination. Duplicate links to recipes of other
+    tenants are dropped (duplicate detection runs per shard, across tenants).
+
+    With `replace`, the copy first deletes whatever `destination` holds of the tenant, in the
+    same transaction; that can only be an earlier copy whose source rows were never deleted,
+    so repeating an interrupted move does not duplicate the tenant's rows.
+
+    Returns:
+        TransferStats: Rows copied and how long the whole move took.
+    """
+    from app import crud, models
+    from app.models.category_stats import insert_stats_row
+
+    from .bulk import TransferStats
+
+    categories = models.Category.__table__
+    recipes = models.Recipe.__table__
+    ingredients = models.Ingredient.__table__
+    stats = TransferStats()
+    started = time.perf_counter()
+    tenant_recipes = select(recipes.c.id).where(recipes.c.tenant == tenant)
+
+    with source.connect() as reader, destination.begin() as writer:
+        if replace:
+            _delete_tenant_rows(writer, tenant)
+        category_ids: Dict[int, int] = {}
+        for row in reader.execute(select(categories).where(categories.c.tenant == tenant).order_by(categories.c.id)).mappings():
+            category_id = writer.execute(
+                select(categories.c.id).where(categories.c.tenant == tenant, categories.c.name == row["name"])
+            ).scalar()
+            if category_id is None:
+                category_id = writer.execute(insert(categories).values(_without_id(row))).inserted_primary_key[0]
+                insert_stats_row(writer, category_id)
+            category_ids[row["id"]] = category_id
+        stats.categories = len(category_ids)
+
+        recipe_ids: Dict[int, int] = {}
+        originals: List[Tuple[int, int]] = []
+        for row in reader.execute(select(recipes).where(recipes.c.tenant == tenant).order_by(recipes.c.id)).mappings():
+            values = _without_id(row)
+            values.update(category_id=category_ids.get(row["category_id"]), duplicate_of_id=None)
+            recipe_ids[row["id"]] = writer.execute(insert(recipes).values(values)).inserted_primary_key[0]
+            if row["duplicate_of_id"] is not None:
+                originals.append((row["id"], row["duplicate_of_id"]))
+        stats.recipes = len(recipe_ids)
+        links = [
+            {"copy_id": recipe_ids[copy_id], "original_id": recipe_ids[original_id]}
+            for copy_id, original_id in originals
+            if original_id in recipe_ids
+        ]
+        if links:
+            writer.execute(
+                update(recipes).where(recipes.c.id == bindparam("copy_id")).values(duplicate_of_id=bindparam("original_id")), links
+            )
+
+        for table in (ingredients, models.RecipeMinHashBand.__table__, models.RecipeStats.__table__):
+            rows = [
+                {**_without_id(row), "recipe_id": recipe_ids[row["recipe_id"]]}
+                for row in reader.execute(select(table).where(table.c.recipe_id.in_(tenant_recipes))).mappings()
+            ]
+            if rows:
+                writer.execute(insert(table), rows)
+            if table is ingredients:
+                stats.ingredients = len(rows)
+
+        # Joins the copy's transaction, so the counters commit (or roll back) with the rows.
+        with Session(bind=writer) as db:
+            crud.reconcile_category_stats(db)
+
+    with source.begin() as connection:
+        _delete_tenant_rows(connection, tenant)
+
+    stats.seconds = time.perf_counter() - started
+    return stats
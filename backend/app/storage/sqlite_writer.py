@@ -0,0 +1,130 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteJob = Tuple[Callable[[Session], Any], Future]
+Effect = Callable[[], None]
+
+_STOP = object()
+
+
+class SQLiteWriteQueue:
+    """
+    Funnel all writes to a SQLite database through one dedicated thread.
+
+    SQLite allows a single writer at a time, so concurrent writers only contend for the lock
+    and each pays its own fsync. Here every submitted job is queued; the writer thread takes
+    whatever has accumulated (up to `max_batch_size`), runs each job in its own SAVEPOINT
+    inside one transaction, and commits once for the whole batch (group commit). A failing
+    job only rolls back its own savepoint.
+
+    Jobs receive a `Session` joined to the batch transaction, so existing CRUD helpers can be
+    used as-is: their `session.commit()` only releases the job's savepoint. The value a job
+    returns is delivered through the `Future` once the whole batch has committed; returned
+    ORM objects are detached but keep their loaded state. Side effects the jobs register with
+    `app.database.after_commit` (index updates, change events) run at that point too, and are
+    dropped if the job or the batch fails.
+
+    Args:
+        engine: Engine whose connections begin transactions with `BEGIN IMMEDIATE`.
+        max_batch_size: Upper bound on jobs committed together.
+    """
+
+    def __init__(self, engine: Engine, max_batch_size: int = 64) -> None:
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, func: Callable[[Session], T]) -> "Future[T]":
+        """Queue a write job and return a future for its result."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SQLite write queue is closed.")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+                self._thread.start()
+
+        future: "Future[T]" = Future()
+        self._queue.put((func, future))
+        return future
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Commit everything already queued, then stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch: List[WriteJob] = [item]
+            while len(batch) < self.max_batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch: List[WriteJob]) -> None:
+        completed: List[Tuple[Future, Any, List[Effect]]] = []
+        try:
+            with self.engine.connect() as connection, connection.begin():
+                for func, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    session = Session(
+                        bind=connection,
+                        join_transaction_mode="create_savepoint",
+                        autoflush=False,
+                        expire_on_commit=False,
+                        info={"after_commit": []},
+                    )
+                    try:
+                        result = func(session)
+                        session.commit()
+                    except Exception as exc:
+                        session.rollback()
+                        future.set_exception(exc)
+                    else:
+                        completed.append((future, result, session.info["after_commit"]))
+                    finally:
+                        session.close()
+        except Exception as exc:
+            logger.error("SQLite group commit of %d jobs failed: %s", len(batch), exc)
+            for future, _, _ in completed:
+                future.set_exception(exc)
+            return
+
+        for future, result, effects in completed:
+            for effect in effects:
+                try:
+                    effect()
+                except Exception:
+                    logger.exception("Side effect of a committed SQLite write failed")
+            future.set_result(result)
@@ -0,0 +1,93 @@
+"""
+Online SQLite backup and restore throughput, and how long writers wait during a backup.
+
+Fills a throwaway tuned (WAL) database to `--size-mb` with synthetic recipes, then:
+  1. backs it up with `LocalStorage.backup` while idle,
+  2. backs it up again while a writer thread commits one recipe every few milliseconds,
+     reporting the writer's commits and worst commit latency during the copy,
+  3. restores the backup over the live database.
+Step 2 shows the point of the page-stepped copy: a one-shot backup would hold the read lock
+for the whole copy, while stepping lets each write land between steps.
+
+Usage (from `backend/`):
+    python -m benchmarks.backup --size-mb 2048
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}")
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import crud, models, schemas  # noqa: E402
+from app.storage import LocalStorage  # noqa: E402
+
+ROW_PADDING = 4000
+ROWS_PER_BATCH = 5_000
+
+
+def fill(storage: LocalStorage, size_mb: int) -> None:
+    target = size_mb * 1024 * 1024
+    n = 0
+    while storage.db_path.stat().st_size < target:
+        rows = [
+            {"title": f"Recipe {n + i}", "description": "x" * ROW_PADDING, "instructions": "Mix and bake.", "servings": 4}
+            for i in range(ROWS_PER_BATCH)
+        ]
+        with storage.get_engine().begin() as connection:
+            connection.execute(insert(models.Recipe), rows)
+        n += ROWS_PER_BATCH
+    with storage.get_engine().connect() as connection:
+        connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def report(label: str, stats) -> None:
+    print(f"{label:<22} {stats.bytes / 1e6:>9.0f} {stats.seconds:>8.2f} {stats.bytes_per_second / 1e6:>8.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--write-interval", type=float, default=0.005, help="Seconds between writer commits.")
+    args = parser.parse_args()
+
+    storage = LocalStorage(db_path=os.path.join(_tmp.name, "source.db"), tuned=True)
+    storage.initialize()
+    started = time.perf_counter()
+    fill(storage, args.size_mb)
+    print(f"filled {storage.db_path.stat().st_size / 1e6:.0f} MB in {time.perf_counter() - started:.1f}s")
+    print(f"{'operation':<22} {'MB':>9} {'seconds':>8} {'MB/s':>8}")
+
+    dest = os.path.join(_tmp.name, "backup.db")
+    report("backup (idle)", storage.backup(dest))
+
+    stop = threading.Event()
+    latencies = []
+
+    def writer() -> None:
+        while not stop.is_set():
+            began = time.perf_counter()
+            storage.submit_write(lambda session: crud.create_recipe(session, schemas.RecipeCreate(title="Concurrent"))).result()
+            latencies.append(time.perf_counter() - began)
+            time.sleep(args.write_interval)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        report("backup (with writer)", storage.backup(dest))
+    finally:
+        stop.set()
+        thread.join()
+    if latencies:
+        print(f"  writer: {len(latencies)} commits during backup, max latency {max(latencies) * 1000:.1f} ms")
+
+    report("restore", storage.restore(dest))
+    storage.close()
+
+
+if __name__ == "__main__":
+    main()
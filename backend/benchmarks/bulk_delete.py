@@ -0,0 +1,88 @@
+"""
+Time deleting recipes that each have many ingredients.
+
+Seeds a throwaway SQLite database (foreign keys on) with `--recipes` recipes of
+`--ingredients` ingredients each, then deletes all of them using:
+
+  orm-cascade  the previous behaviour: load every recipe with its ingredients and let the
+               ORM delete the children row by row before each recipe
+  bulk         `crud.delete_recipes`: one `DELETE ... WHERE id IN (...)`, with the
+               database's ON DELETE CASCADE removing ingredients
+
+Usage (from `backend/`):
+    python -m benchmarks.bulk_delete --recipes 10000 --ingredients 30
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.orm import Session, selectinload
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import crud, models  # noqa: E402
+from app.database import Base  # noqa: E402
+
+
+def make_engine(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def _foreign_keys(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def seed(engine, recipes: int, ingredients: int) -> None:
+    with engine.begin() as connection:
+        connection.execute(insert(models.Recipe.__table__), [{"id": i, "title": f"Recipe {i}"} for i in range(1, recipes + 1)])
+        rows = [
+            {"recipe_id": recipe_id, "name": f"Ingredient {n}", "amount": "1", "unit": "g"}
+            for recipe_id in range(1, recipes + 1)
+            for n in range(ingredients)
+        ]
+        connection.execute(insert(models.Ingredient.__table__), rows)
+
+
+def delete_with_orm_cascade(session: Session) -> None:
+    recipes = session.scalars(select(models.Recipe).options(selectinload(models.Recipe.ingredients))).all()
+    for recipe in recipes:
+        for ingredient in recipe.ingredients:
+            session.delete(ingredient)
+        session.delete(recipe)
+    session.commit()
+
+
+def delete_in_bulk(session: Session) -> None:
+    recipe_ids = session.scalars(select(models.Recipe.id)).all()
+    crud.delete_recipes(session, recipe_ids)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=10_000)
+    parser.add_argument("--ingredients", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{args.recipes} recipes x {args.ingredients} ingredients")
+    for name, strategy in (("orm-cascade", delete_with_orm_cascade), ("bulk", delete_in_bulk)):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = make_engine(os.path.join(tmp, "bench.db"))
+            seed(engine, args.recipes, args.ingredients)
+            with Session(engine, expire_on_commit=False) as session:
+                started = time.perf_counter()
+                strategy(session)
+                elapsed = time.perf_counter() - started
+            with engine.connect() as connection:
+                remaining = connection.execute(select(models.Ingredient.id).limit(1)).first()
+            assert remaining is None, "ingredients were left behind"
+            engine.dispose()
+        print(f"{name:<12} {elapsed:>8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
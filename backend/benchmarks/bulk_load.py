@@ -0,0 +1,87 @@
+"""
+Bulk-load and dump throughput in rows per second.
+
+Generates synthetic recipes (8 ingredients each) and inserts them three ways into fresh tables:
+one `crud.create_recipe` call per recipe (on a sample, as the API would), and
+`StorageBackend.bulk_load` in each COPY format, which on SQLite and MySQL is the same
+`executemany` fallback. Then dumps the catalog with `StorageBackend.dump`.
+
+Against a throwaway SQLite file by default; pass `--database-url postgresql+psycopg://...` to
+measure COPY (the benchmark drops and recreates the app's tables there).
+
+Usage (from `backend/`):
+    python -m benchmarks.bulk_load --recipes 50000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}")
+
+from app import crud, schemas  # noqa: E402
+from app.bulkload import storage_for  # noqa: E402
+from app.database import Base  # noqa: E402
+
+INGREDIENTS_PER_RECIPE = 8
+
+
+def synthetic_recipes(count: int):
+    for n in range(count):
+        yield schemas.RecipeCreate(
+            title=f"Recipe {n}",
+            description="A synthetic recipe.",
+            instructions="Mix everything, then bake until golden.",
+            prep_time=10,
+            cook_time=30,
+            servings=4,
+            ingredients=[
+                schemas.IngredientCreate(name=f"Ingredient {i}", amount="100", unit="g") for i in range(INGREDIENTS_PER_RECIPE)
+            ],
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ["DATABASE_URL"])
+    parser.add_argument("--recipes", type=int, default=50_000)
+    parser.add_argument("--orm-sample", type=int, default=2_000, help="Recipes inserted one by one through crud.")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    storage = storage_for(args.database_url)
+    engine = storage.get_engine()
+    rows_per_recipe = 1 + INGREDIENTS_PER_RECIPE
+    formats = ["csv", "binary"] if engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg" else ["csv"]
+    label = "COPY" if engine.dialect.name == "postgresql" else "executemany"
+
+    print(f"{engine.dialect.name}: {args.recipes} recipes x {rows_per_recipe} rows")
+    print(f"{'method':<22} {'rows':>9} {'seconds':>8} {'rows/s':>10}")
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = storage.create_session()
+    started = time.perf_counter()
+    for recipe in synthetic_recipes(args.orm_sample):
+        crud.create_recipe(session, recipe)
+    elapsed = time.perf_counter() - started
+    session.close()
+    rows = args.orm_sample * rows_per_recipe
+    print(f"{'crud.create_recipe':<22} {rows:>9} {elapsed:>8.2f} {rows / elapsed:>10.0f}")
+
+    for format in formats:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        stats = storage.bulk_load(synthetic_recipes(args.recipes), format=format, batch_size=args.batch_size)
+        print(f"{f'bulk_load {label} {format}':<22} {stats.rows:>9} {stats.seconds:>8.2f} {stats.rows_per_second:>10.0f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for format in formats:
+            stats = storage.dump(directory, format=format)
+            print(f"{f'dump {format}':<22} {stats.rows:>9} {stats.seconds:>8.2f} {stats.rows_per_second:>10.0f}")
+    storage.close()
+
+
+if __name__ == "__main__":
+    main()
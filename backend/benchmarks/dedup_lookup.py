@@ -0,0 +1,97 @@
+"""
+Cost of the near-duplicate check in `create_recipe` as the catalog grows.
+
+For each catalog size, seeds a throwaway SQLite database with synthetic recipes (rows inserted
+directly, then fingerprinted by the batch dedup job, which is timed too), and then times the
+LSH lookup `fingerprint_recipe` performs for new recipes, half of them near-copies of existing ones.
+With banding the lookup touches only colliding buckets, so it should stay flat while the
+catalog grows.
+
+Usage (from `backend/`):
+    python -m benchmarks.dedup_lookup --sizes 1000 10000 50000 --lookups 200
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import crud, models  # noqa: E402
+from app.crud.duplicate import fingerprint_recipe  # noqa: E402
+from app.database import Base  # noqa: E402
+
+WORDS = [f"word{n}" for n in range(3000)]
+INGREDIENTS = [f"ingredient {n}" for n in range(2000)]
+
+
+def synthetic_recipe(rng: random.Random):
+    return " ".join(rng.choices(WORDS, k=40)), rng.sample(INGREDIENTS, 8)
+
+
+def seed(engine, size: int, rng: random.Random):
+    recipes = [synthetic_recipe(rng) for _ in range(size)]
+    with engine.begin() as connection:
+        connection.execute(
+            insert(models.Recipe.__table__),
+            [{"id": i, "title": f"Recipe {i}", "instructions": recipe[0]} for i, recipe in enumerate(recipes, start=1)],
+        )
+        connection.execute(
+            insert(models.Ingredient.__table__),
+            [{"recipe_id": i, "name": name} for i, recipe in enumerate(recipes, start=1) for name in recipe[1]],
+        )
+    return recipes
+
+
+def run(size: int, lookups: int, rng: random.Random) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        recipes = seed(engine, size, rng)
+
+        with Session(engine) as session:
+            started = time.perf_counter()
+            crud.dedupe_recipes(session)
+            job_seconds = time.perf_counter() - started
+
+            timings = []
+            found = 0
+            for index in range(lookups):
+                if index % 2:
+                    instructions, names = synthetic_recipe(rng)
+                else:
+                    # A scraped copy: same ingredients, instructions with one extra sentence.
+                    instructions, names = rng.choice(recipes)
+                    instructions += " serve immediately"
+                recipe = models.Recipe(title="New", instructions=instructions)
+                started = time.perf_counter()
+                fingerprint_recipe(session, recipe, names)
+                timings.append((time.perf_counter() - started) * 1000)
+                found += recipe.duplicate_of_id is not None
+        engine.dispose()
+
+    print(
+        f"{size:>8} recipes   dedup job {job_seconds:6.1f} s   "
+        f"lookup p50 {statistics.median(timings):5.2f} ms   max {max(timings):5.2f} ms   "
+        f"copies flagged {found}/{lookups // 2 + lookups % 2}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    for size in args.sizes:
+        run(size, args.lookups, rng)
+
+
+if __name__ == "__main__":
+    main()
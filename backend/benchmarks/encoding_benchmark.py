@@ -0,0 +1,105 @@
+"""
+Bytes on the wire and CPU per response for each encoding of a recipe listing.
+
+Builds an in-memory listing shaped like `GET /api/recipes` (no database needed), renders it
+the way the API does, and reports the size and per-response CPU time for JSON and
+MessagePack, each uncompressed, gzip'd and brotli'd with the middleware's settings.
+
+Usage (from `backend/`):
+    python -m benchmarks.encoding_benchmark --recipes 10000
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app import schemas
+from app.api.negotiation import MsgPackResponse
+from app.middleware.compression import CompressionMiddleware
+
+UNITS = ["g", "ml", "tbsp", "tsp", "cup", None]
+
+
+def build_listing(count: int) -> List[schemas.Recipe]:
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    categories = [schemas.Category(id=i, name=f"Category {i}", description="Shared category") for i in range(1, 13)]
+    recipes = []
+    ingredient_id = 1
+    for recipe_id in range(1, count + 1):
+        ingredients = []
+        for position in range(8):
+            ingredients.append(
+                schemas.Ingredient(
+                    id=ingredient_id,
+                    recipe_id=recipe_id,
+                    name=f"Ingredient {(recipe_id * 7 + position) % 300}",
+                    amount=str(position + 1),
+                    unit=UNITS[position % len(UNITS)],
+                )
+            )
+            ingredient_id += 1
+        category = categories[recipe_id % len(categories)]
+        recipes.append(
+            schemas.Recipe(
+                id=recipe_id,
+                title=f"Recipe {recipe_id}",
+                description="A reasonably typical description for a home-cooked dish.",
+                instructions="Prepare the ingredients. Combine them. Cook until done. Serve warm.",
+                prep_time=10 + recipe_id % 30,
+                cook_time=20 + recipe_id % 60,
+                servings=2 + recipe_id % 6,
+                category_id=category.id,
+                category=category,
+                ingredients=ingredients,
+                created_at=now,
+                updated_at=now,
+            )
+        )
+    return recipes
+
+
+def cpu_ms(func, repeat: int) -> float:
+    started = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - started) * 1000 / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    listing = build_listing(args.recipes)
+    adapter = TypeAdapter(List[schemas.Recipe])
+    middleware = CompressionMiddleware(app=None)
+
+    json_body = adapter.dump_json(listing)
+    msgpack_body = MsgPackResponse(json.loads(json_body)).body
+    render = {
+        "json": lambda: adapter.dump_json(listing),
+        "msgpack": lambda: MsgPackResponse(json.loads(adapter.dump_json(listing))).body,
+    }
+    bodies = {"json": json_body, "msgpack": msgpack_body}
+
+    print(f"{args.recipes} recipes")
+    print(f"{'encoding':<16} {'bytes':>12} {'ratio':>7} {'cpu ms/resp':>12}")
+    for name, body in bodies.items():
+        render_ms = cpu_ms(render[name], args.repeat)
+        print(f"{name:<16} {len(body):>12,} {len(body) / len(json_body):>7.2f} {render_ms:>12.1f}")
+        for encoding in ("gzip", "br"):
+            compressed = middleware.compress(body, encoding)
+            compress_ms = cpu_ms(lambda: middleware.compress(body, encoding), args.repeat)
+            label = f"{name}+{encoding}"
+            print(
+                f"{label:<16} {len(compressed):>12,} {len(compressed) / len(json_body):>7.2f} "
+                f"{render_ms + compress_ms:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
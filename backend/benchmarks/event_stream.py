@@ -0,0 +1,91 @@
+"""
+Recipe change stream versus polling: bytes per change and fan-out latency.
+
+Fills a throwaway catalog, then compares what a client downloads to learn about one change:
+a re-fetch of `GET /api/recipes` (what polling costs per poll) against one SSE event frame.
+Then opens `--subscribers` streams on one event loop, publishes `--events` changes `--interval`
+seconds apart from a request thread, and reports the delay from publish to each subscriber receiving the frame.
+
+Usage (from `backend/`):
+    python -m benchmarks.event_stream --recipes 2000 --subscribers 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}")
+os.environ.setdefault("SIMILARITY_INDEX_DIR", os.path.join(_tmp.name, "similarity"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.events import RecipeEvent, RecipeEventHub  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def bytes_per_change(recipes: int) -> None:
+    with TestClient(app) as client:
+        for n in range(recipes):
+            client.post(
+                "/api/recipes",
+                json={"title": f"Recipe {n}", "description": "A synthetic recipe.", "ingredients": [{"name": f"Item {i}"} for i in range(6)]},
+            )
+        listing = len(client.get("/api/recipes", headers={"Accept-Encoding": "identity"}).content)
+        # httpx decodes brotli transparently; Content-Length is the size on the wire.
+        listing_br = int(client.get("/api/recipes", headers={"Accept-Encoding": "br"}).headers["content-length"])
+        client.put("/api/recipes/1", json={"title": "Renamed"})
+    frame = len(RecipeEvent("5f3a9c1e-1042", "updated", {"id": 1, "version": 2, "category_id": None}).frame)
+    print(f"poll GET /api/recipes ({recipes} recipes): {listing:>10,} bytes ({listing_br:,} brotli)")
+    print(f"one SSE event frame:                  {frame:>10,} bytes")
+
+
+async def fan_out(subscribers: int, events: int, interval: float) -> None:
+    hub = RecipeEventHub(max_pending=events + 1)
+    published = {}
+    latencies = []
+    streams = [hub.stream() for _ in range(subscribers)]
+    for stream in streams:
+        await stream.__anext__()
+
+    async def consume(stream) -> None:
+        for _ in range(events):
+            frame = await stream.__anext__()
+            data = json.loads(frame.rsplit(b"data: ", 1)[1])
+            latencies.append(time.perf_counter() - published[data["id"]])
+        await stream.aclose()
+
+    def publish() -> None:
+        for n in range(events):
+            published[n] = time.perf_counter()
+            hub.publish("updated", {"id": n, "version": 2, "category_id": None})
+            time.sleep(interval)
+
+    consumers = asyncio.gather(*(consume(stream) for stream in streams))
+    started = time.perf_counter()
+    await asyncio.gather(asyncio.to_thread(publish), consumers)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(
+        f"fan-out to {subscribers} streams x {events} events every {interval * 1000:.0f} ms: {len(latencies) / elapsed:,.0f} deliveries/s, "
+        f"latency p50 {statistics.median(latencies) * 1000:.2f} ms, p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=2000)
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.02, help="Seconds between published changes.")
+    args = parser.parse_args()
+
+    bytes_per_change(args.recipes)
+    asyncio.run(fan_out(args.subscribers, args.events, args.interval))
+
+
+if __name__ == "__main__":
+    main()
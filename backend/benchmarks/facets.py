@@ -0,0 +1,150 @@
+"""
+Facet counts from the in-memory columnar snapshot versus GROUP BY queries.
+
+Seeds a throwaway SQLite database with `--recipes` synthetic recipes (random category, times,
+servings and 3-18 ingredients), builds the facet snapshot, and times the same selections two
+ways: `FacetIndex.counts` and the equivalent SQL (one GROUP BY per facet, each filtered by the
+other facets' selections, over a join with per-recipe ingredient counts). Then repeats the
+snapshot timing with `--pending` recent writes held in the overlay.
+
+Usage (from `backend/`):
+    python -m benchmarks.facets --recipes 200000 --queries 50
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import and_, case, create_engine, func, insert, select, true
+from sqlalchemy.orm import Session
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import models  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.facets import BUCKETS, INGREDIENT_BOUNDS, SERVINGS_BOUNDS, TIME_BOUNDS, FacetIndex  # noqa: E402
+
+SELECTIONS = (
+    {},
+    {"category_ids": [1, 2, 3]},
+    {"category_ids": [4], "total_time": ["16-30", "31-60"]},
+    {"total_time": ["0-15"], "servings": ["3-4"], "ingredients": ["6-10", "11-15"]},
+)
+
+
+def seed(engine, recipes: int, categories: int, rng: random.Random) -> None:
+    with engine.begin() as connection:
+        connection.execute(insert(models.Category.__table__), [{"id": n, "name": f"Category {n}"} for n in range(1, categories + 1)])
+        connection.execute(
+            insert(models.Recipe.__table__),
+            [
+                {
+                    "id": i,
+                    "title": f"Recipe {i}",
+                    "category_id": rng.choice([None] + list(range(1, categories + 1))),
+                    "prep_time": rng.choice([None, 5, 10, 20, 30, 45]),
+                    "cook_time": rng.choice([None, 0, 15, 30, 60, 120, 240]),
+                    "servings": rng.choice([None, 1, 2, 4, 6, 8, 12]),
+                }
+                for i in range(1, recipes + 1)
+            ],
+        )
+        rows = [
+            {"recipe_id": recipe_id, "name": f"Item {n}"}
+            for recipe_id in range(1, recipes + 1)
+            for n in range(rng.randint(3, 18))
+        ]
+        connection.execute(insert(models.Ingredient.__table__), rows)
+
+
+def bucket_expression(column, bounds, labels):
+    return case(
+        (column.is_(None), labels[0]),
+        *((column <= bound, label) for bound, label in zip(bounds, labels[1:])),
+        else_=labels[-1],
+    )
+
+
+def sql_counts(session: Session, selection: dict) -> dict:
+    recipe = models.Recipe
+    ingredient_counts = (
+        select(models.Ingredient.recipe_id, func.count().label("count")).group_by(models.Ingredient.recipe_id).subquery()
+    )
+    total_time = case(
+        (and_(recipe.prep_time.is_(None), recipe.cook_time.is_(None)), None),
+        else_=func.coalesce(recipe.prep_time, 0) + func.coalesce(recipe.cook_time, 0),
+    )
+    expressions = {
+        "category": recipe.category_id,
+        "total_time": bucket_expression(total_time, TIME_BOUNDS, BUCKETS["total_time"]),
+        "servings": bucket_expression(recipe.servings, SERVINGS_BOUNDS, BUCKETS["servings"]),
+        "ingredients": bucket_expression(func.coalesce(ingredient_counts.c.count, 0), INGREDIENT_BOUNDS, BUCKETS["ingredients"]),
+    }
+    filters = {name: expressions[name].in_(values) for name, values in selection.items() if name != "category_ids"}
+    if "category_ids" in selection:
+        filters["category"] = recipe.category_id.in_(selection["category_ids"])
+
+    def query(*columns, skip=None):
+        conditions = [condition for name, condition in filters.items() if name != skip]
+        return (
+            select(*columns)
+            .select_from(recipe)
+            .outerjoin(ingredient_counts, ingredient_counts.c.recipe_id == recipe.id)
+            .where(and_(true(), *conditions))
+        )
+
+    result = {"total": session.execute(query(func.count())).scalar_one()}
+    for name, expression in expressions.items():
+        result[name] = session.execute(query(expression, func.count(), skip=name).group_by(expression)).all()
+    return result
+
+
+def time_calls(call, queries: int) -> str:
+    timings = []
+    for n in range(queries):
+        started = time.perf_counter()
+        call(SELECTIONS[n % len(SELECTIONS)])
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    return f"p50 {statistics.median(timings):8.2f} ms   p99 {p99:8.2f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=200_000)
+    parser.add_argument("--categories", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--pending", type=int, default=1_000)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        seed(engine, args.recipes, args.categories, rng)
+
+        index = FacetIndex()
+        with Session(engine) as session:
+            started = time.perf_counter()
+            index.rebuild(session)
+            print(f"snapshot build of {args.recipes} recipes: {time.perf_counter() - started:.2f} s")
+
+            def snapshot_counts(selection):
+                selection = dict(selection)
+                return index.counts(selection.pop("category_ids", ()), **selection)
+
+            print(f"GROUP BY queries    {time_calls(lambda selection: sql_counts(session, selection), max(1, args.queries // 5))}")
+            print(f"snapshot            {time_calls(snapshot_counts, args.queries)}")
+
+            for recipe_id in rng.sample(range(1, args.recipes + 1), args.pending):
+                # Stands in for a recipe just saved through the CRUD functions.
+                index.update(SimpleNamespace(id=recipe_id, category_id=1, prep_time=10, cook_time=10, servings=2, ingredients=[None] * 4))
+            print(f"+{args.pending} pending      {time_calls(snapshot_counts, args.queries)}")
+
+
+if __name__ == "__main__":
+    main()
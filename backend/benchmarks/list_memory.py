@@ -0,0 +1,112 @@
+"""
+Memory cost of listing recipes: ORM instances versus read-only rows.
+
+Seeds a throwaway SQLite database with synthetic recipes (8 ingredients each), then lists all of
+them with `crud.get_recipes` (ORM instances in the identity map; ingredients lazy-load when
+serialized) and with `crud.get_recipe_rows` (slotted `RecipeRow`s with `IngredientRow` tuples),
+each followed by validation into `schemas.Recipe` as the list endpoint does. Under tracemalloc it
+reports, per 10k recipes, the peak traced memory, the memory and number of blocks still held by
+the fetched results, and the wall time (tracing slows both modes alike).
+
+Usage (from `backend/`):
+    python -m benchmarks.list_memory --recipes 10000
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp.name, 'list.db')}")
+
+from app import crud, models, schemas  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+
+INGREDIENTS_PER_RECIPE = 8
+
+
+def seed(count: int) -> None:
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(models.Category.__table__), [{"id": n, "name": f"Category {n}"} for n in range(1, 21)])
+        connection.execute(
+            insert(models.Recipe.__table__),
+            [
+                {
+                    "id": n,
+                    "title": f"Recipe {n}",
+                    "description": "A synthetic recipe.",
+                    "instructions": "Mix everything, then bake until golden.",
+                    "prep_time": 10,
+                    "cook_time": 30,
+                    "servings": 4,
+                    "category_id": n % 20 + 1,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for n in range(1, count + 1)
+            ],
+        )
+        connection.execute(
+            insert(models.Ingredient.__table__),
+            [
+                {"recipe_id": n, "name": f"Ingredient {i}", "amount": "100", "unit": "g"}
+                for n in range(1, count + 1)
+                for i in range(INGREDIENTS_PER_RECIPE)
+            ],
+        )
+
+
+def measure(fetch, count: int):
+    adapter = TypeAdapter(List[schemas.Recipe])
+    db = SessionLocal()
+    # Warm the category cache and statement caches outside the measurement.
+    crud.get_recipe_rows(db, category_id=1)
+    db.expunge_all()
+    gc.collect()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    results = fetch(db)
+    adapter.validate_python(results, from_attributes=True)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    gc.collect()
+    held = tracemalloc.take_snapshot().statistics("filename")
+    tracemalloc.stop()
+    db.close()
+
+    held_bytes = sum(stat.size for stat in held)
+    held_blocks = sum(stat.count for stat in held)
+    scale = 10_000 / count
+    return peak * scale / 2**20, held_bytes * scale / 2**20, int(held_blocks * scale), elapsed * scale
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=10_000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    seed(args.recipes)
+
+    modes = {
+        "orm": lambda db: crud.get_recipes(db),
+        "rows": lambda db: crud.get_recipe_rows(db),
+    }
+    print(f"per 10k recipes ({args.recipes} listed)")
+    print(f"{'mode':<6} {'peak MiB':>9} {'held MiB':>9} {'held blocks':>12} {'seconds':>8}")
+    for mode, fetch in modes.items():
+        peak, held, blocks, elapsed = measure(fetch, args.recipes)
+        print(f"{mode:<6} {peak:>9.1f} {held:>9.1f} {blocks:>12} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
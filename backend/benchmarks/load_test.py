@@ -0,0 +1,102 @@
+"""
+Throughput of `python -m app.server` as the worker count grows.
+
+Starts the server against a throwaway SQLite database for each worker count, seeds a
+few recipes, then hammers `GET /api/recipes/{id}` from several client processes for a
+fixed duration and reports requests per second.
+
+Usage (from `backend/`):
+    python -m benchmarks.load_test --workers 1 2 4 --duration 10
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def _wait_until_up(base_url: str, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+def _client_loop(base_url: str, recipe_ids, duration: float) -> int:
+    completed = 0
+    deadline = time.monotonic() + duration
+    with httpx.Client(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            client.get(f"/api/recipes/{recipe_ids[completed % len(recipe_ids)]}").raise_for_status()
+            completed += 1
+    return completed
+
+
+def run(workers: int, clients: int, duration: float, port: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{tmp}/load.db",
+            WEB_CONCURRENCY=str(workers),
+            PORT=str(port),
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "app.server"],
+            cwd=BACKEND_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            _wait_until_up(base_url)
+            recipe_ids = [
+                httpx.post(
+                    f"{base_url}/api/recipes",
+                    json={"title": f"Recipe {i}", "ingredients": [{"name": f"Ingredient {j}"} for j in range(10)]},
+                ).json()["id"]
+                for i in range(20)
+            ]
+
+            with ProcessPoolExecutor(max_workers=clients) as pool:
+                started = time.perf_counter()
+                futures = [pool.submit(_client_loop, base_url, recipe_ids, duration) for _ in range(clients)]
+                total = sum(future.result() for future in futures)
+                elapsed = time.perf_counter() - started
+            return total / elapsed
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8}")
+    for workers in args.workers:
+        throughput = run(workers, args.clients, args.duration, args.port)
+        baseline = baseline or throughput
+        print(f"{workers:>8} {throughput:>10.1f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Latency of admitted requests under overload, with and without admission control.
+
+Fires bursts of simultaneous `GET /api/recipes/{id}` requests for distinct recipes (so request
+coalescing does not apply) at the real application, in-process through httpx's ASGI transport
+against a throwaway SQLite database, and reports the p50/p99 latency of the requests that were
+served and how many were shed with `503`.
+
+Without admission control every request is admitted and latency grows with the burst; beyond the
+pool size plus the threadpool size, sync handlers waiting for a connection starve the threads
+that would release one and requests stall until `DB_POOL_TIMEOUT`, so that mode only runs up to
+`--plain-max` concurrent requests.
+
+Usage (from `backend/`):
+    ADMISSION_QUEUE_TIMEOUT=0.5 python -m benchmarks.overload --concurrency 50 200 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp.name, 'overload.db')}")
+os.environ["REQUEST_COALESCING_TIMEOUT"] = "0"
+os.environ.setdefault("ADMISSION_QUEUE_TIMEOUT", "0.5")
+
+import httpx  # noqa: E402
+
+from app import crud, schemas  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.config.settings import settings  # noqa: E402
+from app.main import admission_limiters, app  # noqa: E402
+
+
+async def burst(recipe_ids, concurrency: int):
+    async def one(client, recipe_id):
+        started = time.perf_counter()
+        response = await client.get(f"/api/recipes/{recipe_id}")
+        return response.status_code, time.perf_counter() - started
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        return await asyncio.gather(*(one(client, recipe_ids[n % len(recipe_ids)]) for n in range(concurrency)))
+
+
+def percentile(values, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else float("nan")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--plain-max", type=int, default=50)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    recipe_ids = [
+        crud.create_recipe(
+            db,
+            schemas.RecipeCreate(
+                title=f"Recipe {n}",
+                instructions="Mix and bake.",
+                ingredients=[schemas.IngredientCreate(name=f"Ingredient {n}-{i}", amount="1") for i in range(8)],
+            ),
+        ).id
+        for n in range(500)
+    ]
+    db.close()
+
+    # "plain" lifts the app's own read limit rather than unwrapping the middleware.
+    read_limit = admission_limiters["read"].limit
+
+    print(f"read limit {read_limit}, queue {admission_limiters['read'].queue_size}, queue timeout {settings.ADMISSION_QUEUE_TIMEOUT}s")
+    print(f"{'mode':<10} {'concurrency':>11} {'served':>7} {'shed':>6} {'p50 ms':>8} {'p99 ms':>8} {'wall ms':>9}")
+    for concurrency in args.concurrency:
+        for mode in ("plain", "admission"):
+            if mode == "plain" and concurrency > args.plain_max:
+                print(f"{mode:<10} {concurrency:>11} {'skipped':>7}")
+                continue
+            admission_limiters["read"].limit = read_limit if mode == "admission" else concurrency
+            started = time.perf_counter()
+            results = asyncio.run(burst(recipe_ids, concurrency))
+            wall = time.perf_counter() - started
+            served = sorted(elapsed for status, elapsed in results if status == 200)
+            shed = sum(1 for status, _ in results if status == 503)
+            print(
+                f"{mode:<10} {concurrency:>11} {len(served):>7} {shed:>6} {statistics.median(served) * 1000:>8.1f} "
+                f"{percentile(served, 0.99) * 1000:>8.1f} {wall * 1000:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
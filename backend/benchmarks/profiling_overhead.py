@@ -0,0 +1,73 @@
+"""
+Cost of the on-demand profiling hook per request.
+
+Serves `GET /api/recipes/{id}` and `GET /api/recipes` from a throwaway catalog three ways:
+the app as is, wrapped in `ProfilingMiddleware` with requests that don't trigger it, and with
+every request profiled. The first two should be indistinguishable; the third shows what a
+profiled request costs.
+
+Usage (from `backend/`):
+    python -m benchmarks.profiling_overhead --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}")
+os.environ.setdefault("SIMILARITY_INDEX_DIR", os.path.join(_tmp.name, "similarity"))
+
+import httpx  # noqa: E402
+
+from app import crud, schemas  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.middleware import ProfilingMiddleware  # noqa: E402
+
+
+def populate(recipes: int) -> None:
+    db = SessionLocal()
+    for n in range(recipes):
+        crud.create_recipe(
+            db, schemas.RecipeCreate(title=f"Recipe {n}", ingredients=[schemas.IngredientCreate(name=f"Item {i}") for i in range(6)])
+        )
+    db.close()
+
+
+async def measure(asgi_app, url: str, requests: int, headers: dict) -> float:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url="http://bench") as client:
+        for _ in range(20):
+            await client.get(url, headers=headers)
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            await client.get(url, headers=headers)
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--recipes", type=int, default=200)
+    args = parser.parse_args()
+
+    populate(args.recipes)
+    wrapped = ProfilingMiddleware(app, admin_token="bench", directory=os.path.join(_tmp.name, "profiles"))
+    variants = (
+        ("no middleware", app, {}),
+        ("installed, untriggered", wrapped, {}),
+        ("profiled", wrapped, {"X-Profile-Token": "bench"}),
+    )
+    print(f"{'variant':<24} {'/api/recipes/1 µs':>18} {'/api/recipes µs':>16}")
+    for label, asgi_app, headers in variants:
+        single = asyncio.run(measure(asgi_app, "/api/recipes/1", args.requests, headers))
+        listing = asyncio.run(measure(asgi_app, "/api/recipes", max(1, args.requests // 10), headers))
+        print(f"{label:<24} {single:>18.0f} {listing:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Throughput of the schema.org page importer, in pages per second and pages per second per core.
+
+Writes `--pages` synthetic crawled pages into a temporary directory (the fixture pages from
+`tests/fixtures/recipe_pages`, each padded with `--page-kb` of ordinary page markup and given a
+unique title), then imports them three ways into fresh SQLite databases:
+
+- the old path: parse in one process and `POST /api/recipes` once per recipe (on the first
+  `--baseline-pages` pages only; it is slow);
+- `app.importer.import_pages` with one worker, parsing in-process;
+- `app.importer.import_pages` with `--workers` processes.
+
+Usage (from `backend/`):
+    python -m benchmarks.recipe_import --pages 5000 --workers 4
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp.name, 'baseline.db')}")
+os.environ.setdefault("SIMILARITY_INDEX_DIR", os.path.join(_tmp.name, "similarity"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.importer import find_pages, import_pages  # noqa: E402
+from app.main import app  # noqa: E402
+from app.schema_org import extract_recipes  # noqa: E402
+from app.storage import LocalStorage  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "recipe_pages"
+FILLER = "<div class=\"comment\"><p>Made this last night and it was <b>lovely</b>, thank you! &hearts;</p><a href=\"/reply\">Reply</a></div>\n"
+
+
+def write_corpus(directory: Path, pages: int, page_kb: int) -> None:
+    templates = [path for path in sorted(FIXTURES.glob("**/*.htm*")) if extract_recipes(path.read_text())]
+    padding = FILLER * (page_kb * 1024 // len(FILLER))
+    for n in range(pages):
+        template = templates[n % len(templates)].read_text()
+        # Unique titles, so every page is a distinct recipe.
+        page = template.replace("Roasted Tomato Soup", f"Roasted Tomato Soup {n}").replace("Weeknight", f"Weeknight {n}")
+        (directory / f"page-{n:06d}.html").write_text(page.replace("</body>", padding + "</body>"))
+
+
+def report(label: str, pages: int, seconds: float, cores: int) -> None:
+    print(f"{label:<32} {pages:>6} pages in {seconds:6.2f} s   {pages / seconds:8.1f} pages/s   {pages / seconds / cores:8.1f} pages/s per core")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=5000)
+    parser.add_argument("--page-kb", type=int, default=60, help="Markup added to each page, in KiB.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--baseline-pages", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    corpus = Path(_tmp.name) / "pages"
+    corpus.mkdir()
+    write_corpus(corpus, args.pages, args.page_kb)
+    print(f"{args.pages} pages of ~{args.page_kb + 2} KiB, {os.cpu_count()} CPU(s)")
+
+    paths = list(find_pages([str(corpus)]))[: args.baseline_pages]
+    with TestClient(app) as client:
+        started = time.perf_counter()
+        for path in paths:
+            for recipe, _ in extract_recipes(Path(path).read_text()):
+                client.post("/api/recipes", content=recipe.model_dump_json(), headers={"Content-Type": "application/json"})
+        report("parse + POST per recipe", len(paths), time.perf_counter() - started, 1)
+
+    for workers in sorted({1, args.workers}):
+        storage = LocalStorage(db_path=os.path.join(_tmp.name, f"import-{workers}.db"))
+        storage.initialize()
+        try:
+            stats = import_pages(storage, [str(corpus)], workers=workers, batch_size=args.batch_size, format="csv")
+        finally:
+            storage.close()
+        report(f"import_pages, {workers} worker(s)", stats.pages, stats.seconds, workers)
+
+
+if __name__ == "__main__":
+    main()
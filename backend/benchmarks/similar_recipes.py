@@ -0,0 +1,90 @@
+"""
+Latency of similar-recipe queries against a large TF-IDF snapshot.
+
+Seeds a throwaway SQLite database with `--recipes` synthetic recipes (titles and ingredient
+lists drawn from a fixed vocabulary), rebuilds the similarity index from it, and times
+`SimilarityIndex.similar` for random recipes: once against the bare memory-mapped snapshot and
+once with `--pending` recent writes held in the per-process overlay.
+
+Usage (from `backend/`):
+    python -m benchmarks.similar_recipes --recipes 100000 --queries 500
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import models  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.similarity import SimilarityIndex  # noqa: E402
+
+ADJECTIVES = ["spicy", "creamy", "roasted", "quick", "smoky", "lemon", "garlic", "herb", "crispy", "slow cooked"]
+DISHES = ["soup", "pasta", "salad", "curry", "stew", "tacos", "risotto", "pie", "stir fry", "bake", "bowl", "sandwich"]
+INGREDIENTS = [f"ingredient {n}" for n in range(2000)] + [
+    "olive oil", "salt", "black pepper", "garlic", "onion", "butter", "flour", "sugar", "eggs", "milk",
+]
+
+
+def seed(engine, recipes: int, rng: random.Random) -> None:
+    with engine.begin() as connection:
+        connection.execute(
+            insert(models.Recipe.__table__),
+            [{"id": i, "title": f"{rng.choice(ADJECTIVES)} {rng.choice(DISHES)} {i}"} for i in range(1, recipes + 1)],
+        )
+        rows = [
+            {"recipe_id": recipe_id, "name": name}
+            for recipe_id in range(1, recipes + 1)
+            for name in rng.sample(INGREDIENTS, rng.randint(5, 15))
+        ]
+        connection.execute(insert(models.Ingredient.__table__), rows)
+
+
+def time_queries(index: SimilarityIndex, recipes: int, queries: int, k: int, rng: random.Random) -> str:
+    timings = []
+    for _ in range(queries):
+        started = time.perf_counter()
+        index.similar(rng.randint(1, recipes), k)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    return f"p50 {statistics.median(timings):6.2f} ms   p99 {p99:6.2f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--pending", type=int, default=1_000)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        seed(engine, args.recipes, rng)
+
+        index = SimilarityIndex(directory=os.path.join(tmp, "index"))
+        with Session(engine) as session:
+            started = time.perf_counter()
+            index.rebuild(session)
+            print(f"rebuild of {args.recipes} recipes: {time.perf_counter() - started:.1f} s")
+        print(f"snapshot            {time_queries(index, args.recipes, args.queries, args.k, rng)}")
+
+        for recipe_id in rng.sample(range(1, args.recipes + 1), args.pending):
+            recipe = models.Recipe(id=recipe_id, title=f"{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}")
+            recipe.ingredients = [models.Ingredient(name=name) for name in rng.sample(INGREDIENTS, 10)]
+            index.update(recipe)
+        print(f"+{args.pending} pending      {time_queries(index, args.recipes, args.queries, args.k, rng)}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Mixed read/write throughput of LocalStorage, default versus tuned mode.
+
+Each thread loops for a fixed duration doing `--write-ratio` writes (create a recipe with
+ingredients) and reads (fetch a recipe with its ingredients). Default mode uses plain
+sessions for both; tuned mode reads through the read-only pool and writes through the
+group-committing writer queue. Reports operations per second and failed operations
+(typically `database is locked`).
+
+Usage (from `backend/`):
+    python -m benchmarks.sqlite_mixed_load --threads 16 --duration 10 --write-ratio 0.2
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from app import crud, schemas  # noqa: E402
+from app.storage import LocalStorage  # noqa: E402
+
+
+def new_recipe(index: int) -> schemas.RecipeCreate:
+    return schemas.RecipeCreate(
+        title=f"Recipe {index}",
+        instructions="Mix and bake.",
+        prep_time=10,
+        cook_time=20,
+        ingredients=[schemas.IngredientCreate(name=f"Ingredient {n}", amount="1", unit="cup") for n in range(8)],
+    )
+
+
+def write(storage: LocalStorage, index: int) -> None:
+    if storage.tuned:
+        storage.submit_write(lambda session: crud.create_recipe(session, new_recipe(index)).id).result()
+        return
+    session = storage.create_session()
+    try:
+        crud.create_recipe(session, new_recipe(index))
+    finally:
+        session.close()
+
+
+def read(storage: LocalStorage, recipe_id: int) -> None:
+    session = storage.create_read_session()
+    try:
+        recipe = crud.get_recipe(session, recipe_id)
+        if recipe is not None:
+            len(recipe.ingredients)
+    finally:
+        session.close()
+
+
+def run(tuned: bool, threads: int, duration: float, write_ratio: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = LocalStorage(db_path=os.path.join(tmp, "bench.db"), tuned=tuned)
+        storage.initialize()
+        for index in range(200):
+            write(storage, index)
+
+        counts = {"ok": 0, "failed": 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+
+        def worker(seed: int) -> None:
+            rng = random.Random(seed)
+            ok = failed = 0
+            while time.monotonic() < deadline:
+                try:
+                    if rng.random() < write_ratio:
+                        write(storage, rng.randrange(1_000_000))
+                    else:
+                        read(storage, rng.randrange(1, 200))
+                    ok += 1
+                except OperationalError:
+                    failed += 1
+            with lock:
+                counts["ok"] += ok
+                counts["failed"] += failed
+
+        workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        storage.close()
+
+    mode = "tuned" if tuned else "default"
+    print(f"{mode:<8} {counts['ok'] / elapsed:>10.1f} ops/s {counts['failed']:>8} failed")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    for tuned in (False, True):
+        run(tuned, args.threads, args.duration, args.write_ratio)
+
+
+if __name__ == "__main__":
+    main()
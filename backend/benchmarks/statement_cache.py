@@ -0,0 +1,99 @@
+"""
+Per-call overhead of the CRUD hot-path lookups: legacy `Query` objects versus prebuilt statements.
+
+Against an in-memory SQLite database (so the database itself costs next to nothing), times
+`get_recipe`, `get_category`, `get_category_by_name` and `get_ingredients_for_recipe` as they
+were written before (a `db.query(...).filter(...)` rebuilt, and its cache key regenerated, on
+every call) and as `app.crud` implements them now (module-level `select()` with bound
+parameters). `--no-cache` also runs both with the compiled-statement cache disabled, to show
+what compilation itself would cost.
+
+Usage (from `backend/`):
+    python -m benchmarks.statement_cache --calls 20000
+"""
+import argparse
+import os
+import statistics
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import crud, models, schemas  # noqa: E402
+from app.cache import category_cache  # noqa: E402
+from app.config.settings import settings  # noqa: E402
+from app.database import Base  # noqa: E402
+
+
+def legacy_get_recipe(db: Session, recipe_id: int):
+    recipe = db.query(models.Recipe).filter(models.Recipe.id == recipe_id).first()
+    if recipe is not None:
+        category_cache.attach_to_recipes(db, [recipe])
+    return recipe
+
+
+def legacy_lookups(db: Session, recipe_id: int, category_id: int, name: str):
+    return {
+        "get_recipe": lambda: legacy_get_recipe(db, recipe_id),
+        "get_category": lambda: db.query(models.Category).filter(models.Category.id == category_id).first(),
+        "get_category_by_name": lambda: db.query(models.Category).filter(models.Category.name == name).first(),
+        "get_ingredients_for_recipe": lambda: db.query(models.Ingredient)
+        .filter(models.Ingredient.recipe_id == recipe_id)
+        .order_by(models.Ingredient.id)
+        .all(),
+    }
+
+
+def cached_lookups(db: Session, recipe_id: int, category_id: int, name: str):
+    return {
+        "get_recipe": lambda: crud.get_recipe(db, recipe_id),
+        "get_category": lambda: crud.get_category(db, category_id),
+        "get_category_by_name": lambda: crud.get_category_by_name(db, name),
+        "get_ingredients_for_recipe": lambda: crud.get_ingredients_for_recipe(db, recipe_id),
+    }
+
+
+def per_call_us(lookup, calls: int, repeats: int = 5) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(calls):
+            lookup()
+        timings.append((time.perf_counter() - started) / calls * 1e6)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--no-cache", action="store_true", help="also run with query_cache_size=0")
+    args = parser.parse_args()
+
+    cache_sizes = [settings.DB_QUERY_CACHE_SIZE] + ([0] if args.no_cache else [])
+    print(f"{'lookup':<28} {'cache':>6} {'legacy us':>10} {'cached us':>10} {'speedup':>8}")
+    for cache_size in cache_sizes:
+        engine = create_engine("sqlite://", poolclass=StaticPool, query_cache_size=cache_size)
+        Base.metadata.create_all(engine)
+        with Session(engine, autoflush=False, expire_on_commit=False) as db:
+            category = crud.create_category(db, schemas.CategoryCreate(name="Soups"))
+            recipe = crud.create_recipe(
+                db,
+                schemas.RecipeCreate(
+                    title="Minestrone",
+                    category_id=category.id,
+                    ingredients=[schemas.IngredientCreate(name=f"Vegetable {n}", amount="1") for n in range(8)],
+                ),
+            )
+            before = legacy_lookups(db, recipe.id, category.id, category.name)
+            after = cached_lookups(db, recipe.id, category.id, category.name)
+            for name in before:
+                legacy, cached = per_call_us(before[name], args.calls), per_call_us(after[name], args.calls)
+                print(f"{name:<28} {cache_size:>6} {legacy:>10.1f} {cached:>10.1f} {legacy / cached:>7.2f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
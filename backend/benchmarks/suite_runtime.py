@@ -0,0 +1,102 @@
+"""
+Runtime of the backend test suite, tracked across commits.
+
+Runs `python -m pytest` in a subprocess `--repeat` times for each database setup:
+
+- `in-memory`: the default shared-cache in-memory SQLite database;
+- `file`: a file-backed SQLite database (`TEST_DATABASE_URL=sqlite:///<tmp>/suite.db`);
+
+serially and, when pytest-xdist is installed, with `-n <workers>` for each `--workers` value.
+Reports the median wall-clock time (interpreter start, collection and all), the time pytest
+itself reports, and how much of it went to fixture setup and teardown rather than test bodies.
+With `--history`, appends one JSON line per configuration (date, commit, medians) so runtime can
+be compared over time.
+
+Usage (from `backend/`):
+    python -m benchmarks.suite_runtime --repeat 3 --workers 2 4 --history suite-runtime.jsonl
+"""
+import argparse
+import importlib.util
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BACKEND = Path(__file__).resolve().parent.parent
+SUMMARY = re.compile(r"(\d+) passed.* in ([\d.]+)s")
+DURATION = re.compile(r"^([\d.]+)s (setup|call|teardown) ", re.MULTILINE)
+
+
+def run_suite(database_url: Optional[str], workers: int) -> Dict[str, float]:
+    env = dict(os.environ)
+    env.pop("TEST_DATABASE_URL", None)
+    if database_url:
+        env["TEST_DATABASE_URL"] = database_url
+    command = [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", "--durations=0", "--durations-min=0"]
+    if workers:
+        command += ["-n", str(workers)]
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=BACKEND, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    summary = SUMMARY.search(result.stdout)
+    if result.returncode != 0 or summary is None:
+        sys.exit(f"test suite failed:\n{result.stdout[-2000:]}{result.stderr[-2000:]}")
+    phases = {"setup": 0.0, "call": 0.0, "teardown": 0.0}
+    for seconds, phase in DURATION.findall(result.stdout):
+        phases[phase] += float(seconds)
+    return {
+        "tests": int(summary.group(1)),
+        "wall": wall,
+        "pytest": float(summary.group(2)),
+        "fixtures": phases["setup"] + phases["teardown"],
+    }
+
+
+def commit() -> str:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND, capture_output=True, text=True)
+    return result.stdout.strip() or "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="*", default=[os.cpu_count() or 1], help="xdist worker counts to try.")
+    parser.add_argument("--history", help="JSON-lines file to append the results to.")
+    args = parser.parse_args()
+
+    worker_counts = [0]
+    if importlib.util.find_spec("xdist") is not None:
+        worker_counts += sorted(set(args.workers))
+    else:
+        print("pytest-xdist is not installed; timing serial runs only")
+
+    records: List[dict] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        databases = {"in-memory": None, "file": f"sqlite:///{os.path.join(tmp, 'suite.db')}"}
+        for database, url in databases.items():
+            for workers in worker_counts:
+                runs = [run_suite(url, workers) for _ in range(args.repeat)]
+                record = {"database": database, "workers": workers, "tests": runs[0]["tests"]}
+                record.update({key: round(statistics.median(run[key] for run in runs), 3) for key in ("wall", "pytest", "fixtures")})
+                records.append(record)
+                print(
+                    f"{database:<10} {'serial' if not workers else f'-n {workers}':<7} {record['tests']:>4} tests   "
+                    f"wall {record['wall']:6.2f} s   pytest {record['pytest']:6.2f} s   fixtures {record['fixtures']:6.2f} s"
+                )
+
+    if args.history:
+        stamp = {"date": datetime.now(timezone.utc).isoformat(timespec="seconds"), "commit": commit(), "cpus": os.cpu_count()}
+        with open(args.history, "a") as history:
+            for record in records:
+                history.write(json.dumps({**stamp, **record}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Database load of a thundering herd on one recipe, with and without request coalescing.
+
+For each concurrency level, fires that many simultaneous `GET /api/recipes/{id}` requests for
+the same recipe at the real application (in-process, through httpx's ASGI transport, against a
+throwaway SQLite database) and counts the SQL statements executed. Without coalescing the count
+grows with concurrency; with it, it stays flat.
+
+The uncoalesced mode is only run up to `--plain-max` concurrent requests: beyond the pool size
+plus the threadpool size, sync handlers waiting for a connection starve the threads that would
+release one, and requests stall until `DB_POOL_TIMEOUT`.
+
+Usage (from `backend/`):
+    python -m benchmarks.thundering_herd --concurrency 1 10 50 100 200
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp.name, 'herd.db')}")
+# The benchmark wraps the app itself so both modes run against the same process.
+os.environ["REQUEST_COALESCING_TIMEOUT"] = "0"
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app import crud, schemas  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.main import COALESCED_ROUTES, app  # noqa: E402
+from app.middleware import CoalescingMiddleware, CoalescingStats  # noqa: E402
+
+
+async def herd(asgi_app, recipe_id: int, concurrency: int) -> float:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.get(f"/api/recipes/{recipe_id}") for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    assert all(response.status_code == 200 for response in responses)
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100, 200])
+    parser.add_argument("--plain-max", type=int, default=50)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    recipe = crud.create_recipe(
+        db,
+        schemas.RecipeCreate(
+            title="Viral Lasagne",
+            instructions="Layer, bake, rest.",
+            ingredients=[schemas.IngredientCreate(name=f"Ingredient {n}", amount="1") for n in range(12)],
+        ),
+    )
+    db.close()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+
+    print(f"{'mode':<10} {'concurrency':>11} {'SQL statements':>15} {'wall ms':>9} {'ratio':>6}")
+    for concurrency in args.concurrency:
+        for mode in ("plain", "coalesced"):
+            if mode == "plain" and concurrency > args.plain_max:
+                print(f"{mode:<10} {concurrency:>11} {'skipped':>15}")
+                continue
+            stats = CoalescingStats()
+            routes = {route: 5.0 for route in COALESCED_ROUTES}
+            asgi_app = app if mode == "plain" else CoalescingMiddleware(app, routes=routes, stats=stats)
+            statements.clear()
+            elapsed = asyncio.run(herd(asgi_app, recipe.id, concurrency))
+            print(f"{mode:<10} {concurrency:>11} {len(statements):>15} {elapsed * 1000:>9.1f} {stats.ratio:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Cost of counting recipe views: a write per view versus the write-behind buffer.
+
+Replays skewed (Zipf-like) views of a throwaway SQLite catalog. "direct" commits one upsert of
+`recipe_stats` per view, as counting inside the request would; "buffered" increments the
+in-process `ViewCounter` and flushes it every `--flush-every` views with `crud.add_recipe_views`.
+Reports per-view cost and the number of write transactions.
+
+Usage (from `backend/`):
+    python -m benchmarks.view_counts --recipes 1000 --views 20000 --flush-every 5000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import insert
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp.name, 'views.db')}")
+
+from app import crud, models  # noqa: E402
+from app.counters import ViewCounter  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=1000)
+    parser.add_argument("--views", type=int, default=20000)
+    parser.add_argument("--flush-every", type=int, default=5000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(insert(models.Recipe.__table__), [{"id": n, "title": f"Recipe {n}"} for n in range(1, args.recipes + 1)])
+    rng = random.Random(7)
+    weights = [1 / rank for rank in range(1, args.recipes + 1)]
+    views = rng.choices(range(1, args.recipes + 1), weights=weights, k=args.views)
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    for recipe_id in views:
+        crud.add_recipe_views(db, {recipe_id: 1})
+    direct = time.perf_counter() - started
+
+    counter = ViewCounter()
+    flushes = 0
+    started = time.perf_counter()
+    for n, recipe_id in enumerate(views, start=1):
+        counter.increment(recipe_id)
+        if n % args.flush_every == 0:
+            counter.flush(db)
+            flushes += 1
+    if counter.pending():
+        counter.flush(db)
+        flushes += 1
+    buffered = time.perf_counter() - started
+    db.close()
+
+    print(f"{'mode':<9} {'views':>7} {'transactions':>13} {'us/view':>9}")
+    print(f"{'direct':<9} {args.views:>7} {args.views:>13} {direct / args.views * 1e6:>9.1f}")
+    print(f"{'buffered':<9} {args.views:>7} {flushes:>13} {buffered / args.views * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
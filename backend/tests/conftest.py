@@ -1,18 +1,105 @@
 import os
-from typing import Generator
+import re
+import tempfile
+import warnings
+from typing import Generator, List
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import SADeprecationWarning
+from sqlalchemy.pool import StaticPool
 
-# Ensure the application uses an isolated database for testing only.
-TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "sqlite:///./test.db")
+# Each pytest-xdist worker gets a database of its own; a plain run is worker "main".
+XDIST_WORKER = os.getenv("PYTEST_XDIST_WORKER", "main")
+
+
+def is_sqlite_memory(database_url: str) -> bool:
+    """Whether `database_url` names an in-memory SQLite database (private, or shared-cache `mode=memory`)."""
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite":
+        return False
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+
+def worker_database_url(url: str) -> str:
+    """`url` with the xdist worker id appended to its database name, so parallel workers never share one."""
+    if XDIST_WORKER == "main":
+        return url
+    parsed = make_url(url)
+    database = parsed.database or ""
+    if parsed.get_backend_name() == "sqlite":
+        root, extension = os.path.splitext(database)
+        return parsed.set(database=f"{root}-{XDIST_WORKER}{extension}").render_as_string(hide_password=False)
+    # Server databases are not created here; make `<name>_gw0`, `<name>_gw1`, ... up front.
+    return parsed.set(database=f"{database}_{XDIST_WORKER}").render_as_string(hide_password=False)
+
+
+# Ensure the application uses an isolated database for testing only. By default that is a
+# shared-cache in-memory SQLite database, named per worker.
+TEST_DATABASE_URL = worker_database_url(
+    os.getenv("TEST_DATABASE_URL", f"sqlite:///file:recipe-tests-{XDIST_WORKER}?mode=memory&cache=shared&uri=true")
+)
 os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+# Tests rebuild the similarity index explicitly, into a throwaway directory.
+os.environ["SIMILARITY_INDEX_DIR"] = tempfile.mkdtemp(prefix="similarity-index-")
+os.environ["SIMILARITY_REBUILD_INTERVAL"] = "0"
+os.environ["FACET_REBUILD_INTERVAL"] = "0"
+# The app probes the database once at startup; tests drive the health monitor explicitly.
+os.environ["HEALTH_CHECK_INTERVAL"] = "0"
+
+with warnings.catch_warnings():
+    # The engine built from settings is replaced below; SQLAlchemy warns about its implicit pool choice.
+    warnings.filterwarnings("ignore", category=SADeprecationWarning)
+    import app.database as database  # noqa: E402
+
+if is_sqlite_memory(TEST_DATABASE_URL):
+    # An in-memory database lives only as long as its connection: share exactly one between every
+    # thread. Swapped in before any other app module imports the engine.
+    database.engine = create_engine(
+        TEST_DATABASE_URL,
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+        **database.engine_options(TEST_DATABASE_URL),
+    )
+    database.SessionLocal.configure(bind=database.engine)
 
-from app.database import Base, engine, get_db  # noqa: E402
-from app.main import app  # noqa: E402
+from app.cache import category_cache  # noqa: E402
+from app.counters import view_counter  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
 
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if engine.dialect.name == "sqlite":
+    # pysqlite only emits BEGIN lazily before DML, which breaks SAVEPOINTs inside the per-test
+    # transaction. Take transaction control away from the driver and begin explicitly instead.
+    # Registered before app.main connects for the first time.
+
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_sqlite_transaction(connection):
+        connection.exec_driver_sql("BEGIN")
+
+
+from app.events import recipe_events  # noqa: E402
+from app.facets import facet_index  # noqa: E402
+from app.main import app, health_monitor  # noqa: E402
+from app.similarity import similarity_index  # noqa: E402
+
+SAVEPOINT_STATEMENT = re.compile(r"(RELEASE |ROLLBACK TO )?SAVEPOINT ", re.IGNORECASE)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    # Also runs in the xdist controller, which imported the app (and so created the file) but ran no tests.
+    engine.dispose()
+    url = make_url(TEST_DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and not is_sqlite_memory(TEST_DATABASE_URL):
+        try:
+            os.remove(url.database)
+        except OSError:
+            pass
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -20,26 +107,37 @@ def setup_database():
     Base.metadata.create_all(bind=engine)
     yield
     Base.metadata.drop_all(bind=engine)
-    if TEST_DATABASE_URL.startswith("sqlite:///"):
-        db_path = TEST_DATABASE_URL.replace("sqlite:///", "")
-        if db_path and os.path.exists(db_path):
-            try:
-                os.remove(db_path)
-            except OSError:
-                pass
 
 
 @pytest.fixture(autouse=True)
-def clean_database():
-    yield
-    with engine.begin() as connection:
-        for table in reversed(Base.metadata.sorted_tables):
-            connection.execute(table.delete())
+def connection() -> Generator:
+    """
+    Run the test inside one outer transaction that is rolled back afterwards.
+
+    Every session the app and the tests open is bound to this connection, and `commit()` only
+    releases a SAVEPOINT, so nothing a test writes outlives it and no table needs emptying.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    SessionLocal.configure(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        yield connection
+    finally:
+        SessionLocal.configure(bind=engine, join_transaction_mode="conservative_savepoint")
+        transaction.rollback()
+        connection.close()
+        # The rollback happened behind the ORM's back, so the write-side invalidation never ran.
+        category_cache.invalidate()
+        similarity_index.reset()
+        facet_index.reset()
+        view_counter.reset()
+        recipe_events.reset()
+        health_monitor.reset()
 
 
 @pytest.fixture()
 def db_session() -> Generator:
-    session = TestingSessionLocal()
+    session = SessionLocal()
     try:
         yield session
     finally:
@@ -47,17 +145,38 @@ def db_session() -> Generator:
 
 
 @pytest.fixture()
-def client() -> Generator[TestClient, None, None]:
-    def override_get_db():
-        db = TestingSessionLocal()
-        try:
-            yield db
-        finally:
-            db.close()
+def file_engine(tmp_path) -> Generator[Engine, None, None]:
+    """
+    A separate file-backed SQLite database with the schema created, outside the per-test transaction.
+
+    For tests that need real commits seen across several connections, e.g. concurrent writers.
+    """
+    file_engine = create_engine(f"sqlite:///{tmp_path / 'committed.db'}")
+    Base.metadata.create_all(bind=file_engine)
+    yield file_engine
+    file_engine.dispose()
+
 
-    app.dependency_overrides[get_db] = override_get_db
+@pytest.fixture()
+def captured_statements() -> Generator[List[str], None, None]:
+    """
+    Record the SQL text of every statement sent to the test engine while the fixture is active.
+
+    Leaves out the SAVEPOINTs that stand in for transactions inside the per-test transaction.
+    """
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not SAVEPOINT_STATEMENT.match(statement):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
 
+
+@pytest.fixture()
+def client() -> Generator[TestClient, None, None]:
+    # Request sessions come from `get_db`, and so from the per-test transaction's SessionLocal.
     with TestClient(app) as test_client:
         yield test_client
-
-    app.dependency_overrides.clear()
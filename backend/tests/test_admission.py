@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.middleware import AdmissionControlMiddleware, Limiter, limits_from_pool
+
+
+def make_app(limits, queue_size, queue_timeout, delay):
+    async def handler(request):
+        await asyncio.sleep(delay)
+        return JSONResponse({"ok": True})
+
+    inner = Starlette(routes=[Route("/items", handler, methods=["GET", "POST"]), Route("/export", handler), Route("/health", handler)])
+    limiters = {route_class: Limiter(limit, queue_size) for route_class, limit in limits.items()}
+    app = AdmissionControlMiddleware(
+        inner,
+        limiters=limiters,
+        queue_timeout=queue_timeout,
+        retry_after=3,
+        bulk_routes=[("GET", "/export")],
+        exempt_prefixes=["/health"],
+    )
+    return app, limiters
+
+
+async def timed_requests(app, requests):
+    async def one(client, method, url):
+        started = time.perf_counter()
+        response = await client.request(method, url)
+        return response, time.perf_counter() - started
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await asyncio.gather(*(one(client, method, url) for method, url in requests))
+
+
+def test_limits_split_the_pool_unless_overridden():
+    assert limits_from_pool(20, {}) == {"read": 12, "write": 6, "bulk": 2}
+    assert limits_from_pool(20, {"bulk": 5, "read": 0}) == {"read": 12, "write": 6, "bulk": 5}
+    assert limits_from_pool(None, {}, fallback=10) == {"read": 6, "write": 3, "bulk": 1}
+    assert limits_from_pool(2, {})["bulk"] == 1
+
+
+def test_overload_is_shed_while_admitted_requests_are_still_running():
+    limit, queue_size, requests = 4, 8, 300
+
+    async def run():
+        release = asyncio.Event()
+        served = []
+
+        async def handler(request):
+            served.append(request.url.path)
+            await release.wait()
+            return JSONResponse({"ok": True})
+
+        limiters = {route_class: Limiter(limit, queue_size) for route_class in ("read", "write", "bulk")}
+        app = AdmissionControlMiddleware(
+            Starlette(routes=[Route("/items", handler)]), limiters=limiters, queue_timeout=30, retry_after=3
+        )
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            pending = [asyncio.create_task(client.get("/items")) for _ in range(requests)]
+
+            async def shed():
+                while sum(task.done() for task in pending) < requests - limit - queue_size:
+                    await asyncio.sleep(0)
+
+            # Everything beyond the running and queued requests is answered before any of them finishes.
+            await asyncio.wait_for(shed(), timeout=10)
+            during = limiters["read"].snapshot()
+            rejected = [task.result() for task in pending if task.done()]
+            release.set()
+            responses = await asyncio.gather(*pending)
+        return during, rejected, responses, limiters["read"].snapshot(), served
+
+    during, rejected, responses, after, served = asyncio.run(run())
+
+    assert (during["active"], during["waiting"], during["rejected"]) == (limit, queue_size, requests - limit - queue_size)
+    assert all(response.status_code == 503 and response.headers["retry-after"] == "3" for response in rejected)
+    # The queued requests were handed the slots in turn once the running ones finished.
+    assert [response.status_code for response in responses].count(200) == len(served) == limit + queue_size
+    assert (after["active"], after["waiting"], after["admitted"]) == (0, 0, limit + queue_size)
+
+
+def test_route_classes_and_exempt_paths_have_independent_budgets():
+    app, limiters = make_app({"read": 2, "write": 2, "bulk": 1}, queue_size=0, queue_timeout=0.1, delay=0.05)
+
+    results = asyncio.run(
+        timed_requests(app, [("GET", "/export")] * 3 + [("POST", "/items")] * 2 + [("GET", "/items")] * 2 + [("GET", "/health")] * 5)
+    )
+
+    statuses = [response.status_code for response, _ in results]
+    # Only one bulk export fits; the saturated bulk class does not block writes, reads or health checks.
+    assert statuses[:3].count(200) == 1
+    assert statuses[3:] == [200] * 9
+    assert limiters["bulk"].rejected == 2
@@ -1,4 +1,14 @@
+import asyncio
+
+import httpx
+import msgpack
 from fastapi import status
+from sqlalchemy import delete
+
+from app import models
+from app.counters import view_counter
+from app.main import BULK_ROUTES, app, coalescing_stats
+from app.middleware.admission import classify
 
 
 def create_category(client, name="Main Dishes", description="Savory"):
@@ -13,6 +23,28 @@ def test_health_endpoint(client):
     assert response.json() == {"status": "ok"}
 
 
+def test_metrics_report_request_coalescing(client):
+    client.get("/api/recipes")
+    coalescing = client.get("/metrics").json()["coalescing"]
+    assert coalescing["requests"] >= 1
+    assert set(coalescing) == {"requests", "coalesced", "timeouts", "ratio"}
+
+
+def test_recipe_list_is_admitted_as_an_interactive_read():
+    # The bulk class may only get a slot or two; the app's main listing must not queue behind it.
+    assert classify("GET", "/api/recipes", BULK_ROUTES) == "read"
+    assert classify("GET", "/api/recipes/batch", BULK_ROUTES) == classify("DELETE", "/api/recipes", BULK_ROUTES) == "bulk"
+
+
+def test_metrics_report_admission_and_pool(client):
+    client.get("/api/recipes/1")
+    body = client.get("/metrics").json()
+    assert set(body["admission"]) == {"read", "write", "bulk"}
+    assert body["admission"]["read"]["admitted"] >= 1
+    assert body["admission"]["read"]["active"] == 0
+    assert set(body["pool"]) == {"capacity", "size", "checked_out", "overflow"}
+
+
 def test_create_and_get_recipe_via_api(client):
     category = create_category(client)
     payload = {
@@ -84,3 +116,197 @@ def test_update_and_delete_recipe(client):
 
     missing_response = client.get(f"/api/recipes/{recipe['id']}")
     assert missing_response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_batch_get_recipes_preserves_order_and_reports_missing(client):
+    first = client.post("/api/recipes", json={"title": "Pancakes", "ingredients": [{"name": "Flour"}]}).json()
+    second = client.post("/api/recipes", json={"title": "Waffles", "ingredients": [{"name": "Eggs"}]}).json()
+
+    response = client.get("/api/recipes/batch", params={"ids": [second["id"], 9999, first["id"], second["id"]]})
+    assert response.status_code == status.HTTP_200_OK
+
+    batch = response.json()
+    assert [recipe["title"] for recipe in batch["recipes"]] == ["Waffles", "Pancakes"]
+    assert batch["recipes"][0]["ingredients"][0]["name"] == "Eggs"
+    assert batch["missing"] == [9999]
+
+
+def test_batch_get_recipes_rejects_oversized_requests(client):
+    response = client.get("/api/recipes/batch", params={"ids": list(range(1, 102))})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_list_categories_includes_recipe_counts(client):
+    dessert = create_category(client, name="Dessert")
+    create_category(client, name="Empty")
+    client.post("/api/recipes", json={"title": "Pie", "prep_time": 20, "cook_time": 40, "category_id": dessert["id"]})
+    client.post("/api/recipes", json={"title": "Tart", "prep_time": 30, "category_id": dessert["id"]})
+
+    response = client.get("/api/categories")
+    assert response.status_code == status.HTTP_200_OK
+
+    categories = {category["name"]: category for category in response.json()}
+    assert categories["Dessert"]["recipe_count"] == 2
+    assert categories["Dessert"]["avg_prep_time"] == 25
+    assert categories["Dessert"]["avg_cook_time"] == 40
+    assert categories["Empty"]["recipe_count"] == 0
+    assert categories["Empty"]["avg_prep_time"] is None
+
+
+def test_large_responses_are_compressed_when_accepted(client):
+    for index in range(30):
+        client.post("/api/recipes", json={"title": f"Recipe {index}", "ingredients": [{"name": "Salt", "amount": "1 tsp"}]})
+
+    for encoding in ("br", "gzip"):
+        response = client.get("/api/recipes", headers={"Accept-Encoding": encoding})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-encoding"] == encoding
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert len(response.json()) == 30
+
+    small_response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small_response.headers
+    # Uncompressed representations still vary on the header, or a cache would serve them to everyone.
+    assert "Accept-Encoding" in small_response.headers["vary"]
+    identity = client.get("/api/recipes", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers and "Accept-Encoding" in identity.headers["vary"]
+
+
+def test_recipes_can_be_requested_as_msgpack(client):
+    category = create_category(client, name="Breakfast")
+    client.post("/api/recipes", json={"title": "Porridge", "category_id": category["id"], "ingredients": [{"name": "Oats"}]})
+
+    response = client.get("/api/recipes", headers={"Accept": "application/msgpack"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/msgpack"
+    assert "Accept" in response.headers["vary"]
+
+    recipes = msgpack.unpackb(response.content)
+    assert recipes[0]["title"] == "Porridge"
+    assert recipes[0]["category"]["name"] == "Breakfast"
+    assert recipes[0]["ingredients"][0]["name"] == "Oats"
+
+    json_response = client.get("/api/categories", headers={"Accept": "application/json, application/msgpack;q=0.5"})
+    assert json_response.headers["content-type"] == "application/json"
+
+
+def test_update_recipe_honours_if_match(client):
+    recipe = client.post("/api/recipes", json={"title": "Risotto"}).json()
+    etag = client.get(f"/api/recipes/{recipe['id']}").headers["etag"]
+    assert etag == '"1"'
+
+    first = client.put(f"/api/recipes/{recipe['id']}", json={"servings": 2}, headers={"If-Match": etag})
+    assert first.status_code == status.HTTP_200_OK
+    assert first.headers["etag"] == '"2"'
+    assert first.json()["version"] == 2
+
+    stale = client.put(f"/api/recipes/{recipe['id']}", json={"servings": 6}, headers={"If-Match": etag})
+    assert stale.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert client.get(f"/api/recipes/{recipe['id']}").json()["servings"] == 2
+
+
+def test_create_category_rejects_duplicate_names(client):
+    create_category(client, name="Drinks")
+    response = client.post("/api/categories", json={"name": "Drinks"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_create_recipe_with_unknown_category_is_rejected(client):
+    response = client.post("/api/recipes", json={"title": "Mystery", "category_id": 12345})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_category_deleted_by_another_worker_is_reported_as_missing(client, db_session):
+    category = create_category(client, name="Soon Gone")
+    recipe = client.post("/api/recipes", json={"title": "Soup", "category_id": category["id"]}).json()
+    # Deleted behind this process's category cache, as another worker would.
+    db_session.execute(delete(models.Category).where(models.Category.id == category["id"]))
+    db_session.commit()
+
+    created = client.post("/api/recipes", json={"title": "Stew", "category_id": category["id"]})
+    updated = client.put(f"/api/recipes/{recipe['id']}", json={"category_id": category["id"]})
+
+    assert created.status_code == updated.status_code == status.HTTP_404_NOT_FOUND
+    assert created.json()["detail"] == "Category not found"
+
+
+def test_bulk_delete_recipes(client):
+    ids = [client.post("/api/recipes", json={"title": f"Dish {index}"}).json()["id"] for index in range(3)]
+
+    response = client.request("DELETE", "/api/recipes", json={"ids": [ids[0], ids[2], 4242]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"deleted": [ids[0], ids[2]], "missing": [4242]}
+
+    remaining = client.get("/api/recipes").json()
+    assert [recipe["id"] for recipe in remaining] == [ids[1]]
+
+
+def test_similar_recipes_rank_by_shared_ingredients(client):
+    def create(title, ingredients):
+        payload = {"title": title, "ingredients": [{"name": name} for name in ingredients]}
+        return client.post("/api/recipes", json=payload).json()["id"]
+
+    soup = create("Tomato Soup", ["Tomatoes", "Basil", "Garlic"])
+    pasta = create("Tomato Pasta", ["Tomatoes", "Basil", "Spaghetti"])
+    create("Chocolate Cake", ["Flour", "Sugar", "Cocoa powder"])
+
+    response = client.get(f"/api/recipes/{soup}/similar", params={"k": 5})
+    assert response.status_code == status.HTTP_200_OK
+    similar = response.json()
+    # Unrelated recipes score zero and are left out; the recipe itself never appears.
+    assert [item["recipe"]["id"] for item in similar] == [pasta]
+    assert 0 < similar[0]["score"] <= 1
+    assert similar[0]["recipe"]["ingredients"]
+
+    assert client.get("/api/recipes/4242/similar").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_duplicates_endpoint_lists_near_copies(client):
+    payload = {
+        "title": "Guacamole",
+        "instructions": "Mash the avocados with lime juice, then fold in onion, tomato, coriander and salt.",
+        "ingredients": [{"name": name} for name in ("Avocados", "Lime", "Onion", "Tomato", "Coriander", "Salt")],
+    }
+    original = client.post("/api/recipes", json=payload).json()
+    copy = client.post("/api/recipes", json={**payload, "title": "Easy Guacamole"}).json()
+    assert copy["duplicate_of_id"] == original["id"]
+
+    response = client.get(f"/api/recipes/{original['id']}/duplicates")
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["recipe"]["id"] for item in response.json()] == [copy["id"]]
+    assert response.json()[0]["score"] == 1.0
+
+    assert client.get("/api/recipes/4242/duplicates").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_concurrent_views_of_one_recipe_are_all_counted(client):
+    recipe_id = client.post("/api/recipes", json={"title": "Viral"}).json()["id"]
+
+    async def fetch_all():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as concurrent:
+            return await asyncio.gather(*(concurrent.get(f"/api/recipes/{recipe_id}") for _ in range(50)))
+
+    coalesced = coalescing_stats.coalesced
+    responses = asyncio.run(fetch_all())
+
+    assert all(response.status_code == status.HTTP_200_OK for response in responses)
+    # Most of them were served a copy of another's response, yet each one counts as a view.
+    assert coalescing_stats.coalesced > coalesced
+    assert view_counter.pending() == {recipe_id: 50}
+
+
+def test_popular_recipes_rank_flushed_views(client, db_session):
+    ids = [client.post("/api/recipes", json={"title": title}).json()["id"] for title in ("Rare", "Hot", "Warm")]
+    for recipe_id, views in zip(ids, (1, 3, 2)):
+        for _ in range(views):
+            assert client.get(f"/api/recipes/{recipe_id}").status_code == status.HTTP_200_OK
+    client.get("/api/recipes/999999")
+
+    # Views are buffered until the write-behind flush.
+    assert client.get("/api/recipes/popular").json() == []
+    assert client.get("/metrics").json()["views_pending"] == 6
+    assert view_counter.flush(db_session) == 6
+
+    popular = client.get("/api/recipes/popular", params={"limit": 2}).json()
+    assert [(entry["recipe"]["title"], entry["views"]) for entry in popular] == [("Hot", 3), ("Warm", 2)]
+    assert client.get("/api/recipes/popular", params={"limit": 0}).status_code == 422
@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.middleware import CoalescingMiddleware, CoalescingStats
+
+
+def make_app(delay: float, timeout: float = 5.0):
+    calls = []
+
+    async def get_recipe(request):
+        calls.append((request.path_params["recipe_id"], request.query_params.multi_items()))
+        await asyncio.sleep(delay)
+        return JSONResponse({"id": request.path_params["recipe_id"], "call": len(calls)})
+
+    inner = Starlette(routes=[Route("/recipes/{recipe_id:int}", get_recipe), Route("/other/{recipe_id:int}", get_recipe)])
+    stats = CoalescingStats()
+    app = CoalescingMiddleware(inner, routes={"/recipes/{recipe_id:int}": timeout}, stats=stats)
+    return app, calls, stats
+
+
+async def fetch_all(app, urls):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await asyncio.gather(*(client.get(url) for url in urls))
+
+
+def test_concurrent_identical_reads_share_one_execution():
+    app, calls, stats = make_app(delay=0.05)
+    urls = ["/recipes/7?b=2&a=1", "/recipes/007?a=1&b=2"] * 25
+
+    responses = asyncio.run(fetch_all(app, urls))
+
+    assert len(calls) == 1
+    assert all(response.status_code == 200 and response.json() == {"id": 7, "call": 1} for response in responses)
+    assert (stats.requests, stats.coalesced) == (50, 49)
+    assert stats.ratio == 0.98
+
+
+def test_distinct_keys_and_unlisted_routes_are_not_coalesced():
+    app, calls, stats = make_app(delay=0.05)
+
+    asyncio.run(fetch_all(app, ["/recipes/1", "/recipes/2", "/recipes/1?ids=2&ids=1", "/recipes/1?ids=1&ids=2", "/other/1", "/other/1"]))
+
+    assert len(calls) == 6
+    assert stats.coalesced == 0
+
+
+def test_followers_stop_waiting_after_the_route_timeout():
+    app, calls, stats = make_app(delay=0.3, timeout=0.05)
+
+    responses = asyncio.run(fetch_all(app, ["/recipes/3"] * 3))
+
+    # The leader is too slow, so the two followers give up on it and run the request themselves.
+    assert len(calls) == 3
+    assert stats.timeouts == 2
+    assert all(response.status_code == 200 for response in responses)
@@ -1,4 +1,22 @@
-from app import crud, schemas
+import re
+import threading
+from typing import List
+
+import numpy as np
+import pytest
+from pydantic import TypeAdapter
+from sqlalchemy import event, insert, select
+from sqlalchemy.engine.default import CACHE_HIT
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import StaleDataError
+
+from app import crud, models, schemas
+from app.counters import ViewCounter
+from app.crud.duplicate import _originals, _similar_pairs
+from app.database import engine
+
+STATEMENT_TABLE = re.compile(r"(?:SELECT\s.*?\sFROM|INSERT INTO|UPDATE|DELETE FROM)\s+(\w+)", re.DOTALL)
 
 
 def test_category_crud_lifecycle(db_session):
@@ -85,3 +103,386 @@ def test_delete_recipe_removes_dependents(db_session):
 
     assert crud.get_recipe(db_session, recipe.id) is None
     assert crud.get_ingredients_for_recipe(db_session, recipe.id) == []
+
+
+def test_get_recipes_by_ids_uses_fixed_number_of_queries(db_session, captured_statements):
+    category = crud.create_category(db_session, schemas.CategoryCreate(name="Soups"))
+    recipe_ids = [
+        crud.create_recipe(
+            db_session,
+            schemas.RecipeCreate(
+                title=f"Soup {index}",
+                category_id=category.id,
+                ingredients=[schemas.IngredientCreate(name="Water"), schemas.IngredientCreate(name="Salt")],
+            ),
+        ).id
+        for index in range(5)
+    ]
+    db_session.expunge_all()
+    assert crud.category_exists(db_session, category.id)  # warm the category cache
+    captured_statements.clear()
+
+    recipes = crud.get_recipes_by_ids(db_session, recipe_ids)
+    for recipe in recipes:
+        assert len(recipe.ingredients) == 2
+        assert recipe.category.name == "Soups"
+
+    assert len(recipes) == 5
+    # One IN query for the recipes and one for their ingredients; the category comes from the cache.
+    assert len(captured_statements) == 2
+
+
+def test_category_stats_follow_recipe_writes(db_session):
+    breakfast = crud.create_category(db_session, schemas.CategoryCreate(name="Breakfast"))
+    lunch = crud.create_category(db_session, schemas.CategoryCreate(name="Lunch"))
+
+    toast = crud.create_recipe(
+        db_session, schemas.RecipeCreate(title="Toast", prep_time=2, cook_time=3, category_id=breakfast.id)
+    )
+    crud.create_recipe(db_session, schemas.RecipeCreate(title="Cereal", prep_time=4, category_id=breakfast.id))
+    db_session.refresh(breakfast)
+    assert breakfast.recipe_count == 2
+    assert breakfast.avg_prep_time == 3
+    assert breakfast.avg_cook_time == 3
+
+    crud.update_recipe(db_session, toast, schemas.RecipeUpdate(category_id=lunch.id, cook_time=5))
+    db_session.refresh(breakfast)
+    db_session.refresh(lunch)
+    assert (breakfast.recipe_count, breakfast.avg_cook_time) == (1, None)
+    assert (lunch.recipe_count, lunch.avg_cook_time) == (1, 5)
+
+    crud.delete_recipe(db_session, toast)
+    db_session.refresh(lunch)
+    assert lunch.recipe_count == 0
+    assert lunch.avg_prep_time is None
+
+
+def test_reconcile_category_stats_repairs_drift(db_session):
+    category = crud.create_category(db_session, schemas.CategoryCreate(name="Snacks"))
+    crud.create_recipe(db_session, schemas.RecipeCreate(title="Popcorn", cook_time=5, category_id=category.id))
+
+    db_session.execute(models.CategoryStats.__table__.delete())
+    db_session.commit()
+
+    crud.reconcile_category_stats(db_session)
+    db_session.refresh(category)
+    assert category.recipe_count == 1
+    assert category.avg_cook_time == 5
+
+
+def test_concurrent_updates_do_not_lose_writes(file_engine):
+    # Real commits on separate connections, so outside the per-test transaction.
+    session_factory = sessionmaker(bind=file_engine, autocommit=False, autoflush=False)
+    db_session = session_factory()
+    recipe = crud.create_recipe(db_session, schemas.RecipeCreate(title="Stew", servings=0))
+    workers, increments = 4, 5
+
+    def increment_servings():
+        for _ in range(increments):
+            while True:
+                session = session_factory()
+                try:
+                    current = crud.get_recipe(session, recipe.id)
+                    crud.update_recipe(session, current, schemas.RecipeUpdate(servings=current.servings + 1))
+                    break
+                except StaleDataError:
+                    session.rollback()
+                finally:
+                    session.close()
+
+    threads = [threading.Thread(target=increment_servings) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    db_session.refresh(recipe)
+    assert recipe.servings == workers * increments
+    assert recipe.version == workers * increments + 1
+    db_session.close()
+
+
+def statement_tables(statements: List[str]) -> List[str]:
+    """Each statement as `<verb> <table>`, e.g. `INSERT ingredients`."""
+    return [f"{statement.split()[0]} {STATEMENT_TABLE.match(statement).group(1)}" for statement in statements]
+
+
+def test_writes_issue_one_statement_per_table_touched(db_session, captured_statements):
+    category = crud.create_category(db_session, schemas.CategoryCreate(name="Mains"))
+    # The category row comes back from INSERT ... RETURNING; its counters row starts at zero.
+    assert statement_tables(captured_statements) == ["INSERT categories", "INSERT category_stats"]
+    captured_statements.clear()
+
+    recipe = crud.create_recipe(
+        db_session,
+        schemas.RecipeCreate(
+            title="Curry",
+            category_id=category.id,
+            ingredients=[schemas.IngredientCreate(name="Rice", amount="1 cup"), schemas.IngredientCreate(name="Lentils")],
+        ),
+    )
+    created = schemas.Recipe.model_validate(recipe)
+    # One near-duplicate lookup in the LSH index, then one statement per table written: all
+    # ingredients in a single INSERT, all LSH bands in one executemany. No follow-up SELECTs.
+    assert statement_tables(captured_statements) == [
+        "SELECT recipes",
+        "INSERT recipes",
+        "UPDATE category_stats",
+        "INSERT ingredients",
+        "INSERT recipe_minhash_bands",
+    ]
+    assert all("RETURNING" in statement for statement in captured_statements if statement.startswith(("INSERT INTO recipes", "INSERT INTO ingredients")))
+    captured_statements.clear()
+
+    updated = crud.update_recipe(
+        db_session,
+        recipe,
+        schemas.RecipeUpdate(title="Dal", category_id=None, ingredients=[schemas.IngredientCreate(name="Lentils", unit="g")]),
+    )
+    serialized = schemas.Recipe.model_validate(updated)
+    # Leaving the category only decrements the old counters; ingredients and bands are replaced wholesale.
+    assert statement_tables(captured_statements) == [
+        "SELECT recipes",
+        "UPDATE category_stats",
+        "UPDATE recipes",
+        "DELETE ingredients",
+        "INSERT ingredients",
+        "DELETE recipe_minhash_bands",
+        "INSERT recipe_minhash_bands",
+    ]
+    assert [ingredient.name for ingredient in created.ingredients] == ["Rice", "Lentils"]
+    assert created.category.name == "Mains"
+    assert [ingredient.unit for ingredient in serialized.ingredients] == ["g"]
+    assert serialized.category is None
+    assert serialized.version == 2
+
+
+def test_create_category_rejects_duplicates_in_one_statement(db_session, captured_statements):
+    assert crud.create_category(db_session, schemas.CategoryCreate(name="Vegan")) is not None
+    captured_statements.clear()
+
+    assert crud.create_category(db_session, schemas.CategoryCreate(name="Vegan")) is None
+    assert len(captured_statements) == 1
+    assert "ON CONFLICT" in captured_statements[0]
+
+    upserted = crud.upsert_category(db_session, schemas.CategoryCreate(name="Vegan", description="No animal products"))
+    assert upserted.description == "No animal products"
+    assert len(crud.get_categories(db_session)) == 1
+
+
+def test_category_cache_answers_without_queries_and_sees_writes(db_session, captured_statements):
+    category = crud.create_category(db_session, schemas.CategoryCreate(name="Sides"))
+    assert crud.category_exists(db_session, category.id)
+    captured_statements.clear()
+
+    assert crud.category_exists(db_session, category.id)
+    assert captured_statements == []
+
+    crud.delete_category(db_session, category)
+    assert not crud.category_exists(db_session, category.id)
+
+
+def test_delete_recipes_is_set_based_and_cascades(db_session, captured_statements):
+    category = crud.create_category(db_session, schemas.CategoryCreate(name="Bakes"))
+    recipe_ids = [
+        crud.create_recipe(
+            db_session,
+            schemas.RecipeCreate(
+                title=f"Bread {index}",
+                prep_time=10,
+                category_id=category.id,
+                ingredients=[schemas.IngredientCreate(name="Flour"), schemas.IngredientCreate(name="Yeast")],
+            ),
+        ).id
+        for index in range(3)
+    ]
+    captured_statements.clear()
+
+    deleted = crud.delete_recipes(db_session, recipe_ids[:2] + [999])
+
+    assert sorted(deleted) == sorted(recipe_ids[:2])
+    deletes = [statement for statement in captured_statements if statement.startswith("DELETE")]
+    assert len(deletes) == 1
+    assert deletes[0].startswith("DELETE FROM recipes")
+    assert crud.get_ingredients_for_recipe(db_session, recipe_ids[0]) == []
+    assert len(crud.get_ingredients_for_recipe(db_session, recipe_ids[2])) == 2
+
+    db_session.refresh(category)
+    assert category.recipe_count == 1
+
+
+def test_delete_category_nulls_recipes_without_loading_them(db_session, captured_statements):
+    category = crud.create_category(db_session, schemas.CategoryCreate(name="Seasonal"))
+    recipe = crud.create_recipe(db_session, schemas.RecipeCreate(title="Gazpacho", category_id=category.id))
+    recipe_id = recipe.id
+    db_session.expunge_all()
+    category = crud.get_category(db_session, category.id)
+    captured_statements.clear()
+
+    crud.delete_category(db_session, category)
+
+    assert not any("FROM recipes" in statement for statement in captured_statements)
+    assert crud.get_recipe(db_session, recipe_id).category_id is None
+
+
+def test_create_recipe_flags_near_duplicates(db_session):
+    instructions = "Whisk the eggs with milk. Melt butter in a pan, pour in the eggs and stir gently until just set."
+    ingredients = [schemas.IngredientCreate(name=name) for name in ("Eggs", "Milk", "Butter", "Salt", "Chives")]
+
+    original = crud.create_recipe(db_session, schemas.RecipeCreate(title="Scrambled Eggs", instructions=instructions, ingredients=ingredients))
+    copy = crud.create_recipe(
+        db_session,
+        schemas.RecipeCreate(title="Best Scrambled Eggs!!", instructions=instructions + " Serve.", ingredients=ingredients),
+    )
+    other = crud.create_recipe(
+        db_session,
+        schemas.RecipeCreate(
+            title="Pancakes",
+            instructions="Mix flour, sugar and milk into a batter. Fry ladlefuls in a hot pan until golden.",
+            ingredients=[schemas.IngredientCreate(name=name) for name in ("Flour", "Sugar", "Milk")],
+        ),
+    )
+
+    assert original.duplicate_of_id is None
+    assert copy.duplicate_of_id == original.id
+    assert other.duplicate_of_id is None
+
+    duplicates = crud.find_duplicate_recipes(db_session, original.id)
+    assert [(recipe.id, score >= 0.8) for recipe, score in duplicates] == [(copy.id, True)]
+    assert crud.find_duplicate_recipes(db_session, other.id) == []
+    assert crud.find_duplicate_recipes(db_session, 4242) is None
+
+    crud.update_recipe(db_session, copy, schemas.RecipeUpdate(instructions="Boil the eggs for nine minutes, then peel."))
+    assert copy.duplicate_of_id is None
+
+
+def test_dedupe_job_fingerprints_and_links_rows_written_outside_the_orm(db_session):
+    instructions = "Toss the pasta with olive oil, garlic and chilli flakes, then finish with parsley and lemon zest."
+    connection = db_session.connection()
+    connection.execute(
+        insert(models.Recipe.__table__),
+        [{"id": recipe_id, "title": f"Aglio e olio {recipe_id}", "instructions": instructions} for recipe_id in (10, 11, 12)],
+    )
+    connection.execute(
+        insert(models.Ingredient.__table__),
+        [
+            {"recipe_id": recipe_id, "name": name}
+            for recipe_id in (10, 11, 12)
+            for name in ("Spaghetti", "Olive oil", "Garlic", "Chilli flakes")
+        ],
+    )
+
+    assert crud.dedupe_recipes(db_session, batch_size=2) == 2
+
+    rows = db_session.execute(select(models.Recipe.id, models.Recipe.duplicate_of_id, models.Recipe.version).order_by(models.Recipe.id)).all()
+    assert [tuple(row) for row in rows] == [(10, None, 1), (11, 10, 2), (12, 10, 2)]
+    # A second run finds nothing new to change.
+    assert crud.dedupe_recipes(db_session) == 2
+    assert db_session.execute(select(models.Recipe.version).where(models.Recipe.id == 11)).scalar() == 2
+
+
+def test_dedupe_compares_bucket_members_with_a_representative_first():
+    compared = []
+    # Recipes 1-200 are one cluster; 300 and 301 resemble each other but not recipe 1.
+    families = {recipe_id: "a" for recipe_id in range(1, 201)}
+    families.update({300: "b", 301: "b", 302: "c"})
+
+    def similar(left, right):
+        compared.extend(zip(left.tolist(), right.tolist()))
+        return np.array([families[a] == families[b] for a, b in zip(left.tolist(), right.tolist())], dtype=bool)
+
+    left, right = _similar_pairs([list(range(1, 201)), [1, 300, 301, 302]], similar)
+
+    # Linear in the cluster's size, with pairwise checks only for the three outliers.
+    assert len(compared) == 199 + 3 + 3
+    assert _originals(left, right) == {**{recipe_id: 1 for recipe_id in range(2, 201)}, 301: 300}
+
+
+def test_hot_path_lookups_reuse_compiled_statements(db_session):
+    category = crud.create_category(db_session, schemas.CategoryCreate(name="Cached"))
+    recipe = crud.create_recipe(
+        db_session,
+        schemas.RecipeCreate(title="Toast", category_id=category.id, ingredients=[schemas.IngredientCreate(name="Bread")]),
+    )
+    lookups = [
+        lambda: crud.get_recipe(db_session, recipe.id),
+        lambda: crud.get_category(db_session, category.id),
+        lambda: crud.get_category_by_name(db_session, "Cached"),
+        lambda: crud.get_ingredients_for_recipe(db_session, recipe.id),
+    ]
+    for lookup in lookups:
+        lookup()
+
+    cache_hits = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        cache_hits.append(context.cache_hit is CACHE_HIT)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        assert crud.get_recipe(db_session, recipe.id).title == "Toast"
+        assert crud.get_category(db_session, category.id).name == "Cached"
+        assert crud.get_category_by_name(db_session, "Cached").id == category.id
+        assert [ingredient.name for ingredient in crud.get_ingredients_for_recipe(db_session, recipe.id)] == ["Bread"]
+        assert crud.get_category(db_session, category.id + 1000) is None
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert cache_hits == [True] * 5
+
+
+def test_recipe_rows_match_orm_listing_without_identity_map(db_session, captured_statements):
+    soups = crud.create_category(db_session, schemas.CategoryCreate(name="Soups"))
+    for title, category_id, names in [("Leek Soup", soups.id, ["Leek", "Potato"]), ("Plain Rice", None, []), ("Pea Soup", soups.id, ["Peas"])]:
+        crud.create_recipe(
+            db_session,
+            schemas.RecipeCreate(
+                title=title, category_id=category_id, ingredients=[schemas.IngredientCreate(name=name) for name in names]
+            ),
+        )
+    db_session.expunge_all()
+    adapter = TypeAdapter(List[schemas.Recipe])
+
+    for category_id in (None, soups.id):
+        expected = adapter.dump_python(adapter.validate_python(crud.get_recipes(db_session, category_id=category_id)))
+        db_session.expunge_all()
+        captured_statements.clear()
+
+        rows = crud.get_recipe_rows(db_session, category_id=category_id)
+
+        assert len(captured_statements) == 2
+        assert len(db_session.identity_map) == 0
+        assert adapter.dump_python(adapter.validate_python(rows, from_attributes=True)) == expected
+
+
+def test_recipe_views_are_added_in_one_batched_upsert(db_session, captured_statements):
+    first, second, gone = (crud.create_recipe(db_session, schemas.RecipeCreate(title=title)).id for title in ("A", "B", "C"))
+    crud.delete_recipes(db_session, [gone])
+    crud.add_recipe_views(db_session, {first: 2})
+    captured_statements.clear()
+
+    assert crud.add_recipe_views(db_session, {first: 3, second: 1, gone: 5}) == 4
+
+    writes = [statement for statement in captured_statements if "recipe_stats" in statement]
+    assert len(writes) == 1
+    views = dict(db_session.execute(select(models.RecipeStats.recipe_id, models.RecipeStats.view_count)).all())
+    assert views == {first: 5, second: 1}
+
+
+def test_view_counter_keeps_counts_when_a_flush_fails(db_session, monkeypatch):
+    recipe = crud.create_recipe(db_session, schemas.RecipeCreate(title="Counted"))
+    counter = ViewCounter()
+    counter.increment(recipe.id)
+    counter.increment(recipe.id)
+
+    def fail(db, counts):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(crud, "add_recipe_views", fail)
+    with pytest.raises(OperationalError):
+        counter.flush(db_session)
+    counter.increment(recipe.id)
+    assert counter.pending() == {recipe.id: 3}
+
+    monkeypatch.undo()
+    assert counter.flush(db_session) == 3
+    assert counter.pending() == {}
@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+from app.events import FileLogBroadcaster, RecipeEventHub
+from app.main import app
+
+
+def parse_frames(frames):
+    """SSE events in `frames` as dicts of their fields, skipping `retry:` and comment frames."""
+    events = []
+    for frame in b"".join(frames).decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.splitlines() if line and not line.startswith(":"))
+        if "event" in fields:
+            events.append({"id": fields["id"], "event": fields["event"], "data": json.loads(fields["data"])})
+    return events
+
+
+async def read_events(count, last_event_id=None, during=None):
+    """Open `/api/recipes/events`, run the blocking `during()` once connected, and return `count` events."""
+    frames = []
+    connected, enough = asyncio.Event(), asyncio.Event()
+
+    async def receive():
+        await enough.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            frames.append(message["body"])
+            connected.set()
+            if len(parse_frames(frames)) >= count:
+                enough.set()
+
+    headers = [(b"accept", b"text/event-stream")]
+    if last_event_id is not None:
+        headers.append((b"last-event-id", last_event_id.encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/recipes/events",
+        "raw_path": b"/api/recipes/events",
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers,
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    task = asyncio.create_task(app(scope, receive, send))
+    await asyncio.wait_for(connected.wait(), 5)
+    if during is not None:
+        await asyncio.to_thread(during)
+    await asyncio.wait_for(task, 5)
+    return parse_frames(frames)
+
+
+def test_event_stream_carries_recipe_changes(client):
+    def write():
+        created = client.post("/api/recipes", json={"title": "Ramen", "ingredients": []}).json()
+        client.put(f"/api/recipes/{created['id']}", json={"title": "Shoyu ramen"})
+        client.delete(f"/api/recipes/{created['id']}")
+
+    events = asyncio.run(read_events(3, during=write))
+
+    recipe_id = events[0]["data"]["id"]
+    assert [(event["event"], event["data"]) for event in events] == [
+        ("created", {"id": recipe_id, "version": 1, "category_id": None}),
+        ("updated", {"id": recipe_id, "version": 2, "category_id": None}),
+        ("deleted", {"ids": [recipe_id]}),
+    ]
+    assert client.get("/metrics").json()["events"]["subscribers"] == 0
+
+
+def test_reconnect_resumes_from_last_event_id_or_resets(client):
+    def create(title):
+        return lambda: client.post("/api/recipes", json={"title": title, "ingredients": []})
+
+    [first] = asyncio.run(read_events(1, during=create("Udon")))
+    create("Soba")()
+    create("Somen")()
+
+    missed = asyncio.run(read_events(2, last_event_id=first["id"]))
+    [reset] = asyncio.run(read_events(1, last_event_id="unknown-1"))
+
+    assert [event["event"] for event in missed] == ["created", "created"]
+    assert missed[0]["data"]["id"] < missed[1]["data"]["id"]
+    # The reset carries the newest id, so the next reconnect resumes from there.
+    assert (reset["event"], reset["id"]) == ("reset", missed[-1]["id"])
+
+
+def test_slow_consumer_is_disconnected_and_resumes_from_history():
+    hub = RecipeEventHub(history_size=100, max_pending=4)
+
+    async def scenario():
+        stream = hub.stream()
+        await stream.__anext__()  # retry frame; the stream is now subscribed
+        for n in range(10):
+            hub.publish("created", {"id": n})
+        await asyncio.sleep(0)
+        delivered = parse_frames([frame async for frame in stream])
+        resumed = hub.stream(last_event_id=delivered[-1]["id"])
+        frames = [await resumed.__anext__() for _ in range(7)]
+        await resumed.aclose()
+        return delivered, parse_frames(frames)
+
+    delivered, resumed = asyncio.run(scenario())
+
+    assert [event["data"]["id"] for event in delivered] == [0, 1, 2, 3]
+    assert [event["data"]["id"] for event in resumed] == [4, 5, 6, 7, 8, 9]
+    assert hub.snapshot() == {"subscribers": 0, "published": 10, "dropped": 1}
+
+
+def test_file_log_carries_events_between_processes_in_one_order(tmp_path):
+    path = str(tmp_path / "events.log")
+    # Two workers: each has its own descriptor and offset on the shared log.
+    workers = [RecipeEventHub(FileLogBroadcaster(path, max_bytes=400)) for _ in range(2)]
+
+    for n in range(12):
+        workers[n % 2].publish("created", {"id": n})
+        if n == 5:
+            for hub in workers:
+                hub.broadcaster.poll()
+    for hub in workers:
+        hub.broadcaster.poll()
+
+    histories = [[(event.id, event.data["id"]) for event in hub._history] for hub in workers]
+    assert histories[0] == histories[1]
+    assert [recipe_id for _, recipe_id in histories[0]] == list(range(12))
+    # The log was started afresh along the way, under a new epoch.
+    assert len({event_id.split("-")[0] for event_id, _ in histories[0]}) > 1
+
+    # A worker started later only hears about events published after it.
+    late = RecipeEventHub(FileLogBroadcaster(path))
+    workers[0].publish("deleted", {"ids": [0]})
+    for hub in workers + [late]:
+        hub.broadcaster.poll()
+    assert [event.kind for event in late._history] == ["deleted"]
+    assert late._history[-1].id == workers[0]._history[-1].id == workers[1]._history[-1].id
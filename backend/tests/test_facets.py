@@ -0,0 +1,97 @@
+import random
+
+from app.facets import facet_index
+
+
+def create(client, **fields):
+    payload = {"title": "Recipe", "ingredients": [{"name": f"Item {n}"} for n in range(fields.pop("ingredient_count", 0))], **fields}
+    response = client.post("/api/recipes", json=payload)
+    assert response.status_code == 201
+    return response.json()
+
+
+def facets(client, **params):
+    response = client.get("/api/recipes/facets", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_facet_counts_exclude_each_facets_own_selection(client, db_session):
+    soups = client.post("/api/categories", json={"name": "Soups"}).json()["id"]
+    create(client, category_id=soups, prep_time=10, cook_time=5, servings=2, ingredient_count=3)
+    create(client, category_id=soups, prep_time=20, cook_time=40, servings=4, ingredient_count=8)
+    create(client, prep_time=10, servings=2, ingredient_count=12)
+    create(client)
+    facet_index.rebuild(db_session)
+
+    everything = facets(client)
+    selected = facets(client, category_id=soups, servings=["2", "3-4"])
+
+    assert everything["total"] == 4
+    assert everything["category"] == [{"category_id": None, "count": 2}, {"category_id": soups, "count": 2}]
+    assert everything["total_time"] == [{"bucket": "unknown", "count": 1}, {"bucket": "0-15", "count": 2}, {"bucket": "31-60", "count": 1}]
+    assert everything["ingredients"] == [{"bucket": "0-5", "count": 2}, {"bucket": "6-10", "count": 1}, {"bucket": "11-15", "count": 1}]
+    assert selected["total"] == 2
+    # Categories are counted under the servings selection only, servings under the category only.
+    assert selected["category"] == [{"category_id": None, "count": 1}, {"category_id": soups, "count": 2}]
+    assert selected["servings"] == [{"bucket": "2", "count": 1}, {"bucket": "3-4", "count": 1}]
+    assert selected["total_time"] == [{"bucket": "0-15", "count": 1}, {"bucket": "31-60", "count": 1}]
+
+
+def test_writes_apply_before_the_next_rebuild(client, db_session):
+    first = create(client, servings=2)
+    second = create(client, servings=2, ingredient_count=7)
+    facet_index.rebuild(db_session)
+
+    client.put(f"/api/recipes/{first['id']}", json={"servings": 6})
+    client.delete(f"/api/recipes/{second['id']}")
+    create(client, servings=1, cook_time=200)
+    before_rebuild = facets(client)
+    facet_index.rebuild(db_session)
+
+    assert before_rebuild == facets(client)
+    assert before_rebuild["total"] == 2
+    assert before_rebuild["servings"] == [{"bucket": "1", "count": 1}, {"bucket": "5-6", "count": 1}]
+    assert before_rebuild["total_time"] == [{"bucket": "unknown", "count": 1}, {"bucket": "121+", "count": 1}]
+
+
+def test_counts_match_a_row_by_row_count(client, db_session):
+    rng = random.Random(7)
+    categories = [client.post("/api/categories", json={"name": f"Category {n}"}).json()["id"] for n in range(3)]
+    for _ in range(60):
+        create(
+            client,
+            category_id=rng.choice(categories + [None]),
+            prep_time=rng.choice([None, 5, 25, 50]),
+            cook_time=rng.choice([None, 10, 90]),
+            servings=rng.choice([None, 1, 3, 8]),
+            ingredient_count=rng.randint(0, 18),
+        )
+    facet_index.rebuild(db_session)
+    recipes = client.get("/api/recipes").json()
+
+    result = facets(client, category_id=categories[:2], total_time=["31-60", "61-120"], ingredients=["6-10", "11-15", "16+"])
+
+    def matches(recipe, skip=None):
+        total_time = None if recipe["prep_time"] is None and recipe["cook_time"] is None else (recipe["prep_time"] or 0) + (recipe["cook_time"] or 0)
+        count = len(recipe["ingredients"])
+        checks = {
+            "category": recipe["category_id"] in categories[:2],
+            "total_time": total_time is not None and 31 <= total_time <= 120,
+            "ingredients": count >= 6,
+        }
+        return all(passed for name, passed in checks.items() if name != skip)
+
+    assert result["total"] == sum(matches(recipe) for recipe in recipes)
+    expected = {}
+    for recipe in recipes:
+        if matches(recipe, skip="category"):
+            expected[recipe["category_id"]] = expected.get(recipe["category_id"], 0) + 1
+    assert {entry["category_id"]: entry["count"] for entry in result["category"]} == expected
+
+
+def test_unknown_bucket_is_rejected(client):
+    response = client.get("/api/recipes/facets", params={"servings": "lots"})
+
+    assert response.status_code == 400
+    assert "servings" in response.json()["detail"]
@@ -0,0 +1,175 @@
+import asyncio
+
+import httpx
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.health import CircuitBreaker, HealthMonitor
+from app.main import health_monitor
+from app.middleware import CircuitBreakerMiddleware
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.down = False
+        self.lag = None
+        self.probes = 0
+
+    def probe(self):
+        self.probes += 1
+        if self.down:
+            raise OperationalError("SELECT 1", {}, ConnectionRefusedError("connection refused"))
+        return self.lag
+
+
+def test_monitor_caches_probes_and_drives_the_breaker(monkeypatch):
+    database = FakeDatabase()
+    breaker = CircuitBreaker(failure_threshold=2)
+    pool = {"capacity": 10, "size": 5, "checked_out": 8, "overflow": 0}
+    monitor = HealthMonitor(database.probe, breaker, lambda: pool, stale_after=10, max_replication_lag=5)
+    assert not monitor.ready()
+
+    monitor.run_once()
+    snapshot = monitor.snapshot()
+    assert monitor.ready() and database.probes == 1
+    assert snapshot["pool_saturation"] == 0.8 and snapshot["error"] is None and snapshot["latency_ms"] >= 0
+
+    database.down = True
+    monitor.run_once()
+    # One failure is below the threshold: not ready, but requests are still let through.
+    assert not monitor.ready() and breaker.state == "closed"
+    monitor.run_once()
+    assert breaker.state == "open" and not breaker.allow()
+    assert "connection refused" in monitor.snapshot()["error"]
+
+    database.down = False
+    database.lag = 12.5
+    monitor.run_once()
+    assert breaker.state == "closed" and breaker.allow()
+    assert not monitor.ready() and monitor.snapshot()["replication_lag"] == 12.5
+    database.lag = 0.5
+    monitor.run_once()
+    assert monitor.ready()
+    assert monitor.snapshot()["circuit"] == {"state": "closed", "consecutive_failures": 0, "rejected": 1}
+
+    # A monitor that stopped probing stops reporting ready.
+    monkeypatch.setattr("app.health.time.monotonic", lambda: monitor.status.checked_at + 11)
+    assert not monitor.ready()
+
+
+def test_open_circuit_fails_fast_and_connection_errors_count():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        if request.url.path == "/broken":
+            raise OperationalError("SELECT 1", {}, TimeoutError("timed out"))
+        return JSONResponse({"ok": True})
+
+    async def saturated(request):
+        raise PoolTimeoutError("QueuePool limit of size 5 overflow 10 reached")
+
+    inner = Starlette(
+        routes=[Route("/items", handler), Route("/broken", handler), Route("/health/ready", handler), Route("/saturated", saturated)]
+    )
+    breaker = CircuitBreaker(failure_threshold=2)
+    app = CircuitBreakerMiddleware(inner, breaker=breaker, retry_after=7, exempt_prefixes=["/health"])
+
+    async def run():
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # An exhausted pool is load, not an outage: it never trips the circuit.
+            saturated = [(await client.get("/saturated")).status_code for _ in range(3)]
+            assert saturated == [500, 500, 500] and breaker.state == "closed"
+            statuses = [(await client.get(path)).status_code for path in ("/items", "/broken", "/broken")]
+            rejected = await client.get("/items")
+            exempt = await client.get("/health/ready")
+            return statuses, rejected, exempt
+
+    statuses, rejected, exempt = asyncio.run(run())
+
+    assert statuses == [200, 500, 500] and breaker.state == "open"
+    assert rejected.status_code == 503 and rejected.headers["retry-after"] == "7"
+    assert exempt.status_code == 200
+    # The rejected request never reached the application.
+    assert calls == ["/items", "/broken", "/broken", "/health/ready"]
+
+
+def test_open_circuit_lets_a_trial_request_through_after_the_cooldown(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.health.time.monotonic", lambda: clock[0])
+    database = FakeDatabase()
+
+    async def handler(request):
+        database.probe()
+        return JSONResponse({"ok": True})
+
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=5)
+    app = CircuitBreakerMiddleware(Starlette(routes=[Route("/items", handler)]), breaker=breaker)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return (await client.get("/items")).status_code
+
+    # No health monitor is probing: only requests see the outage.
+    database.down = True
+    assert [asyncio.run(run()) for _ in range(3)] == [500, 500, 503]
+    clock[0] += 5
+    # The trial fails and the circuit stays open for another cooldown.
+    assert [asyncio.run(run()) for _ in range(2)] == [500, 503]
+    assert breaker.state == "open"
+
+    database.down = False
+    clock[0] += 5
+    assert [asyncio.run(run()) for _ in range(3)] == [200, 200, 200]
+    assert breaker.snapshot() == {"state": "closed", "consecutive_failures": 0, "rejected": 2}
+    assert database.probes == 6
+
+
+def test_occasional_connection_errors_between_successes_keep_the_circuit_closed():
+    async def handler(request):
+        if request.url.path == "/broken":
+            raise OperationalError("SELECT 1", {}, Exception("deadlock detected"))
+        return JSONResponse({"ok": True})
+
+    breaker = CircuitBreaker(failure_threshold=3)
+    app = CircuitBreakerMiddleware(Starlette(routes=[Route("/items", handler), Route("/broken", handler)]), breaker=breaker)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [(await client.get(path)).status_code for path in ["/broken", "/items"] * 10]
+
+    assert asyncio.run(run()) == [500, 200] * 10
+    assert breaker.snapshot() == {"state": "closed", "consecutive_failures": 0, "rejected": 0}
+
+
+def test_readiness_follows_the_database_while_liveness_stays_up(client, monkeypatch):
+    database = FakeDatabase()
+
+    # The app probed the real database on startup.
+    ready = client.get("/health/ready")
+    assert ready.status_code == 200 and ready.json()["status"] == "ok"
+    assert set(ready.json()["pool"]) == {"capacity", "size", "checked_out", "overflow"}
+
+    monkeypatch.setattr(health_monitor, "probe", database.probe)
+    database.down = True
+    for _ in range(health_monitor.breaker.failure_threshold):
+        health_monitor.run_once()
+
+    unavailable = client.get("/health/ready")
+    assert unavailable.status_code == 503 and unavailable.json()["circuit"]["state"] == "open"
+    assert client.get("/health/live").status_code == 200 and client.get("/health").status_code == 200
+    rejected = client.get("/api/recipes", headers={"Origin": "http://localhost:3000"})
+    assert rejected.status_code == 503 and "Retry-After" in rejected.headers
+    # The browser frontend can read the 503 and retry, rather than seeing a network error.
+    assert rejected.headers["access-control-allow-origin"] == "http://localhost:3000"
+    assert client.get("/metrics").json()["health"]["circuit"]["rejected"] == 1
+
+    database.down = False
+    health_monitor.run_once()
+    assert client.get("/health/ready").status_code == 200
+    assert client.get("/api/recipes").status_code == 200
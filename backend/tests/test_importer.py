@@ -0,0 +1,80 @@
+from pathlib import Path
+
+import pytest
+
+from app import crud, models, schemas
+from app.importer import import_pages
+from app.schema_org import extract_recipes, parse_duration, parse_ingredient
+from app.storage import LocalStorage
+
+PAGES = Path(__file__).parent / "fixtures" / "recipe_pages"
+
+
+@pytest.fixture()
+def storage(tmp_path):
+    storage = LocalStorage(db_path=str(tmp_path / "import.db"))
+    storage.initialize()
+    yield storage
+    storage.close()
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("1 ½ cups flour, sifted", ("flour, sifted", "1 1/2", "cup")),
+        ("2 1/2 Tablespoons of olive oil", ("olive oil", "2 1/2", "tbsp")),
+        ("200g dark chocolate", ("dark chocolate", "200", "g")),
+        ("3 to 4 cloves garlic, minced", ("garlic, minced", "3-4", "clove")),
+        ("1,5 l milk", ("milk", "1.5", "l")),
+        ("1 (14 oz) can diced tomatoes", ("diced tomatoes (14 oz)", "1", "can")),
+        ("2 fl oz cream", ("cream", "2", "fl oz")),
+        ("2 large eggs", ("large eggs", "2", None)),
+        ("Salt &amp; pepper, to taste", ("Salt & pepper, to taste", None, None)),
+    ],
+)
+def test_ingredient_lines_split_into_name_amount_and_unit(line, expected):
+    ingredient = parse_ingredient(line)
+
+    assert (ingredient.name, ingredient.amount, ingredient.unit) == expected
+
+
+def test_json_ld_and_microdata_pages_map_to_recipe_create():
+    [(soup, soup_category)] = extract_recipes((PAGES / "jsonld_graph.html").read_text())
+    [(pancakes, pancakes_category)] = extract_recipes((PAGES / "microdata.html").read_text())
+
+    assert (soup.title, soup_category, soup.prep_time, soup.cook_time, soup.servings) == ("Roasted Tomato Soup", "soups", 15, 65, 4)
+    assert soup.description == "Sweet roasted tomatoes & garlic, blended smooth."
+    # Steps inside a HowToSection are flattened in order.
+    assert soup.instructions.splitlines() == [
+        "Heat the oven to 220°C.",
+        "Roast the tomatoes and garlic for 45 minutes.",
+        "Blend with the coconut milk and season.",
+    ]
+    assert (pancakes.title, pancakes_category, pancakes.prep_time, pancakes.servings) == ("Weeknight Pancakes", "Breakfast", 10, 6)
+    # The unclosed <p> ends where the ingredient list begins.
+    assert pancakes.description == "Fluffy pancakes in twenty minutes."
+    assert [(item.name, item.amount, item.unit) for item in pancakes.ingredients][:2] == [("plain flour", "200", "g"), ("large eggs", "2", None)]
+    assert len(pancakes.instructions.splitlines()) == 2
+    assert extract_recipes((PAGES / "no_recipe.html").read_text()) == []
+    assert (parse_duration("P1DT2H"), parse_duration("PT90S"), parse_duration("soon")) == (1560, 2, None)
+
+
+def test_import_parses_pages_in_worker_processes_and_bulk_loads_them(storage):
+    with storage.create_session() as session:
+        soups = crud.create_category(session, schemas.CategoryCreate(name="Soups"))
+        stews = crud.create_category(session, schemas.CategoryCreate(name="Stews"))
+
+    stats = import_pages(storage, [str(PAGES)], workers=2, batch_size=2, chunk_size=1, format="csv")
+
+    # notes.txt is not a page; the broken JSON-LD block is skipped and its sibling still imported.
+    assert (stats.pages, stats.recipes, stats.empty, stats.unreadable) == (5, 5, 1, 0)
+    assert stats.ingredients == 5 + 4 + 3 + 2 + 3
+    assert stats.pages_per_second_per_core > 0
+    with storage.create_session() as session:
+        recipes = {recipe.title: recipe for recipe in session.query(models.Recipe)}
+        assert sorted(recipes) == ["Green Salad", "Lemonade", "Roasted Tomato Soup", "Three-Bean Chili", "Weeknight Pancakes"]
+        assert recipes["Roasted Tomato Soup"].category_id == soups.id
+        assert recipes["Three-Bean Chili"].category_id == stews.id
+        assert recipes["Weeknight Pancakes"].category_id is None
+        assert [(item.name, item.amount, item.unit) for item in recipes["Three-Bean Chili"].ingredients][0] == ("beans, drained", "3", "can")
+        assert session.get(models.CategoryStats, soups.id).recipe_count == 1
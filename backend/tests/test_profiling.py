@@ -0,0 +1,90 @@
+import asyncio
+import json
+import time
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+from pydantic import BaseModel
+from sqlalchemy import create_engine, text
+
+from app.middleware import ProfilingMiddleware, sign_profile_request
+
+# Its own database, so the profiled queries are not wrapped in the per-test transaction's SAVEPOINTs.
+engine = create_engine("sqlite://")
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+    tags: List[str]
+
+
+def busy_python(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def make_app(**options):
+    inner = FastAPI()
+
+    @inner.get("/items", response_model=List[Item])
+    def list_items():
+        with engine.connect() as connection:
+            connection.execute(text("WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 200000) SELECT sum(x) FROM n"))
+        busy_python(0.05)
+        return [{"id": n, "name": f"Item {n}", "tags": ["a", "b"]} for n in range(20_000)]
+
+    return ProfilingMiddleware(inner, **options)
+
+
+def get(app, headers):
+    async def request():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get("/items", headers=headers)
+
+    return asyncio.run(request())
+
+
+def test_untriggered_and_unauthorized_requests_are_not_profiled():
+    app = make_app(secret="s3cret", admin_token="token")
+    expired = sign_profile_request("s3cret", "GET", "/items", int(time.time()) - 1)
+    other_path = sign_profile_request("s3cret", "GET", "/other", int(time.time()) + 60)
+
+    for headers in ({}, {"X-Profile-Token": "wrong"}, {"X-Profile-Signature": expired}, {"X-Profile-Signature": other_path}):
+        response = get(app, headers)
+        assert response.status_code == 200
+        assert "server-timing" not in response.headers and "x-profile-summary" not in response.headers
+    assert "server-timing" not in get(make_app(admin_token="token", sample_rate=0.0), {"X-Profile-Token": "token"}).headers
+
+
+def test_profiled_request_reports_sql_pydantic_and_worker_thread_functions():
+    app = make_app(admin_token="token")
+
+    response = get(app, {"X-Profile-Token": "token"})
+
+    summary = json.loads(response.headers["x-profile-summary"])
+    assert response.headers["server-timing"].startswith("total;dur=")
+    assert summary["queries"] == 1 and summary["sql_ms"] > 0
+    assert summary["pydantic_ms"] > 0
+    assert summary["samples"] > 10
+    # The sync endpoint ran on a threadpool worker, and its samples were attributed to the request.
+    busy = next(entry for entry in summary["top"] if entry["function"].startswith("busy_python"))
+    assert busy["self_ms"] > 20
+    assert summary["total_ms"] >= summary["sql_ms"] + busy["self_ms"]
+
+
+def test_signed_request_writes_bounded_flamegraph_files(tmp_path):
+    app = make_app(secret="s3cret", directory=str(tmp_path), max_files=2)
+    headers = {
+        "X-Profile-Signature": sign_profile_request("s3cret", "GET", "/items", int(time.time()) + 60),
+        "X-Profile-Output": "flamegraph",
+    }
+
+    names = [get(app, headers).headers["x-profile-file"] for _ in range(3)]
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(names[1:])
+    lines = (tmp_path / names[-1]).read_text().splitlines()
+    assert any("busy_python" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
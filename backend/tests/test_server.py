@@ -0,0 +1,29 @@
+import pytest
+
+from app.server import DEFAULT_EVENT_LOG, event_log_for_workers, pool_limits_for_workers, resolve_worker_count
+
+
+def test_resolve_worker_count_defaults_to_cpu_count(monkeypatch):
+    monkeypatch.setattr("os.cpu_count", lambda: 6)
+    assert resolve_worker_count(0) == 6
+    assert resolve_worker_count(3) == 3
+
+
+def test_pool_limits_keep_total_under_budget():
+    pool_size, max_overflow = pool_limits_for_workers(8, max_connections=100, pool_size=5, max_overflow=10)
+    assert (pool_size, max_overflow) == (5, 7)
+    assert 8 * (pool_size + max_overflow) <= 100
+
+    assert pool_limits_for_workers(4, max_connections=0, pool_size=5, max_overflow=10) == (5, 10)
+    assert pool_limits_for_workers(4, max_connections=10, pool_size=5, max_overflow=10) == (2, 0)
+
+
+def test_pool_limits_reject_budget_smaller_than_worker_count():
+    with pytest.raises(ValueError):
+        pool_limits_for_workers(8, max_connections=4, pool_size=5, max_overflow=10)
+
+
+def test_several_workers_always_share_an_event_log():
+    assert event_log_for_workers(1, "") == ""
+    assert event_log_for_workers(4, "") == DEFAULT_EVENT_LOG
+    assert event_log_for_workers(4, "/run/recipes/events.log") == "/run/recipes/events.log"
@@ -0,0 +1,198 @@
+from itertools import count
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.exc import OperationalError
+
+from app import crud, models, schemas
+from app.storage import LocalStorage, ShardedStorage
+
+
+def make_shards(tmp_path, number):
+    return [LocalStorage(db_path=str(tmp_path / f"shard-{index}.db")) for index in range(number)]
+
+
+@pytest.fixture()
+def storage(tmp_path):
+    storage = ShardedStorage(make_shards(tmp_path, 3))
+    storage.initialize()
+    yield storage
+    storage.close()
+
+
+def tenants_on(storage, shard, number):
+    """The first `number` tenant keys of the form household-N that route to `shard`."""
+    keys = (f"household-{n}" for n in count())
+    found = []
+    while len(found) < number:
+        key = next(keys)
+        if storage.shard_for(key) == shard:
+            found.append(key)
+    return found
+
+
+def add_recipe(storage, tenant, title, category=None, ingredients=()):
+    with storage.create_session(tenant) as session:
+        category_id = None
+        if category is not None:
+            existing = crud.get_category_by_name(session, category)
+            category_id = (existing or crud.create_category(session, schemas.CategoryCreate(name=category))).id
+        recipe = crud.create_recipe(
+            session,
+            schemas.RecipeCreate(
+                title=title,
+                category_id=category_id,
+                prep_time=10,
+                instructions=f"Cook the {title.lower()} slowly, stirring now and then, until done.",
+                ingredients=[schemas.IngredientCreate(name=name) for name in ingredients],
+            ),
+        )
+        return recipe.id
+
+
+def test_tenants_sharing_a_shard_see_only_their_own_rows(storage):
+    first, second = tenants_on(storage, 1, 2)
+    [elsewhere] = tenants_on(storage, 2, 1)
+
+    # Category names are unique per tenant, not per shard.
+    add_recipe(storage, first, "Leek Soup", category="Soups", ingredients=["Leek", "Potato"])
+    add_recipe(storage, second, "Pea Soup", category="Soups", ingredients=["Peas"])
+    add_recipe(storage, elsewhere, "Flatbread", category="Breads")
+    loaded = storage.bulk_load([schemas.RecipeCreate(title="Rye Loaf")], format="csv", tenant=elsewhere)
+
+    with storage.create_session(first) as session:
+        assert [recipe.title for recipe in session.query(models.Recipe)] == ["Leek Soup"]
+        soups = crud.get_category_by_name(session, "Soups")
+        assert soups.tenant == first and [recipe.title for recipe in soups.recipes] == ["Leek Soup"]
+        assert crud.get_category_by_name(session, "Breads") is None
+    with storage.create_session(second) as session:
+        [recipe] = session.scalars(select(models.Recipe)).all()
+        assert (recipe.title, [item.name for item in recipe.ingredients]) == ("Pea Soup", ["Peas"])
+    assert loaded.recipes == 1
+    assert storage.tenants() == {first: [1], second: [1], elsewhere: [2]}
+    with storage.shards[0].create_session() as session:
+        assert session.query(models.Recipe).count() == 0
+
+    with pytest.raises(ValueError):
+        storage.create_session()
+
+
+def test_listings_and_bulk_deletes_stay_within_the_tenant(storage):
+    first, second = tenants_on(storage, 1, 2)
+    leek = add_recipe(storage, first, "Leek Soup", category="Soups", ingredients=["Leek"])
+    pea = add_recipe(storage, second, "Pea Soup", category="Soups", ingredients=["Peas"])
+
+    with storage.create_session(first) as session:
+        [row] = crud.get_recipe_rows(session)
+        assert (row.title, [item.name for item in row.ingredients]) == ("Leek Soup", ["Leek"])
+        assert crud.delete_recipes(session, [leek, pea]) == [leek]
+    with storage.create_session(second) as session:
+        assert [row.title for row in crud.get_recipe_rows(session)] == ["Pea Soup"]
+        assert crud.get_category(session, crud.get_recipe(session, pea).category_id).recipe_count == 1
+
+
+def test_category_cache_is_kept_per_tenant_and_shard(storage):
+    first, second = tenants_on(storage, 1, 2)
+    [elsewhere] = tenants_on(storage, 2, 1)
+    with storage.create_session(first) as session:
+        soups = crud.create_category(session, schemas.CategoryCreate(name="Soups")).id
+    with storage.create_session(elsewhere) as session:
+        breads = crud.create_category(session, schemas.CategoryCreate(name="Breads")).id
+    # Ids are per shard: both are the first category on theirs.
+    assert soups == breads
+
+    with storage.create_session(first) as session:
+        assert crud.category_exists(session, soups)
+    # Same shard, other tenant: the cached id is not theirs.
+    with storage.create_session(second) as session:
+        assert not crud.category_exists(session, soups)
+    # Other shard: the same id is another tenant's category.
+    with storage.create_session(elsewhere) as session:
+        recipe = crud.get_recipe(session, add_recipe(storage, elsewhere, "Rye Loaf", category="Breads"))
+        assert recipe.category.name == "Breads"
+
+
+def test_admin_listing_merges_every_shard_newest_first(storage):
+    titles = []
+    for shard in range(3):
+        for tenant in tenants_on(storage, shard, 2):
+            titles.append(f"Recipe of {tenant}")
+            add_recipe(storage, tenant, titles[-1])
+
+    listing = storage.list_recipes(limit=4, offset=1)
+
+    assert [row.title for _, row in listing] == titles[::-1][1:5]
+    assert all(storage.shard_for(row.tenant) == shard for shard, row in listing)
+    assert sum(storage.scatter(lambda session: session.query(models.Recipe).count())) == 6
+    assert storage.health_check()
+
+
+def test_rebalance_moves_tenants_onto_an_appended_shard(tmp_path):
+    shards = make_shards(tmp_path, 3)
+    before = ShardedStorage(shards[:2])
+    before.initialize()
+    tenants = [f"household-{n}" for n in range(12)]
+    for tenant in tenants:
+        add_recipe(before, tenant, "Stew", category="Mains", ingredients=["Beef", "Carrot"])
+        add_recipe(before, tenant, "Stew", ingredients=["Beef", "Carrot"])
+    before.close()
+
+    after = ShardedStorage(shards)
+    after.initialize()
+    planned = after.rebalance(dry_run=True)
+    moves = after.rebalance()
+
+    moved = {move.tenant for move in moves}
+    assert [(move.tenant, move.source, move.destination) for move in planned] == [
+        (move.tenant, move.source, move.destination) for move in moves
+    ]
+    assert moved and all(move.destination == 2 for move in moves)
+    assert moved == {tenant for tenant in tenants if after.shard_for(tenant) == 2}
+    assert all((move.stats.categories, move.stats.recipes, move.stats.ingredients) == (1, 2, 4) for move in moves)
+    assert after.tenants() == {tenant: [after.shard_for(tenant)] for tenant in tenants}
+    assert after.rebalance(dry_run=True) == []
+
+    tenant = sorted(moved)[0]
+    with after.create_session(tenant) as session:
+        stews = session.query(models.Recipe).order_by(models.Recipe.id).all()
+        assert [len(stew.ingredients) for stew in stews] == [2, 2]
+        # The copy keeps pointing at its original under the new ids.
+        assert stews[1].duplicate_of_id == stews[0].id
+        mains = crud.get_category_by_name(session, "Mains")
+        assert stews[0].category_id == mains.id
+        assert session.get(models.CategoryStats, mains.id).recipe_count == 1
+    after.close()
+
+
+def test_rebalance_interrupted_before_the_source_delete_can_be_repeated(tmp_path):
+    shards = make_shards(tmp_path, 2)
+    before = ShardedStorage(shards[:1])
+    before.initialize()
+    tenants = [f"household-{n}" for n in range(6)]
+    for tenant in tenants:
+        add_recipe(before, tenant, "Stew", category="Mains", ingredients=["Beef", "Carrot"])
+
+    after = ShardedStorage(shards)
+    after.initialize()
+
+    # The copies commit on the new shard, then the source delete fails.
+    def fail_deletes(connection, cursor, statement, parameters, context, executemany):
+        if statement.startswith("DELETE"):
+            raise OperationalError(statement, parameters, Exception("disk I/O error"))
+
+    source = shards[0].get_engine()
+    event.listen(source, "before_cursor_execute", fail_deletes)
+    with pytest.raises(OperationalError):
+        after.rebalance()
+    event.remove(source, "before_cursor_execute", fail_deletes)
+    [tenant] = [tenant for tenant, placement in after.tenants().items() if placement == [0, 1]]
+
+    after.rebalance()
+
+    assert after.tenants() == {tenant: [after.shard_for(tenant)] for tenant in tenants}
+    with after.create_session(tenant) as session:
+        [stew] = session.query(models.Recipe).all()
+        assert [ingredient.name for ingredient in stew.ingredients] == ["Beef", "Carrot"]
+        [mains] = session.query(models.Category).all()
+        assert stew.category_id == mains.id and session.get(models.CategoryStats, mains.id).recipe_count == 1
+    after.close()
@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+import pytest
+
+from app import crud, schemas
+from app.similarity import SimilarityIndex
+
+
+def add_recipe(db, title, ingredients):
+    recipe_in = schemas.RecipeCreate(title=title, ingredients=[schemas.IngredientCreate(name=name) for name in ingredients])
+    return crud.create_recipe(db, recipe_in)
+
+
+@pytest.fixture()
+def index(tmp_path):
+    return SimilarityIndex(directory=str(tmp_path / "index"))
+
+
+def test_rebuild_publishes_a_memory_mapped_snapshot(db_session, index):
+    soup = add_recipe(db_session, "Tomato Soup", ["Tomatoes", "Basil", "Garlic"])
+    pasta = add_recipe(db_session, "Tomato Pasta", ["Tomatoes", "Basil", "Spaghetti"])
+    add_recipe(db_session, "Chocolate Cake", ["Flour", "Sugar"])
+
+    index.rebuild(db_session)
+
+    assert isinstance(index._snapshot.ids, np.memmap)
+    neighbours = index.similar(soup.id, 10)
+    assert [recipe_id for recipe_id, _ in neighbours] == [pasta.id]
+
+    # A second worker maps the same files instead of building its own copy.
+    other_worker = SimilarityIndex(directory=index.directory)
+    other_worker.reload()
+    assert other_worker.similar(soup.id, 10) == neighbours
+
+
+def test_rebuild_is_skipped_while_the_published_snapshot_is_fresh(db_session, index):
+    add_recipe(db_session, "Tomato Soup", ["Tomatoes"])
+    index.rebuild(db_session)
+    generation = index._snapshot.generation
+
+    index.rebuild(db_session, max_age=3600)
+    assert index._snapshot.generation == generation
+
+    index.rebuild(db_session)
+    assert index._snapshot.generation != generation
+
+
+def test_rebuild_keeps_the_generation_other_workers_may_be_mapping(db_session, index, monkeypatch):
+    add_recipe(db_session, "Tomato Soup", ["Tomatoes"])
+    generations = []
+    for _ in range(3):
+        index.rebuild(db_session)
+        generations.append(index._snapshot.generation)
+
+    # A worker that read the pointer just before the last publish can still map what it names.
+    assert sorted(entry for entry in os.listdir(index.directory) if entry.startswith("gen-")) == generations[1:]
+
+    # One that read it two builds ago keeps its snapshot and catches up on the next reload.
+    other_worker = SimilarityIndex(directory=index.directory)
+    monkeypatch.setattr(other_worker, "_read_current", lambda: (generations[0], 0.0))
+    other_worker.reload()
+    assert other_worker._snapshot.generation == ""
+
+
+def test_overlay_tracks_writes_until_the_next_rebuild(db_session, index):
+    soup = add_recipe(db_session, "Tomato Soup", ["Tomatoes", "Basil"])
+    cake = add_recipe(db_session, "Chocolate Cake", ["Flour", "Sugar"])
+    index.rebuild(db_session)
+    assert index.similar(soup.id, 10) == []
+
+    cake.title = "Tomato Cake"
+    index.update(cake)
+    assert [recipe_id for recipe_id, _ in index.similar(soup.id, 10)] == [cake.id]
+
+    index.forget([cake.id])
+    assert index.similar(soup.id, 10) == []
+    assert index.similar(cake.id, 10) is None
+
+
+def test_query_scores_match_dense_cosine_similarity(db_session, index):
+    recipes = [
+        add_recipe(db_session, "Tomato Soup", ["Tomatoes", "Basil", "Garlic"]),
+        add_recipe(db_session, "Tomato Pasta", ["Tomatoes", "Basil", "Spaghetti"]),
+        add_recipe(db_session, "Garlic Bread", ["Bread", "Garlic", "Butter"]),
+        add_recipe(db_session, "Basil Pesto", ["Basil", "Garlic", "Pine nuts"]),
+    ]
+    index.rebuild(db_session)
+
+    snapshot = index._snapshot
+    dense = snapshot.matrix.toarray()
+    expected = dense @ dense[snapshot.positions(np.array([recipes[0].id]))[0]]
+    neighbours = index.similar(recipes[0].id, 10)
+    assert len(neighbours) == 3
+    for recipe_id, score in neighbours:
+        assert score == pytest.approx(expected[snapshot.positions(np.array([recipe_id]))[0]], rel=1e-5)
@@ -0,0 +1,315 @@
+import gzip
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from app import crud, models, schemas
+from app.storage import LocalStorage
+from app.events import recipe_events
+from app.similarity import similarity_index
+from app.storage.backup import copy_backup, copy_restore, sqlite_backup
+from app.storage.bulk import INGREDIENT_COLUMNS, _copy_in, decode_csv, encode_csv
+
+
+@pytest.fixture()
+def tuned_storage(tmp_path):
+    storage = LocalStorage(db_path=str(tmp_path / "tuned.db"), tuned=True)
+    storage.initialize()
+    yield storage
+    storage.close()
+
+
+def test_tuned_local_storage_enables_wal_and_pragmas(tuned_storage):
+    with tuned_storage.get_engine().connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+
+
+def test_tuned_writes_are_group_committed_and_visible_to_readers(tuned_storage):
+    def add_recipe(title):
+        return lambda session: crud.create_recipe(session, schemas.RecipeCreate(title=title)).id
+
+    def fail(session):
+        session.add(models.Recipe(title="Doomed"))
+        session.flush()
+        raise ValueError("rejected")
+
+    futures = [tuned_storage.submit_write(add_recipe(f"Recipe {index}")) for index in range(20)]
+    failed = tuned_storage.submit_write(fail)
+    ids = [future.result(timeout=10) for future in futures]
+
+    with pytest.raises(ValueError):
+        failed.result(timeout=10)
+
+    with tuned_storage.create_read_session() as session:
+        titles = {recipe.title for recipe in session.query(models.Recipe).all()}
+    assert len(set(ids)) == 20
+    assert "Doomed" not in titles
+    assert len(titles) == 20
+
+
+def test_group_committed_writes_publish_only_once_the_batch_is_durable(tuned_storage):
+    def published():
+        return recipe_events.snapshot()["published"]
+
+    def create_then_fail(session):
+        crud.create_recipe(session, schemas.RecipeCreate(title="Rolled back"))
+        raise ValueError("rejected")
+
+    before = published()
+    with pytest.raises(ValueError):
+        tuned_storage.submit_write(create_then_fail).result(timeout=10)
+    assert published() == before
+
+    # The job's savepoint was released, but the batch commit around it failed.
+    def refuse_commit(connection):
+        raise OperationalError("COMMIT", {}, Exception("disk I/O error"))
+
+    engine = tuned_storage._write_queue.engine
+    event.listen(engine, "commit", refuse_commit)
+    try:
+        with pytest.raises(OperationalError):
+            tuned_storage.submit_write(lambda session: crud.create_recipe(session, schemas.RecipeCreate(title="Lost"))).result(timeout=10)
+    finally:
+        event.remove(engine, "commit", refuse_commit)
+    assert published() == before and not similarity_index._pending
+
+    recipe = tuned_storage.submit_write(lambda session: crud.create_recipe(session, schemas.RecipeCreate(title="Kept"))).result(timeout=10)
+    # Announced by the time the caller gets the result.
+    assert published() == before + 1 and list(similarity_index._pending) == [recipe.id]
+
+
+def test_tuned_read_sessions_are_read_only(tuned_storage):
+    with tuned_storage.create_read_session() as session:
+        with pytest.raises(OperationalError):
+            session.execute(text("INSERT INTO categories (name) VALUES ('Nope')"))
+
+
+@pytest.fixture()
+def plain_storage(tmp_path):
+    storage = LocalStorage(db_path=str(tmp_path / "bulk.db"))
+    storage.initialize()
+    yield storage
+    storage.close()
+
+
+def test_plain_local_storage_enforces_foreign_key_actions(plain_storage):
+    with plain_storage.create_session() as session:
+        category = crud.create_category(session, schemas.CategoryCreate(name="Soups"))
+        recipe = crud.create_recipe(
+            session,
+            schemas.RecipeCreate(title="Leek Soup", category_id=category.id, ingredients=[schemas.IngredientCreate(name="Leek")]),
+        )
+        kept = crud.create_recipe(session, schemas.RecipeCreate(title="Pea Soup", category_id=category.id))
+        crud.add_recipe_views(session, {recipe.id: 3})
+
+        assert session.execute(text("PRAGMA foreign_keys")).scalar() == 1
+        # Ingredients, views and LSH bands go through ON DELETE CASCADE, not the ORM.
+        crud.delete_recipe(session, recipe)
+        crud.delete_category(session, category)
+
+    with plain_storage.create_session() as session:
+        for table in ("ingredients", "recipe_stats", "recipe_minhash_bands"):
+            assert session.execute(text(f"SELECT count(*) FROM {table} WHERE recipe_id = :id"), {"id": recipe.id}).scalar() == 0
+        assert session.get(models.Recipe, kept.id).category_id is None
+
+
+class FakeCopy:
+    def __init__(self):
+        self.rows, self.data = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set_types(self, types):
+        pass
+
+    def write_row(self, row):
+        self.rows.append(row)
+
+    def write(self, data):
+        self.data.append(data)
+
+
+class FakePsycopgConnection:
+    """Just enough of a SQLAlchemy connection over psycopg 3 for `_copy_in`."""
+
+    def __init__(self):
+        self.dialect = SimpleNamespace(driver="psycopg")
+        self.connection = self
+        self.copies = []
+
+    def cursor(self):
+        return SimpleNamespace(copy=self.copy, close=lambda: None)
+
+    def copy(self, statement):
+        self.copies.append((statement, FakeCopy()))
+        return self.copies[-1][1]
+
+
+def test_csv_copy_sends_postgres_csv_on_psycopg3():
+    rows = [(1, "Plain", None, 3), (2, 'Say "hi", then\nleave', "", 4)]
+    connection = FakePsycopgConnection()
+
+    _copy_in(connection, "ingredients", INGREDIENT_COLUMNS, rows, "csv")
+
+    [(statement, copy)] = connection.copies
+    assert statement == "COPY ingredients (recipe_id, name, amount, unit) FROM STDIN (FORMAT CSV)"
+    # NULL is an unquoted empty field, an empty string a quoted one; quotes double, newlines stay quoted.
+    assert copy.rows == [] and "".join(copy.data) == '1,"Plain",,3\n2,"Say ""hi"", then\nleave","",4\n'
+
+    _copy_in(connection, "ingredients", INGREDIENT_COLUMNS, rows, "binary")
+    assert connection.copies[-1][1].rows == rows
+
+
+def test_bulk_load_remaps_ingredients_and_reconciles_category_counters(plain_storage):
+    with plain_storage.create_session() as session:
+        category = crud.create_category(session, schemas.CategoryCreate(name="Soups"))
+        existing = crud.create_recipe(session, schemas.RecipeCreate(title="Existing"))
+
+    recipes = (
+        schemas.RecipeCreate(
+            title=f"Soup {n}",
+            category_id=category.id if n % 2 else None,
+            prep_time=n,
+            ingredients=[schemas.IngredientCreate(name=f"Item {n}.{i}", amount=str(i)) for i in range(n)],
+        )
+        for n in range(5)
+    )
+    stats = plain_storage.bulk_load(recipes, format="csv", batch_size=2)
+
+    assert (stats.recipes, stats.ingredients) == (5, 10)
+    assert stats.rows_per_second > 0
+    with plain_storage.create_session() as session:
+        loaded = session.query(models.Recipe).filter(models.Recipe.id > existing.id).order_by(models.Recipe.id).all()
+        assert [recipe.id for recipe in loaded] == list(range(existing.id + 1, existing.id + 6))
+        for n, recipe in enumerate(loaded):
+            assert recipe.title == f"Soup {n}"
+            assert [ingredient.name for ingredient in recipe.ingredients] == [f"Item {n}.{i}" for i in range(n)]
+        counters = session.get(models.CategoryStats, category.id)
+        assert (counters.recipe_count, counters.prep_time_total) == (2, 1 + 3)
+
+
+def test_dump_writes_postgres_compatible_csv_per_table(plain_storage, tmp_path):
+    with plain_storage.create_session() as session:
+        crud.create_recipe(
+            session,
+            schemas.RecipeCreate(title='Say "cheese", please', description="", ingredients=[schemas.IngredientCreate(name="Brie")]),
+        )
+
+    stats = plain_storage.dump(str(tmp_path / "dump"))
+
+    assert (stats.categories, stats.recipes, stats.ingredients) == (0, 1, 1)
+    assert (tmp_path / "dump" / "categories.csv").read_text() == ""
+    recipe_line = (tmp_path / "dump" / "recipes.csv").read_text()
+    # Quoted empty string for the empty description, bare empty fields for NULLs.
+    assert recipe_line.startswith('1,"Say ""cheese"", please","",,,,,')
+    assert ",\\x" in recipe_line  # the MinHash signature, as PostgreSQL writes bytea
+    assert (tmp_path / "dump" / "ingredients.csv").read_text() == '1,1,"Brie",,\n'
+
+
+def test_binary_dumps_need_postgres(plain_storage, tmp_path):
+    with pytest.raises(ValueError):
+        plain_storage.dump(str(tmp_path / "dump"), format="binary")
+    with pytest.raises(ValueError):
+        plain_storage.bulk_load([], format="parquet")
+
+
+def test_backup_copies_in_steps_while_writers_keep_committing(tuned_storage, tmp_path):
+    for n in range(200):
+        tuned_storage.submit_write(lambda session, n=n: crud.create_recipe(session, schemas.RecipeCreate(title=f"Stew {n}", description="x" * 500)))
+    tuned_storage.submit_write(lambda session: None).result(timeout=10)
+    steps = []
+
+    def progress(done, total):
+        if not steps:
+            # A writer commits between backup steps instead of waiting for the whole copy.
+            tuned_storage.submit_write(lambda session: crud.create_recipe(session, schemas.RecipeCreate(title="Late"))).result(timeout=5)
+        steps.append((done, total))
+
+    stats = sqlite_backup(tuned_storage.get_engine(), str(tmp_path / "backup.db"), pages_per_step=8, progress=progress)
+
+    assert len(steps) > 1 and steps[-1][0] == steps[-1][1]
+    assert stats.bytes == (tmp_path / "backup.db").stat().st_size
+    assert not (tmp_path / "backup.db.partial").exists()
+    restored = LocalStorage(db_path=str(tmp_path / "backup.db"))
+    with restored.create_session() as session:
+        assert session.query(models.Recipe).count() == 201
+    restored.close()
+
+
+def test_restore_replaces_contents_and_rejects_invalid_backups(plain_storage, tmp_path):
+    with plain_storage.create_session() as session:
+        crud.create_recipe(session, schemas.RecipeCreate(title="Kept", ingredients=[schemas.IngredientCreate(name="Salt")]))
+    plain_storage.backup(str(tmp_path / "backup.db"))
+    with plain_storage.create_session() as session:
+        crud.create_recipe(session, schemas.RecipeCreate(title="Lost"))
+
+    (tmp_path / "garbage.db").write_bytes(b"not a database" * 100)
+    with pytest.raises(ValueError):
+        plain_storage.restore(str(tmp_path / "garbage.db"))
+    with pytest.raises(ValueError):
+        plain_storage.restore(str(tmp_path / "missing.db"))
+
+    steps = []
+    plain_storage.restore(str(tmp_path / "backup.db"), progress=lambda done, total: steps.append(done))
+
+    assert steps
+    with plain_storage.create_session() as session:
+        assert [recipe.title for recipe in session.query(models.Recipe)] == ["Kept"]
+        assert [ingredient.name for ingredient in session.query(models.Ingredient)] == ["Salt"]
+
+
+def test_compressed_dump_matches_plain_dump(plain_storage, tmp_path):
+    with plain_storage.create_session() as session:
+        crud.create_recipe(session, schemas.RecipeCreate(title="Pesto", ingredients=[schemas.IngredientCreate(name="Basil")]))
+
+    plain_storage.dump(str(tmp_path / "plain"))
+    plain_storage.dump(str(tmp_path / "packed"), compression="gzip")
+
+    for table in ("categories", "recipes", "ingredients"):
+        assert gzip.decompress((tmp_path / "packed" / f"{table}.csv.gz").read_bytes()) == (tmp_path / "plain" / f"{table}.csv").read_bytes()
+
+
+def test_csv_decoding_inverts_encoding():
+    rows = [(1, 'Say "cheese", please', "", None), (2, "two\nlines", None, "x,y")]
+
+    assert list(decode_csv(iter("".join(encode_csv(rows)).splitlines(keepends=True)))) == [
+        ["1", 'Say "cheese", please', "", None],
+        ["2", "two\nlines", None, "x,y"],
+    ]
+
+
+def test_copy_backup_restores_through_inserts_without_copy(plain_storage, tmp_path):
+    with plain_storage.create_session() as session:
+        kept = crud.create_recipe(
+            session, schemas.RecipeCreate(title='Say "cheese"', description="", ingredients=[schemas.IngredientCreate(name="Brie")])
+        )
+        kept_row = (kept.title, kept.description, kept.minhash, kept.created_at)
+    copy_backup(plain_storage.get_engine(), str(tmp_path / "backup"))
+    with plain_storage.create_session() as session:
+        crud.create_recipe(session, schemas.RecipeCreate(title="Lost"))
+
+    steps = []
+    stats = copy_restore(plain_storage.get_engine(), str(tmp_path / "backup"), progress=lambda done, total: steps.append(done))
+
+    assert stats.rows and steps == list(range(1, len(steps) + 1))
+    with plain_storage.create_session() as session:
+        recipes = session.query(models.Recipe).all()
+        assert [(recipe.title, recipe.description, recipe.minhash, recipe.created_at) for recipe in recipes] == [kept_row]
+        assert [ingredient.name for ingredient in recipes[0].ingredients] == ["Brie"]
+
+
+def test_binary_copy_backups_need_postgres_to_restore(plain_storage, tmp_path):
+    copy_backup(plain_storage.get_engine(), str(tmp_path / "backup"))
+    manifest = tmp_path / "backup" / "manifest.json"
+    manifest.write_text(manifest.read_text().replace('"csv"', '"binary"'))
+
+    with pytest.raises(ValueError):
+        copy_restore(plain_storage.get_engine(), str(tmp_path / "backup"))
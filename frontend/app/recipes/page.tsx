@@ -3,7 +3,7 @@
 import Link from "next/link";
 import { useEffect, useState } from "react";
 import RecipeListItem from "../../components/RecipeListItem";
-import { deleteRecipe, getRecipes, type Recipe } from "../../lib/api";
+import { deleteRecipe, getRecipe, getRecipes, subscribeToRecipeEvents, type Recipe } from "../../lib/api";
 
 export default function RecipesPage() {
   const [recipes, setRecipes] = useState<Recipe[]>([]);
@@ -27,6 +27,30 @@ export default function RecipesPage() {
     };
 
     fetchRecipes();
+
+    const upsert = async (id: number) => {
+      try {
+        const recipe = await getRecipe(id);
+        setRecipes((current) =>
+          current.some((item) => item.id === recipe.id)
+            ? current.map((item) => (item.id === recipe.id ? recipe : item))
+            : [recipe, ...current],
+        );
+      } catch {
+        // Deleted again before we fetched it; its delete event removes it.
+      }
+    };
+
+    // Apply changes as they happen rather than polling the whole list.
+    return subscribeToRecipeEvents((event) => {
+      if (event.type === "reset") {
+        fetchRecipes();
+      } else if (event.type === "deleted") {
+        setRecipes((current) => current.filter((recipe) => !event.ids.includes(recipe.id)));
+      } else {
+        upsert(event.id);
+      }
+    });
   }, []);
 
   const handleDelete = async (id: number) => {
@@ -126,3 +126,26 @@ export async function deleteRecipe(id: number | string): Promise<void> {
   });
   await handleResponse<void>(response);
 }
+
+export type RecipeEvent =
+  | { type: "created" | "updated"; id: number; version: number; category_id: number | null }
+  | { type: "deleted"; ids: number[] }
+  | { type: "reset" };
+
+/**
+ * Follow recipe changes over Server-Sent Events instead of re-fetching the list.
+ *
+ * The browser reconnects on its own and resumes from the last event it saw; a `reset`
+ * event means the missed changes are gone and the list should be reloaded.
+ * Returns a function that closes the stream.
+ */
+export function subscribeToRecipeEvents(onEvent: (event: RecipeEvent) => void): () => void {
+  const source = new EventSource(`${API_BASE_URL}/api/recipes/events`);
+  const forward = (type: RecipeEvent["type"]) => (message: MessageEvent<string>) => {
+    onEvent({ type, ...JSON.parse(message.data) } as RecipeEvent);
+  };
+  (["created", "updated", "deleted", "reset"] as const).forEach((type) => {
+    source.addEventListener(type, forward(type));
+  });
+  return () => source.close();
+}
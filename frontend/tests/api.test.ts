@@ -1,4 +1,4 @@
-import { createRecipe, getRecipes, type RecipePayload } from "../lib/api";
+import { createRecipe, getRecipes, subscribeToRecipeEvents, type RecipeEvent, type RecipePayload } from "../lib/api";
 
 describe("API client", () => {
   const fetchMock = jest.spyOn(global, "fetch");
@@ -40,4 +40,29 @@ describe("API client", () => {
 
     await expect(createRecipe(payload)).rejects.toThrow("Invalid data");
   });
+
+  it("forwards recipe events from the change stream", () => {
+    const listeners: Record<string, (message: { data: string }) => void> = {};
+    const close = jest.fn();
+    const EventSourceMock = jest.fn().mockImplementation(() => ({
+      addEventListener: (type: string, listener: (message: { data: string }) => void) => {
+        listeners[type] = listener;
+      },
+      close,
+    }));
+    (global as unknown as { EventSource: unknown }).EventSource = EventSourceMock;
+    const events: RecipeEvent[] = [];
+
+    const unsubscribe = subscribeToRecipeEvents((event) => events.push(event));
+    listeners.created({ data: '{"id":3,"version":1,"category_id":null}' });
+    listeners.deleted({ data: '{"ids":[3]}' });
+    unsubscribe();
+
+    expect(EventSourceMock).toHaveBeenCalledWith("http://localhost:8000/api/recipes/events");
+    expect(events).toEqual([
+      { type: "created", id: 3, version: 1, category_id: null },
+      { type: "deleted", ids: [3] },
+    ]);
+    expect(close).toHaveBeenCalled();
+  });
 });